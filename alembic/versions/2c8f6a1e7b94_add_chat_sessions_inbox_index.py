@@ -0,0 +1,30 @@
+"""add chat sessions inbox index
+
+Revision ID: 2c8f6a1e7b94
+Revises: 9e4a1c7f3d52
+Create Date: 2026-10-18 16:02:17.540126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c8f6a1e7b94'
+down_revision: Union[str, None] = '9e4a1c7f3d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_chat_sessions_employee_id_status_created_at',
+        'chat_sessions',
+        ['employee_id', 'status', 'created_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_sessions_employee_id_status_created_at', table_name='chat_sessions')
@@ -0,0 +1,38 @@
+"""add chat executive presence
+
+Revision ID: 4f1a8c6d2e97
+Revises: 7d3b9e2f5a16
+Create Date: 2026-10-18 17:48:33.106274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f1a8c6d2e97'
+down_revision: Union[str, None] = '7d3b9e2f5a16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'chat_executive_presence',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('worker_id', sa.String(), nullable=False),
+        sa.Column('dealership_id', sa.Integer(), nullable=True),
+        sa.Column('branch_id', sa.Integer(), nullable=True),
+        sa.Column('connections', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('seen_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['dealership_id'], ['dealerships.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['branch_id'], ['branches.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('user_id', 'worker_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('chat_executive_presence')
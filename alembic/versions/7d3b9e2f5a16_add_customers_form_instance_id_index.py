@@ -0,0 +1,26 @@
+"""add customers form instance id index
+
+Revision ID: 7d3b9e2f5a16
+Revises: 2c8f6a1e7b94
+Create Date: 2026-10-18 17:12:05.318842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3b9e2f5a16'
+down_revision: Union[str, None] = '2c8f6a1e7b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_customers_form_instance_id', 'customers', ['form_instance_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_customers_form_instance_id', table_name='customers')
@@ -0,0 +1,26 @@
+"""add chat messages session id index
+
+Revision ID: 9e4a1c7f3d52
+Revises: 5b7e2d9c41a3
+Create Date: 2026-10-18 15:26:41.918305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4a1c7f3d52'
+down_revision: Union[str, None] = '5b7e2d9c41a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_chat_messages_session_id_id', 'chat_messages', ['session_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_messages_session_id_id', table_name='chat_messages')
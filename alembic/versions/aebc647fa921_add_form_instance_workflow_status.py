@@ -0,0 +1,62 @@
+"""add form instance workflow status and queue indexes
+
+Revision ID: aebc647fa921
+Revises: ff01959ffd9f
+Create Date: 2026-10-18 09:12:40.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'aebc647fa921'
+down_revision: Union[str, None] = 'ff01959ffd9f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FORM_STATUS_SQL = (
+    "CASE"
+    " WHEN accounts_verified THEN 'accounts_verified'"
+    " WHEN sales_verified AND customer_submitted THEN 'sales_verified'"
+    " WHEN customer_submitted THEN 'customer_submitted'"
+    " ELSE 'draft' END"
+)
+
+QUEUE_STAGES = ('customer_submitted', 'sales_verified', 'accounts_verified')
+
+
+def upgrade() -> None:
+    # Dealership copied from the template so the queue indexes can be scoped by it
+    op.add_column('form_instances', sa.Column('dealership_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'form_instances_dealership_id_fkey', 'form_instances', 'dealerships',
+        ['dealership_id'], ['id']
+    )
+    op.execute(
+        "UPDATE form_instances SET dealership_id = form_templates.dealership_id "
+        "FROM form_templates WHERE form_templates.id = form_instances.template_id"
+    )
+
+    op.add_column('form_instances',
+        sa.Column('status', sa.String(), sa.Computed(FORM_STATUS_SQL, persisted=True))
+    )
+
+    for stage in QUEUE_STAGES:
+        op.create_index(
+            f'ix_form_instances_{stage}_queue',
+            'form_instances',
+            ['dealership_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            postgresql_where=sa.text(f"status = '{stage}'")
+        )
+
+
+def downgrade() -> None:
+    for stage in QUEUE_STAGES:
+        op.drop_index(f'ix_form_instances_{stage}_queue', table_name='form_instances')
+    op.drop_column('form_instances', 'status')
+    op.drop_constraint('form_instances_dealership_id_fkey', 'form_instances', type_='foreignkey')
+    op.drop_column('form_instances', 'dealership_id')
@@ -0,0 +1,34 @@
+"""add backplane payloads
+
+Revision ID: b83e5f0c9a21
+Revises: 4f1a8c6d2e97
+Create Date: 2026-10-18 21:12:47.530918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b83e5f0c9a21'
+down_revision: Union[str, None] = '4f1a8c6d2e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'backplane_payloads',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_backplane_payloads_created_at', 'backplane_payloads', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_backplane_payloads_created_at', table_name='backplane_payloads')
+    op.drop_table('backplane_payloads')
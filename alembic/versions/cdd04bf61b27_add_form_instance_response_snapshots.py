@@ -0,0 +1,58 @@
+"""add form instance response snapshots
+
+Revision ID: cdd04bf61b27
+Revises: aebc647fa921
+Create Date: 2026-10-18 11:03:27.530918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cdd04bf61b27'
+down_revision: Union[str, None] = 'aebc647fa921'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SNAPSHOTS = {
+    'customer_snapshot': 'customer',
+    'sales_snapshot': 'sales_executive',
+}
+
+
+def upgrade() -> None:
+    for column, filled_by in SNAPSHOTS.items():
+        op.add_column('form_instances', sa.Column(column, postgresql.JSONB(), nullable=True))
+
+        # Backfill from the existing responses, in insertion order
+        op.execute(f"""
+            UPDATE form_instances SET {column} = snapshot.data
+            FROM (
+                SELECT r.form_instance_id,
+                       jsonb_agg(jsonb_build_object('field_name', f.name, 'value', r.value) ORDER BY r.id) AS data
+                FROM form_responses r
+                JOIN form_fields f ON f.id = r.form_field_id
+                WHERE f.filled_by = '{filled_by}'
+                GROUP BY r.form_instance_id
+            ) AS snapshot
+            WHERE snapshot.form_instance_id = form_instances.id
+        """)
+
+        op.create_index(
+            f'ix_form_instances_{column}',
+            'form_instances',
+            [column],
+            postgresql_using='gin',
+            postgresql_ops={column: 'jsonb_path_ops'}
+        )
+
+
+def downgrade() -> None:
+    for column in SNAPSHOTS:
+        op.drop_index(f'ix_form_instances_{column}', table_name='form_instances')
+        op.drop_column('form_instances', column)
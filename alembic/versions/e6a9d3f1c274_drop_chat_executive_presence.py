@@ -0,0 +1,38 @@
+"""drop chat executive presence
+
+Revision ID: e6a9d3f1c274
+Revises: b83e5f0c9a21
+Create Date: 2026-10-18 23:05:12.418903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a9d3f1c274'
+down_revision: Union[str, None] = 'b83e5f0c9a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_table('chat_executive_presence')
+
+
+def downgrade() -> None:
+    op.create_table(
+        'chat_executive_presence',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('worker_id', sa.String(), nullable=False),
+        sa.Column('dealership_id', sa.Integer(), nullable=True),
+        sa.Column('branch_id', sa.Integer(), nullable=True),
+        sa.Column('connections', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('seen_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['dealership_id'], ['dealerships.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['branch_id'], ['branches.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('user_id', 'worker_id')
+    )
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Optional
 
 class Settings(BaseSettings):
     # Existing database settings
@@ -9,6 +10,53 @@ class Settings(BaseSettings):
     database_name: str
     database_username: str
     
+    # Connection pool settings, per engine and worker process
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # Seconds to wait for a connection before failing
+    db_pool_recycle: int = 1800  # Seconds before a connection is replaced
+    db_pool_pre_ping: bool = True
+    
+    # Optional read replica for listing and reporting endpoints (full SQLAlchemy
+    # URLs). Reads fall back to the primary when unset.
+    database_replica_url: Optional[str] = None
+    async_database_replica_url: Optional[str] = None
+    # After a write, the same user's reads go to the primary for this many seconds
+    replica_sticky_seconds: int = 10
+    
+    # Authenticated user cache used by get_current_user
+    user_cache_ttl: int = 60
+    user_cache_max_size: int = 10000
+    # Postgres NOTIFY channel to evict changed users in every worker (optional)
+    user_cache_invalidation_channel: Optional[str] = None
+    
+    # Dedicated bcrypt pool; beyond max_pending running or queued operations
+    # password endpoints answer 429
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64
+    
+    # Cross-worker websocket fan-out: "postgres" (LISTEN/NOTIFY) or "local"
+    # (single worker only)
+    websocket_backplane: str = "postgres"
+    
+    # Outbound messages buffered per websocket; when full, "drop_oldest"
+    # discards the oldest queued message and "disconnect" closes the socket
+    ws_send_queue_size: int = 100
+    ws_overflow_policy: str = "drop_oldest"
+    
+    # Recent messages kept in memory per chat session with local clients
+    chat_recent_buffer_size: int = 200
+    
+    # Chat messages are written in groups of up to this many, waiting at most
+    # this long after the first one
+    chat_write_batch_size: int = 100
+    chat_write_window_ms: int = 5
+    
+    # How often each worker reloads active chat counts per sales executive and
+    # announces its executive connections; a worker silent for two intervals
+    # is taken to be gone
+    chat_load_resync_seconds: int = 30
+    
     # Existing authentication settings
     secret_key: str
     algorithm: str
@@ -17,6 +65,14 @@ class Settings(BaseSettings):
     # Existing AWS settings
     AWS_SERVER_PUBLIC_KEY: str
     AWS_SERVER_SECRET_KEY: str
+    upload_concurrency: int = 8  # Parallel uploads per worker process
+    storage_backend: str = "s3"  # "s3", "local" or "memory"
+    s3_bucket_name: str = "saastestd"
+    s3_endpoint_url: Optional[str] = None  # Set to a MinIO URL to run against local storage
+    local_storage_path: str = "storage"  # Root directory of the local backend
+    public_base_url: str = "http://localhost:8000"  # Used to build local backend URLs
+    upload_url_expiry_seconds: int = 900  # Lifetime of presigned upload URLs
+    form_schema_cache_ttl: int = 300  # Seconds a compiled form schema is reused
     
     # Existing Google OAuth settings
     google_client_id: str
@@ -38,6 +94,8 @@ class Settings(BaseSettings):
     # New optional notification settings
     notification_retry_attempts: int = 3  # Default value
     notification_retry_delay: int = 60  # Default delay in seconds
+    notification_concurrency: int = 16  # Sends in flight at once, per worker
+    smtp_pool_size: int = 8  # Authenticated SMTP connections kept open, per worker
     enable_email_notifications: bool = True  # Feature flag for email
     enable_sms_notifications: bool = True  # Feature flag for SMS
     
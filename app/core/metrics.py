@@ -0,0 +1,188 @@
+import threading
+import time
+from typing import Any, Dict, Set
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+
+class PoolMetrics:
+    """
+    Counters for one connection pool: checkouts, time spent waiting for a
+    connection, overflow use and timeouts.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.overflow_checkouts = 0
+        self.peak_overflow = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_time_total += seconds
+            self.wait_time_max = max(self.wait_time_max, seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        overflow = self.pool.overflow() if hasattr(self.pool, "overflow") else 0
+        with self._lock:
+            self.checkouts += 1
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def instrument(self, pool) -> None:
+        """Attach the event listeners to a pool (events survive pool.recreate())."""
+        self.pool = pool
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.pool
+        with self._lock:
+            return {
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "peak_overflow": self.peak_overflow,
+                "wait_time_total_ms": round(self.wait_time_total * 1000, 3),
+                "wait_time_avg_ms": round(self.wait_time_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+            }
+
+
+def instrumented_pool_class(base, metrics: PoolMetrics):
+    """
+    Subclass of a SQLAlchemy pool class that times how long each checkout
+    waits for a connection. Used as create_engine(poolclass=...).
+    """
+
+    class InstrumentedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except PoolTimeoutError:
+                metrics.record_timeout()
+                raise
+            metrics.record_wait(time.perf_counter() - start)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+# Pool metrics by engine name, published on /metrics
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def register_pool(name: str) -> PoolMetrics:
+    metrics = PoolMetrics(name)
+    pool_metrics[name] = metrics
+    return metrics
+
+
+class SendQueueMetrics:
+    """
+    Outbound websocket queues of one manager: current depth across open
+    connections, messages sent and dropped, and slow consumers disconnected.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queues: Set[Any] = set()
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.slow_disconnects = 0
+        self.peak_depth = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        depths = [queue.qsize() for queue in self.queues]
+        return {
+            "connections": len(depths),
+            "queued": sum(depths),
+            "max_depth": max(depths, default=0),
+            "peak_depth": self.peak_depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+        }
+
+
+# Send queue metrics by websocket manager, published on /metrics
+send_queue_metrics: Dict[str, SendQueueMetrics] = {}
+
+
+def register_send_queues(name: str) -> SendQueueMetrics:
+    metrics = SendQueueMetrics(name)
+    send_queue_metrics[name] = metrics
+    return metrics
+
+
+class CacheMetrics:
+    """Hit and miss counts of an in-process cache."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Cache metrics by cache name, published on /metrics
+cache_metrics: Dict[str, CacheMetrics] = {}
+
+
+def register_cache(name: str) -> CacheMetrics:
+    metrics = CacheMetrics(name)
+    cache_metrics[name] = metrics
+    return metrics
@@ -1,13 +1,18 @@
 # core/notifications.py
 from fastapi import HTTPException
+import asyncio
+import functools
+import queue
 import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 import aiohttp
 import logging
-from typing import Optional
+from typing import Awaitable, Iterable, List, Optional, TypeVar
 from schemas.employee import NotificationPriority
 from config import settings
 
@@ -34,6 +39,100 @@ SMS_CONFIG = {
     "from_number": settings.twilio_from_number
 }
 
+# smtplib and the Twilio client are blocking; they run on this pool so
+# sends neither block the event loop nor use the request threadpool
+_notification_executor = ThreadPoolExecutor(
+    max_workers=settings.notification_concurrency,
+    thread_name_prefix="notification"
+)
+
+
+async def _run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_notification_executor, functools.partial(func, *args, **kwargs))
+
+
+class SMTPConnectionPool:
+    """
+    Up to max_size authenticated SMTP connections, reused across sends so
+    each email does not pay for connect, STARTTLS and login. A connection
+    the server has dropped is replaced and the send retried once.
+    """
+
+    def __init__(self, max_size: int):
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
+        try:
+            server.starttls()
+            server.login(EMAIL_CONFIG['smtp_username'], EMAIL_CONFIG['smtp_password'])
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def send_message(self, msg: MIMEMultipart) -> None:
+        with self._slots:
+            try:
+                server = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                server = self._connect()
+                reused = False
+            try:
+                server.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self._discard(server)
+                if not reused:
+                    raise
+                logger.info(f"Pooled SMTP connection dropped ({str(e)}), reconnecting")
+                server = self._connect()
+                try:
+                    server.send_message(msg)
+                except Exception:
+                    self._discard(server)
+                    raise
+            except smtplib.SMTPRecipientsRefused:
+                # The connection itself is still fine
+                self._idle.put(server)
+                raise
+            except Exception:
+                self._discard(server)
+                raise
+            self._idle.put(server)
+
+
+smtp_pool = SMTPConnectionPool(settings.smtp_pool_size)
+
+
+@functools.lru_cache(maxsize=None)
+def get_sms_client() -> Client:
+    """Shared Twilio client; its HTTP session keeps connections alive between sends."""
+    return Client(SMS_CONFIG['account_sid'], SMS_CONFIG['auth_token'])
+
+
+T = TypeVar("T")
+
+
+async def gather_bounded(coroutines: Iterable[Awaitable[T]], limit: int) -> List[T]:
+    """Await coroutines with at most limit running at once, results in input order."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coroutine: Awaitable[T]) -> T:
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
 async def send_email(
     to_email: str,
     subject: str,
@@ -67,11 +166,8 @@ async def send_email(
         # Add message body
         msg.attach(MIMEText(message, 'plain'))
 
-        # Connect to SMTP server and send
-        with smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port']) as server:
-            server.starttls()
-            server.login(EMAIL_CONFIG['smtp_username'], EMAIL_CONFIG['smtp_password'])
-            server.send_message(msg)
+        # Send over a pooled, already authenticated SMTP connection
+        await _run_blocking(smtp_pool.send_message, msg)
 
         logger.info(f"Email sent successfully to {to_email}")
         return True
@@ -97,14 +193,15 @@ async def send_sms(
         bool: True if successful, raises exception otherwise
     """
     try:
-        client = Client(SMS_CONFIG['account_sid'], SMS_CONFIG['auth_token'])
+        client = get_sms_client()
         
         # Add priority indicator to message if high priority
         if priority == NotificationPriority.HIGH:
             message = "🚨 URGENT: " + message
 
         # Send message through Twilio
-        message = client.messages.create(
+        message = await _run_blocking(
+            client.messages.create,
             body=message,
             from_=SMS_CONFIG['from_number'],
             to=to_phone
@@ -6,7 +6,9 @@ import database
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer,OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from config import settings
+from core import user_cache
 from typing import Union
 
 oauth2_scheme_user = OAuth2PasswordBearer(tokenUrl="login",auto_error=False)
@@ -55,7 +57,11 @@ def get_current_user(token: str = Depends(oauth2_scheme_user), db: Session = Dep
     )
 
     token = verify_access_token_user(token, credentials_exception)
-    user = db.query(models.User).filter(models.User.id == token.id).first()
+    user = user_cache.get(token.id)
+    if user is None:
+        user = db.query(models.User).filter(models.User.id == token.id).first()
+        if user:
+            user = user_cache.put(user)
     
     # Check activation status only for non-admin users
     if user and not user.is_activated and user.role != models.RoleEnum.admin:
@@ -78,7 +84,7 @@ def get_current_user_authenticated(
         )
     return current_user
 
-async def get_current_user_from_token(token: str, db: Session):
+async def get_current_user_from_token(token: str, db: AsyncSession):
     try:
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -87,10 +93,12 @@ async def get_current_user_from_token(token: str, db: Session):
         )
 
         token_data = verify_access_token_user(token, credentials_exception)
-        user = db.query(models.User).filter(models.User.id == token_data.id).first()
-
-        if not user:
-            raise credentials_exception
+        user = user_cache.get(token_data.id)
+        if user is None:
+            user = await db.get(models.User, token_data.id)
+            if not user:
+                raise credentials_exception
+            user = user_cache.put(user)
 
         # Check activation status only for non-admin users
         if not user.is_activated and user.role != models.RoleEnum.admin:
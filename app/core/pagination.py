@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """
+    Encode the (created_at, id) position of a row into an opaque cursor string.
+    """
+    raw = json.dumps([created_at.isoformat() if created_at else None, id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def apply_keyset(query, created_at_column, id_column, after: Optional[str] = None):
+    """
+    Order a query newest first on (created_at, id) and, when a cursor is
+    given, restrict it to rows strictly after that position.
+    """
+    if after:
+        created_at, id = decode_cursor(after)
+        query = query.filter(tuple_(created_at_column, id_column) < (created_at, id))
+    return query.order_by(created_at_column.desc(), id_column.desc())
+
+
+def paginate(
+    query,
+    created_at_column,
+    id_column,
+    serializer: Callable[[Any], Any],
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one keyset page of a query.
+
+    One extra row is fetched to know whether another page exists, so callers
+    get back the serialized items and the cursor of the next page (or None).
+    """
+    rows = apply_keyset(query, created_at_column, id_column, after).limit(limit + 1).all()
+    return _split_page(rows, serializer, limit)
+
+
+async def paginate_async(
+    db,
+    statement,
+    created_at_column,
+    id_column,
+    serializer: Callable[[Any], Any],
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """paginate() for a select() statement run on an AsyncSession."""
+    statement = apply_keyset(statement, created_at_column, id_column, after).limit(limit + 1)
+    rows = (await db.execute(statement)).scalars().all()
+    return _split_page(rows, serializer, limit)
+
+
+def _split_page(rows, serializer, limit: int) -> Tuple[List[Any], Optional[str]]:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return [serializer(row) for row in rows], next_cursor
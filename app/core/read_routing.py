@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Dict, Optional
+from fastapi import HTTPException, Request
+from config import settings
+from core import oauth2
+import database
+
+# Methods that never write; any other successful request counts as a write
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# user id -> monotonic time of that user's last write. Kept per worker process,
+# which matches how the replica lag window is used (a user's follow-up reads
+# usually hit the same worker); entries are dropped once past the window.
+_last_write: Dict[int, float] = {}
+_last_write_lock = threading.Lock()
+_SWEEP_THRESHOLD = 10000
+
+
+def user_id_from_request(request: Request) -> Optional[int]:
+    """User id in the request's bearer token, without touching the database."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return oauth2.verify_access_token_user(token, HTTPException(status_code=401)).id
+    except HTTPException:
+        return None
+
+
+def mark_write(user_id: int) -> None:
+    now = time.monotonic()
+    with _last_write_lock:
+        _last_write[user_id] = now
+        if len(_last_write) > _SWEEP_THRESHOLD:
+            cutoff = now - settings.replica_sticky_seconds
+            for key in [key for key, at in _last_write.items() if at < cutoff]:
+                del _last_write[key]
+
+
+def reads_from_primary(user_id: Optional[int]) -> bool:
+    """Whether a user wrote recently enough that the replica may not have caught up."""
+    if user_id is None:
+        return False
+    with _last_write_lock:
+        written_at = _last_write.get(user_id)
+    return written_at is not None and time.monotonic() - written_at < settings.replica_sticky_seconds
+
+
+async def stick_after_writes(request: Request, call_next):
+    """
+    HTTP middleware recording successful writes per user, for read-your-writes.
+    """
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        user_id = user_id_from_request(request)
+        if user_id is not None:
+            mark_write(user_id)
+    return response
+
+
+def get_read_db(request: Request):
+    """
+    Session for read-only endpoints: the replica, or the primary when the
+    user has just written or no replica is configured.
+    """
+    if reads_from_primary(user_id_from_request(request)):
+        db = database.SessionLocal()
+    else:
+        db = database.ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    if reads_from_primary(user_id_from_request(request)):
+        factory = database.AsyncSessionLocal
+    else:
+        factory = database.AsyncReplicaSessionLocal
+    async with factory() as db:
+        yield db
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from sqlalchemy import text
+from config import settings
+import database
+import models
+
+logger = logging.getLogger(__name__)
+
+
+class UserPrincipal:
+    """
+    Detached snapshot of the User columns endpoints read from current_user.
+    Safe to share between requests and threads, unlike a session-bound instance.
+    """
+    __slots__ = (
+        "id", "dealership_id", "branch_id", "first_name", "last_name",
+        "email", "role", "phone_number", "is_activated",
+    )
+
+    def __init__(self, user: models.User):
+        self.id = user.id
+        self.dealership_id = user.dealership_id
+        self.branch_id = user.branch_id
+        self.first_name = user.first_name
+        self.last_name = user.last_name
+        self.email = user.email
+        self.role = user.role
+        self.phone_number = user.phone_number
+        self.is_activated = user.is_activated
+
+    def __repr__(self) -> str:
+        return f"UserPrincipal(id={self.id}, role={self.role})"
+
+
+# user id -> (cached at, principal), least recently used first
+_cache: "OrderedDict[int, Tuple[float, UserPrincipal]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get(user_id: int) -> Optional[UserPrincipal]:
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry is None:
+            return None
+        if now - entry[0] >= settings.user_cache_ttl:
+            del _cache[user_id]
+            return None
+        _cache.move_to_end(user_id)
+        return entry[1]
+
+
+def put(user: models.User) -> UserPrincipal:
+    principal = UserPrincipal(user)
+    with _cache_lock:
+        _cache[principal.id] = (time.monotonic(), principal)
+        _cache.move_to_end(principal.id)
+        while len(_cache) > settings.user_cache_max_size:
+            _cache.popitem(last=False)
+    return principal
+
+
+def _evict(user_id: int) -> None:
+    with _cache_lock:
+        _cache.pop(user_id, None)
+
+
+def invalidate(user_id: int) -> None:
+    """
+    Drop a user's cached principal after their row changed, here and, when
+    user_cache_invalidation_channel is set, in every other worker.
+    """
+    _evict(user_id)
+    if not settings.user_cache_invalidation_channel:
+        return
+    try:
+        with database.engine.begin() as connection:
+            connection.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": settings.user_cache_invalidation_channel, "payload": str(user_id)}
+            )
+    except Exception as e:
+        # Other workers still expire the entry after user_cache_ttl
+        logger.error(f"Failed to publish user cache invalidation for {user_id}: {str(e)}")
+
+
+async def listen_for_invalidations() -> None:
+    """
+    Evict users invalidated by other workers, via Postgres LISTEN on
+    user_cache_invalidation_channel. Runs for the life of the app.
+    """
+    import asyncpg
+
+    def on_notification(connection, pid, channel, payload):
+        try:
+            _evict(int(payload))
+        except ValueError:
+            logger.warning(f"Ignoring invalid user cache invalidation payload: {payload}")
+
+    while True:
+        try:
+            connection = await asyncpg.connect(database.SQLALCHEMY_DATABASE_URL)
+            try:
+                await connection.add_listener(settings.user_cache_invalidation_channel, on_notification)
+                # Entries may have changed while disconnected
+                with _cache_lock:
+                    _cache.clear()
+                while not connection.is_closed():
+                    await asyncio.sleep(settings.user_cache_ttl)
+            finally:
+                await connection.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"User cache invalidation listener error: {str(e)}")
+        await asyncio.sleep(settings.notification_retry_delay)
@@ -1,60 +1,94 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
-from io import BytesIO
-from fastapi import status, HTTPException,Depends, APIRouter,UploadFile, File, Form
-import boto3
-from botocore.exceptions import NoCredentialsError
 from config import settings
 import uuid
-import logging
 
-import os
-from passlib.context import CryptContext
-from fastapi.responses import StreamingResponse
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
-AWS_SERVER_PUBLIC_KEY = settings.AWS_SERVER_PUBLIC_KEY
-AWS_SERVER_SECRET_KEY = settings.AWS_SERVER_SECRET_KEY
+class PasswordHasher:
+    """
+    Bounded pool bcrypt runs on, sized separately from the request threadpool
+    so a burst of logins cannot starve other endpoints. bcrypt releases the
+    GIL, so threads hash in parallel. Once max_pending operations are running
+    or queued, new ones are rejected with 429 instead of queueing further.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_time = 0.0
+
+    def _run(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.busy_time += time.perf_counter() - start
+
+    def submit(self, func, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many password operations in progress, please retry shortly",
+                    headers={"Retry-After": "1"}
+                )
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+        return self.executor.submit(self._run, func, *args)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "queued": max(0, self.pending - self.workers),
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_time_ms": round(self.busy_time * 1000 / self.completed, 3) if self.completed else 0.0,
+            }
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_max_pending)
+
 
 def hash(password:str):
-    return pwd_context.hash(password)
+    return password_hasher.submit(pwd_context.hash, password).result()
 
 
 def verify(plain_password, hashed_pass):
-    return pwd_context.verify(plain_password, hashed_pass)
-
-
-
-async def upload_image_to_s3(file: UploadFile, bucket_name: str, file_name: str = None) -> str:
-    s3 = boto3.client('s3', aws_access_key_id=AWS_SERVER_PUBLIC_KEY, aws_secret_access_key=AWS_SERVER_SECRET_KEY)
-    try:
-        # Generate unique filename if not provided
-        unique_filename = file_name if file_name else f"{uuid.uuid4().hex}.jpg"
-        
-        # Read the file content
-        contents = await file.read()
-        file_obj = BytesIO(contents)
-
-        # Upload the file to the S3 bucket
-        s3.upload_fileobj(file_obj, bucket_name, unique_filename)
-
-        # Construct the public URL for the uploaded image
-        image_url = f"https://{bucket_name}.s3.amazonaws.com/{unique_filename}"
-        
-        # Reset file pointer for potential future reads
-        await file.seek(0)
-        
-        return image_url
-
-    except NoCredentialsError:
-        logging.error("S3 credentials not available")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="S3 credentials not available")
-    
-    except Exception as e:
-        logging.error(f"Error uploading image: {str(e)}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error uploading image")
+    return password_hasher.submit(pwd_context.verify, plain_password, hashed_pass).result()
+
+
+async def hash_async(password: str) -> str:
+    """hash() for async routes, waiting without holding a thread."""
+    return await asyncio.wrap_future(password_hasher.submit(pwd_context.hash, password))
+
+
+async def verify_async(plain_password: str, hashed_pass: str) -> bool:
+    return await asyncio.wrap_future(password_hasher.submit(pwd_context.verify, plain_password, hashed_pass))
+
+
 
 def generate_unique_filename(original_filename: str) -> str:
     ext = original_filename.split('.')[-1]  # Get the file extension
     unique_name = f"{uuid.uuid4()}.{ext}"  # Create a unique filename with the same extension
-    return unique_name
\ No newline at end of file
+    return unique_name
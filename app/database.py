@@ -1,15 +1,72 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from config import settings
+from core import metrics
 
 
 
 SQLALCHEMY_DATABASE_URL = f'postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}'
+ASYNC_SQLALCHEMY_DATABASE_URL = f'postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}'
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+POOL_OPTIONS = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
+
+primary_pool_metrics = metrics.register_pool("primary")
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=metrics.instrumented_pool_class(QueuePool, primary_pool_metrics),
+    **POOL_OPTIONS
+)
+primary_pool_metrics.instrument(engine.pool)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by async def routes so their queries do not block the event loop.
+# Objects stay usable after commit because lazy refreshes cannot run implicitly.
+primary_async_pool_metrics = metrics.register_pool("primary_async")
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=metrics.instrumented_pool_class(AsyncAdaptedQueuePool, primary_async_pool_metrics),
+    **POOL_OPTIONS
+)
+primary_async_pool_metrics.instrument(async_engine.sync_engine.pool)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read replica, used through core.read_routing. Without a configured replica
+# the names below are the primary's, so reads simply go to the primary.
+if settings.database_replica_url:
+    replica_pool_metrics = metrics.register_pool("replica")
+    replica_engine = create_engine(
+        settings.database_replica_url,
+        poolclass=metrics.instrumented_pool_class(QueuePool, replica_pool_metrics),
+        **POOL_OPTIONS
+    )
+    replica_pool_metrics.instrument(replica_engine.pool)
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+else:
+    replica_engine = engine
+    ReplicaSessionLocal = SessionLocal
+
+if settings.async_database_replica_url:
+    replica_async_pool_metrics = metrics.register_pool("replica_async")
+    async_replica_engine = create_async_engine(
+        settings.async_database_replica_url,
+        poolclass=metrics.instrumented_pool_class(AsyncAdaptedQueuePool, replica_async_pool_metrics),
+        **POOL_OPTIONS
+    )
+    replica_async_pool_metrics.instrument(async_replica_engine.sync_engine.pool)
+    AsyncReplicaSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_replica_engine = async_engine
+    AsyncReplicaSessionLocal = AsyncSessionLocal
+
 
 
 
@@ -22,3 +79,8 @@ def get_db():
         yield db
     finally:
         db.close()  
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
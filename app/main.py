@@ -1,9 +1,15 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import models
 import database
 
-from routes import auth, dealership, branch, employee, form, websocket, chat, vehicle
+from routes import auth, dealership, branch, employee, form, websocket, chat, vehicle, storage, metrics
+from core import read_routing, user_cache
+from services import backplane
+from services import chat as chat_service
+from services.chat_manager import chat_manager
+from config import settings
 from dotenv import load_dotenv
 
 
@@ -22,6 +28,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.middleware("http")(read_routing.stick_after_writes)
+
+
+@app.on_event("startup")
+async def start_user_cache_listener():
+    if settings.user_cache_invalidation_channel:
+        app.state.user_cache_listener = asyncio.create_task(user_cache.listen_for_invalidations())
+
+
+@app.on_event("shutdown")
+async def stop_user_cache_listener():
+    listener = getattr(app.state, "user_cache_listener", None)
+    if listener is not None:
+        listener.cancel()
+        try:
+            await listener
+        except asyncio.CancelledError:
+            pass
+
+
+@app.on_event("startup")
+async def start_websocket_backplane():
+    await backplane.get_backplane().start()
+
+
+@app.on_event("shutdown")
+async def stop_websocket_backplane():
+    await backplane.get_backplane().stop()
+
+
+@app.on_event("startup")
+async def start_executive_load():
+    await chat_manager.executive_load.start()
+
+
+@app.on_event("shutdown")
+async def stop_executive_load():
+    await chat_manager.executive_load.stop()
+
+
+@app.on_event("shutdown")
+async def flush_chat_messages():
+    await chat_service.message_writer.close()
+
+
+@app.on_event("shutdown")
+async def close_async_pool():
+    # Registered last: the hooks above still borrow async sessions
+    await database.async_engine.dispose()
+    if database.async_replica_engine is not database.async_engine:
+        await database.async_replica_engine.dispose()
+
 
 models.Base.metadata.create_all(bind=database.engine)
 
@@ -33,6 +91,8 @@ app.include_router(form.router)
 app.include_router(websocket.router)
 app.include_router(chat.router)
 app.include_router(vehicle.router)
+app.include_router(storage.router)
+app.include_router(metrics.router)
 
 
 
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, Enum as SQLAlchemyEnum,DECIMAL,DateTime, Boolean, Text, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, Enum as SQLAlchemyEnum,DECIMAL,DateTime, Boolean, Text, Float, Computed, Index, text
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB
 import enum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
@@ -117,7 +118,7 @@ class Customer(Base):
     __tablename__ = "customers"
     
     id = Column(Integer, primary_key=True, index=True)
-    form_instance_id = Column(Integer, ForeignKey("form_instances.id"), nullable=False)
+    form_instance_id = Column(Integer, ForeignKey("form_instances.id"), nullable=False, index=True)
     total_price = Column(Float, nullable=False)  # Calculated total amount
     amount_paid = Column(Float, default=0, nullable=False)
     balance_amount = Column(Float, default=0, nullable=False)
@@ -201,11 +202,51 @@ class FormField(Base):
     template = relationship("FormTemplate", back_populates="fields")
 
 
+class FormStatusEnum(str, enum.Enum):
+    draft = "draft"
+    customer_submitted = "customer_submitted"
+    sales_verified = "sales_verified"
+    accounts_verified = "accounts_verified"
+
+
+# Workflow stage derived from the verification flags, furthest stage wins
+FORM_STATUS_SQL = (
+    "CASE"
+    " WHEN accounts_verified THEN 'accounts_verified'"
+    " WHEN sales_verified AND customer_submitted THEN 'sales_verified'"
+    " WHEN customer_submitted THEN 'customer_submitted'"
+    " ELSE 'draft' END"
+)
+
+
 class FormInstance(Base):
     __tablename__ = "form_instances"
+    __table_args__ = tuple(
+        # One partial index per queue so each listing only touches its own stage
+        Index(
+            f"ix_form_instances_{stage.value}_queue",
+            "dealership_id", text("created_at DESC"), text("id DESC"),
+            postgresql_where=text(f"status = '{stage.value}'")
+        )
+        for stage in (
+            FormStatusEnum.customer_submitted,
+            FormStatusEnum.sales_verified,
+            FormStatusEnum.accounts_verified,
+        )
+    ) + tuple(
+        # Containment (@>) lookups on snapshot values
+        Index(
+            f"ix_form_instances_{column}",
+            column,
+            postgresql_using="gin",
+            postgresql_ops={column: "jsonb_path_ops"}
+        )
+        for column in ("customer_snapshot", "sales_snapshot")
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     template_id = Column(Integer, ForeignKey("form_templates.id"), nullable=False)
+    dealership_id = Column(Integer, ForeignKey("dealerships.id"), nullable=True)  # Copied from the template
     generated_by = Column(Integer, nullable=False)  # Sales executive ID
     customer_name = Column(String, nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
@@ -213,6 +254,10 @@ class FormInstance(Base):
     customer_submitted = Column(Boolean,default=False, nullable=True)
     sales_verified = Column(Boolean,default=False, nullable=True)
     accounts_verified = Column(Boolean, default=False, nullable=True)
+    status = Column(String, Computed(FORM_STATUS_SQL, persisted=True))
+    # Denormalized [{field_name, value}] copies of the responses, form_responses stays the source of truth
+    customer_snapshot = Column(JSONB, nullable=True)
+    sales_snapshot = Column(JSONB, nullable=True)
     
     customer = relationship("Customer", back_populates="form_instance", uselist=False)
 
@@ -248,8 +293,49 @@ class Notification(Base):
     sender = relationship("User", foreign_keys=[sender_id])
 
 
+class OutboxStatusEnum(str, enum.Enum):
+    pending = "pending"
+    sent = "sent"
+    failed = "failed"
+
+
+class NotificationOutbox(Base):
+    """
+    Email and SMS deliveries queued by the API and sent by the outbox worker
+    (services/notification_outbox.py), one row per recipient and channel.
+    """
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # The worker's claim query: due pending jobs, oldest first
+        Index(
+            'ix_notification_outbox_pending',
+            'next_attempt_at', 'id',
+            postgresql_where=text("status = 'pending'")
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    sender_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    channel = Column(String, nullable=False)  # NotificationType.EMAIL or NotificationType.SMS
+    destination = Column(String, nullable=False)  # Email address or phone number
+    subject = Column(String, nullable=True)
+    message = Column(Text, nullable=False)
+    priority = Column(String, nullable=False)
+    status = Column(String, nullable=False, server_default=OutboxStatusEnum.pending.value)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    next_attempt_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP, server_default="now()")
+    sent_at = Column(TIMESTAMP, nullable=True)
+
+
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        # Employee inboxes: equality on employee and status, keyset on (created_at, id)
+        Index('ix_chat_sessions_employee_id_status_created_at', 'employee_id', 'status', 'created_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     form_instance_id = Column(Integer, ForeignKey("form_instances.id"), nullable=False)
@@ -265,6 +351,10 @@ class ChatSession(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # History pages are keyset scans by id within a session
+        Index('ix_chat_messages_session_id_id', 'session_id', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"), nullable=False)
@@ -274,4 +364,16 @@ class ChatMessage(Base):
     created_at = Column(TIMESTAMP, server_default="now()")
     
     session = relationship("ChatSession", back_populates="messages")
-    sender = relationship("User", foreign_keys=[sender_id])
\ No newline at end of file
+    sender = relationship("User", foreign_keys=[sender_id])
+
+class BackplanePayload(Base):
+    """
+    Backplane messages too large for a Postgres NOTIFY payload. The NOTIFY
+    carries the row id instead and receivers load the message from here
+    (services/backplane.py). Rows are only needed for a few moments.
+    """
+    __tablename__ = "backplane_payloads"
+
+    id = Column(String, primary_key=True)
+    payload = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), index=True)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, status, HTTPException, Depends
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from services import auth
 from schemas import user
 import database
@@ -51,10 +52,10 @@ def verify_otp(email: str, otp_code: str, db: Session = Depends(database.get_db)
 
 
 @router.post('/login', response_model=user.Token)
-def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+async def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_async_db)):
     try:
         # Authenticate user and get the access token and role
-        token, role = auth.authenticate_user(user_credentials, db)
+        token, role = await auth.authenticate_user(user_credentials, db)
         return {"access_token": token, "token_type": "bearer", "role": role}
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import logging
 from datetime import datetime
 import schemas.chat as chat_schemas
 import models
 from services import employee as employee_service
-from core import oauth2
+from core import oauth2, pagination, read_routing
 from services import chat_manager
+from services import chat as chat_service
 from schemas import employee
-from database import get_db
+from database import get_async_db
+from config import settings
 import database
 import json
 from services.chat_manager import RoleTypes 
@@ -31,15 +34,17 @@ router = APIRouter(
 @router.get("/session-by-form/{form_instance_id}", response_model=chat_schemas.ChatSessionResponse)
 async def get_chat_session_by_form(
     form_instance_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get chat session ID associated with a form instance
     """
-    chat_session = db.query(models.ChatSession).filter(
-        models.ChatSession.form_instance_id == form_instance_id,
-        models.ChatSession.status == "ACTIVE"
-    ).first()
+    chat_session = (await db.execute(
+        select(models.ChatSession).filter(
+            models.ChatSession.form_instance_id == form_instance_id,
+            models.ChatSession.status == "ACTIVE"
+        )
+    )).scalars().first()
     
     if not chat_session:
         raise HTTPException(
@@ -54,16 +59,30 @@ async def chat_websocket(
     websocket: WebSocket,
     session_id: int,
     role: str,
-    token: Optional[str] = None
+    token: Optional[str] = None,
+    since_id: Optional[int] = None
 ):
-    """WebSocket endpoint for chat functionality"""
-    db = next(get_db())  # Get a new database session
+    """
+    WebSocket endpoint for chat functionality.
+
+    On connect the client gets the latest page of history, or, when
+    reconnecting with since_id (the last message id it has), only newer
+    messages in pages of HISTORY_PAGE_SIZE. Older pages are fetched over
+    HTTP from /chat/sessions/{session_id}/messages.
+
+    Database sessions are borrowed only around each operation (validation,
+    history, persisting a message) so open sockets do not hold pool connections.
+    """
+    user = None
     try:
         # Validate session exists and is active
-        chat_session = db.query(models.ChatSession).filter(
-            models.ChatSession.id == session_id,
-            models.ChatSession.status == "ACTIVE"
-        ).first()
+        async with database.AsyncSessionLocal() as db:
+            chat_session = (await db.execute(
+                select(models.ChatSession).filter(
+                    models.ChatSession.id == session_id,
+                    models.ChatSession.status == "ACTIVE"
+                )
+            )).scalars().first()
         
         if not chat_session:
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
@@ -86,8 +105,9 @@ async def chat_websocket(
                 return
                 
             try:
-                user = await oauth2.get_current_user_from_token(token, db)
-                if not user or user.role != models.RoleEnum.SALES_EXECUTIVE or user.id != chat_session.employee_id:
+                async with database.AsyncSessionLocal() as db:
+                    user = await oauth2.get_current_user_from_token(token, db)
+                if not user or user.role != models.RoleEnum.sales_executive or user.id != chat_session.employee_id:
                     await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
                     logger.error("Invalid token or unauthorized sales executive")
                     return
@@ -114,27 +134,60 @@ async def chat_websocket(
             "timestamp": datetime.utcnow().isoformat()
         })
         
-        # Register connection with chat manager
-        await chat_manager.chat_manager.connect(websocket, session_id, internal_role)
+        # Register connection with chat manager. It stays paused while the
+        # history below is written straight to the socket, so a catch-up of
+        # any length neither overflows the bounded send queue nor misses
+        # messages broadcast meanwhile, which are queued for afterwards
+        manager = chat_manager.chat_manager
+        await manager.connect(websocket, session_id, internal_role, executive=user, paused=True)
 
-        # Fetch and send message history
-        messages = db.query(models.ChatMessage).filter(
-            models.ChatMessage.session_id == session_id
-        ).order_by(models.ChatMessage.created_at.asc()).all()
-
-        if messages:
-            history_message = {
+        # Send message history, from the session's in-memory recent messages
+        # when they cover it and from the database otherwise
+        page_size = chat_service.HISTORY_PAGE_SIZE
+        if since_id is None:
+            cached = manager.latest_history(session_id, page_size)
+            if cached is not None:
+                page, has_older = cached
+            else:
+                async with database.AsyncSessionLocal() as db:
+                    page, has_older = await chat_service.messages_before(db, session_id)
+                manager.seed_history(session_id, page, page[0]["id"] - 1 if has_older else 0)
+            await websocket.send_json({
                 "type": "history",
-                "messages": [{
-                    "id": msg.id,
-                    "content": msg.content,
-                    "sender_type": msg.sender_type.upper(),
-                    "sender_id": msg.sender_id,
-                    "created_at": msg.created_at.isoformat()
-                } for msg in messages]
-            }
-            await websocket.send_json(history_message)
-            logger.debug(f"Sent message history to {role} in session {session_id}")
+                "messages": page,
+                "has_older": has_older
+            })
+        else:
+            newer = manager.history_after(session_id, since_id)
+            if newer is not None:
+                # Catch up from the client's cursor, one capped page per frame
+                pages = [newer[start:start + page_size] for start in range(0, len(newer), page_size)] or [[]]
+                for index, page in enumerate(pages):
+                    await websocket.send_json({
+                        "type": "history",
+                        "messages": page,
+                        "has_more": index < len(pages) - 1
+                    })
+            else:
+                # Only the newest messages read are kept for the buffer
+                loaded = chat_manager.RecentMessages(settings.chat_recent_buffer_size, complete_after=since_id)
+                cursor = since_id
+                async with database.AsyncSessionLocal() as db:
+                    while True:
+                        page, has_more = await chat_service.messages_after(db, session_id, cursor)
+                        await websocket.send_json({
+                            "type": "history",
+                            "messages": page,
+                            "has_more": has_more
+                        })
+                        for message in page:
+                            loaded.add(message)
+                        if not has_more:
+                            break
+                        cursor = page[-1]["id"]
+                manager.seed_history(session_id, list(loaded.messages), loaded.complete_after)
+        manager.resume(websocket)
+        logger.debug(f"Sent message history to {role} in session {session_id}")
         
         while True:
             try:
@@ -152,31 +205,24 @@ async def chat_websocket(
                 if not data["content"].strip():
                     raise ValueError("Message content cannot be empty")
 
-                # Create and save message
-                message = models.ChatMessage(
+                # Save the message; it is committed together with other
+                # messages arriving in the same few milliseconds
+                saved = await chat_service.message_writer.write(
                     session_id=session_id,
                     sender_type=internal_role,
                     sender_id=chat_session.employee_id if internal_role == RoleTypes.SALES_EXECUTIVE else None,
                     content=data["content"]
                 )
-                db.add(message)
-                db.commit()
-                db.refresh(message)
 
                 # Format message for broadcast
                 formatted_message = {
                     "type": "message",
-                    "data": {
-                        "id": message.id,
-                        "content": message.content,
-                        "sender_type": message.sender_type.upper(),
-                        "sender_id": message.sender_id,
-                        "created_at": message.created_at.isoformat()
-                    }
+                    "data": saved
                 }
 
-                # First send to the sender
-                await websocket.send_json(formatted_message)
+                # First send to the sender. Once registered, all writes go
+                # through the connection's send queue
+                chat_manager.chat_manager.send(websocket, formatted_message)
                 logger.debug(f"Sent message confirmation to sender {role} in session {session_id}")
 
                 # Then broadcast to other participants
@@ -189,16 +235,19 @@ async def chat_websocket(
 
             except json.JSONDecodeError:
                 logger.error(f"Invalid JSON received from {role} in session {session_id}")
-                await websocket.send_json({
+                chat_manager.chat_manager.send(websocket, {
                     "type": "error",
                     "message": "Invalid JSON format"
                 })
             except ValueError as e:
                 logger.error(f"Invalid message format from {role} in session {session_id}: {str(e)}")
-                await websocket.send_json({
+                chat_manager.chat_manager.send(websocket, {
                     "type": "error",
                     "message": str(e)
                 })
+            except WebSocketDisconnect:
+                # A normal close, handled below
+                raise
             except Exception as e:
                 logger.error(f"Error processing message: {str(e)}")
                 raise
@@ -208,36 +257,79 @@ async def chat_websocket(
         logger.info(f"{role} disconnected from session {session_id}")
     except Exception as e:
         logger.error(f"Unhandled websocket error: {str(e)}", exc_info=True)
+        if websocket in chat_manager.chat_manager.senders:
+            # Stops the connection's writer task
+            await chat_manager.chat_manager.disconnect(session_id, internal_role, websocket)
         if not websocket.client_state.DISCONNECTED:
             await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+
+@router.websocket("/ws/executive")
+async def executive_presence_websocket(websocket: WebSocket, token: Optional[str] = None):
+    """
+    Presence socket for sales executives. While it is open the executive is
+    online for routing new chats, and receives a "session_assigned" message
+    for each chat session routed to them.
+    """
+    try:
+        async with database.AsyncSessionLocal() as db:
+            user = await oauth2.get_current_user_from_token(token, db) if token else None
+    except Exception as e:
+        logger.error(f"Authentication error details: {str(e)}", exc_info=True)
+        user = None
+    if not user or user.role != models.RoleEnum.sales_executive:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        logger.error("Invalid token or unauthorized sales executive")
+        return
+
+    await websocket.accept()
+    await chat_manager.chat_manager.connect_executive(websocket, user)
+    try:
+        while True:
+            # Keep-alive; the client sends nothing meaningful
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        logger.info(f"Sales executive {user.id} presence socket disconnected")
     finally:
-        db.close() 
+        await chat_manager.chat_manager.disconnect_executive(websocket)
 
 @router.post("/sessions", response_model=chat_schemas.ChatSessionResponse)
 async def create_chat_session(
     form_instance_id: int,
     customer_name: str = "Anonymous Customer",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Create a new chat session for a form instance
+    Create a new chat session for a form instance, assigned to the
+    least-loaded online sales executive of the form's dealership and branch
     """
     # Check if an active session already exists for this form instance
-    existing_session = db.query(models.ChatSession).filter(
-        models.ChatSession.form_instance_id == form_instance_id,
-        models.ChatSession.status == "ACTIVE"
-    ).first()
+    existing_session = (await db.execute(
+        select(models.ChatSession).filter(
+            models.ChatSession.form_instance_id == form_instance_id,
+            models.ChatSession.status == "ACTIVE"
+        )
+    )).scalars().first()
     
     if existing_session:
         return existing_session
 
-    # Find an available sales executive
-    employee = db.query(models.User).filter(
-        models.User.is_activated == True,
-        models.User.role == models.RoleEnum.sales_executive
-    ).first()
-    
-    if not employee:
+    # Route within the form's dealership and the branch of the executive who generated it
+    scope = (await db.execute(
+        select(models.FormInstance.dealership_id, models.User.branch_id).outerjoin(
+            models.User, models.User.id == models.FormInstance.generated_by
+        ).filter(models.FormInstance.id == form_instance_id)
+    )).first()
+
+    if not scope:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form instance not found"
+        )
+
+    load = chat_manager.chat_manager.executive_load
+    employee_id = await load.pick(db, scope.dealership_id, scope.branch_id)
+
+    if employee_id is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="No available sales executives to handle chat"
@@ -247,41 +339,95 @@ async def create_chat_session(
     new_session = models.ChatSession(
         form_instance_id=form_instance_id,
         customer_name=customer_name,
-        employee_id=employee.id,
+        employee_id=employee_id,
         status="ACTIVE",
         created_at=datetime.utcnow()
     )
     
     try:
         db.add(new_session)
-        db.commit()
-        db.refresh(new_session)
-        return new_session
+        await db.commit()
+        await db.refresh(new_session)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
+        # pick() already counted the session against the executive
+        await load.session_closed(employee_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create chat session: {str(e)}"
         )
 
+    await chat_manager.chat_manager.notify_executive(employee_id, {
+        "type": "session_assigned",
+        "session_id": new_session.id,
+        "form_instance_id": form_instance_id,
+        "customer_name": customer_name
+    })
+    return new_session
+
+def visible_sessions_query(query, current_user: models.User, employee_id: Optional[int] = None):
+    """
+    Restrict a chat session query to the current user's dealership and, for
+    sales executives, to their own sessions.
+    """
+    if current_user.role == models.RoleEnum.sales_executive:
+        employee_id = current_user.id
+    if employee_id is not None:
+        # With status, served in order by ix_chat_sessions_employee_id_status_created_at
+        query = query.filter(models.ChatSession.employee_id == employee_id)
+    return query.join(
+        models.FormInstance, models.FormInstance.id == models.ChatSession.form_instance_id
+    ).filter(models.FormInstance.dealership_id == current_user.dealership_id)
+
 @router.get("/sessions", response_model=List[chat_schemas.ChatSessionResponse])
 async def get_chat_sessions(
-    db: Session = Depends(get_db)
+    response: Response,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    employee_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(read_routing.get_async_read_db),
+    current_user: models.User = Depends(oauth2.get_current_user_authenticated)
 ):
     """
-    Get all chat sessions
+    List chat sessions of the current user's dealership, newest first,
+    optionally filtered by status (ACTIVE/CLOSED), employee and a created_at
+    range (created_from inclusive, created_to exclusive). Sales executives
+    only see their own sessions. Pass the X-Next-Cursor header value as
+    `after` to fetch the next page.
     """
-    return db.query(models.ChatSession).all()
+    query = visible_sessions_query(select(models.ChatSession), current_user, employee_id)
+    if status_filter:
+        query = query.filter(models.ChatSession.status == status_filter.upper())
+    if created_from:
+        query = query.filter(models.ChatSession.created_at >= created_from)
+    if created_to:
+        query = query.filter(models.ChatSession.created_at < created_to)
+
+    sessions, next_cursor = await pagination.paginate_async(
+        db,
+        query,
+        models.ChatSession.created_at,
+        models.ChatSession.id,
+        lambda session: session,
+        limit=limit,
+        after=after,
+    )
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return sessions
 
 @router.get("/sessions/{session_id}", response_model=chat_schemas.ChatSessionResponse)
 async def get_chat_session(
     session_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a specific chat session
     """
-    session = db.query(models.ChatSession).filter(models.ChatSession.id == session_id).first()
+    session = await db.get(models.ChatSession, session_id)
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -289,19 +435,52 @@ async def get_chat_session(
         )
     return session
 
+@router.get("/sessions/{session_id}/messages", response_model=List[dict])
+async def get_chat_messages(
+    session_id: int,
+    response: Response,
+    before_id: Optional[int] = None,
+    limit: int = Query(chat_service.HISTORY_PAGE_SIZE, ge=1, le=chat_service.MAX_HISTORY_PAGE_SIZE),
+    db: AsyncSession = Depends(read_routing.get_async_read_db),
+    current_user: models.User = Depends(oauth2.get_current_user_authenticated)
+):
+    """
+    Scroll back through a session's messages, a page at a time in
+    chronological order. Without before_id the latest page is returned; when
+    older messages exist, X-Next-Cursor holds the before_id of the next page.
+    Only sessions the user could list from /chat/sessions are readable.
+    """
+    visible = (await db.execute(
+        visible_sessions_query(select(models.ChatSession.id), current_user).filter(
+            models.ChatSession.id == session_id
+        )
+    )).first()
+    if not visible:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chat session {session_id} not found"
+        )
+
+    page, has_older = await chat_service.messages_before(db, session_id, before_id, limit)
+    if has_older:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = str(page[0]["id"])
+    return page
+
 @router.put("/sessions/{session_id}/close")
 async def close_chat_session(
     session_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     """
     Close a chat session
     """
-    session = db.query(models.ChatSession).filter(
-        models.ChatSession.id == session_id,
-        models.ChatSession.employee_id == current_user.id
-    ).first()
+    session = (await db.execute(
+        select(models.ChatSession).filter(
+            models.ChatSession.id == session_id,
+            models.ChatSession.employee_id == current_user.id
+        )
+    )).scalars().first()
     
     if not session:
         raise HTTPException(
@@ -309,14 +488,18 @@ async def close_chat_session(
             detail="Chat session not found or unauthorized"
         )
     
+    was_active = session.status == "ACTIVE"
     session.status = "CLOSED"
     session.closed_at = datetime.utcnow()
     
     try:
-        db.commit()
+        await db.commit()
+        chat_manager.chat_manager.evict_history(session_id)
+        if was_active:
+            await chat_manager.chat_manager.executive_load.session_closed(session.employee_id)
         return {"message": "Chat session closed successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to close chat session: {str(e)}"
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Optional
 from schemas import employee
 from services import employee as employee_service
-from core import oauth2
+from services import form as form_service
+from core import oauth2, pagination, read_routing
 import database
 import models
 
@@ -20,7 +23,7 @@ router = APIRouter(
 def get_my_notifications(
     only_unread: bool = False,
     limit: int = 20,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(read_routing.get_read_db),
     current_user = Depends(oauth2.get_current_user_authenticated)
 ):
     """
@@ -34,23 +37,23 @@ def get_my_notifications(
     )
 
 
-@router.post("/{employee_id}/notify", status_code=status.HTTP_200_OK)
+@router.post("/{employee_id}/notify", status_code=status.HTTP_202_ACCEPTED)
 async def notify_employee_endpoint(
     employee_id: int,
     notification_data: employee.SingleNotification,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user = Depends(oauth2.get_current_user_authenticated)
 ):
-    """Send a notification to a specific employee"""
+    """Queue a notification to a specific employee for the outbox worker"""
     return await employee_service.notify_employee(employee_id, notification_data, db, current_user)
 
-@router.post("/notify-batch", status_code=status.HTTP_200_OK)
+@router.post("/notify-batch", status_code=status.HTTP_202_ACCEPTED)
 async def notify_batch_employees_endpoint(
     notification_data: employee.BatchNotification,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user = Depends(oauth2.get_current_user_authenticated)
 ):
-    """Send notifications to multiple employees based on filters"""
+    """Queue notifications to multiple employees based on filters"""
     return await employee_service.notify_batch_employees(notification_data, db, current_user)
 
 
@@ -63,12 +66,12 @@ def get_roles(
     return employee_service.get_available_roles(db, current_user)
 
 @router.post("/", response_model=employee.EmployeeResponse, status_code=status.HTTP_201_CREATED)
-def create_employee(
+async def create_employee(
     employee_data: employee.EmployeeCreate,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user = Depends(oauth2.get_current_user)
 ):
-    return employee_service.create_employee(employee_data, db, current_user)
+    return await employee_service.create_employee(employee_data, db, current_user)
 
 @router.get("/", response_model=List[employee.EmployeeResponse])
 def get_employees(
@@ -83,11 +86,11 @@ def get_employees(
     return employee_service.get_employees(db, current_user)
 
 @router.post("/activate", status_code=status.HTTP_200_OK)
-def activate_employee(
+async def activate_employee(
     activation_data: employee.EmployeeActivation,
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
-    return employee_service.activate_employee_account(activation_data, db)
+    return await employee_service.activate_employee_account(activation_data, db)
 
 
 
@@ -131,7 +134,7 @@ def delete_employee(
 @router.post("/notifications", response_model=employee.NotificationResponse)
 async def send_in_app_notification(
     notification_data: employee.NotificationCreate,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user: models.User = Depends(oauth2.get_current_user_authenticated)
 ):
     """
@@ -200,128 +203,88 @@ def verify_sales_data(
     }
 
 
-@router.get("/forms/sales-verified", response_model=List[dict])
-def get_sales_verified_forms(
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+def _form_listing(
+    response: Response,
+    query_factory,
+    serializer,
+    db: Session,
+    limit: int,
+    after: Optional[str],
+    stream: bool
 ):
     """
-    Retrieve all sales verified form instances with customer and sales data.
+    Serve a form listing either as one keyset page or as an NDJSON stream.
     """
-    # Filter form instances that are sales verified, belonging to the user's dealership
-    form_instances = (
-        db.query(models.FormInstance)
-        .join(models.FormTemplate)
-        .filter(
-            models.FormTemplate.dealership_id == current_user.dealership_id,
-            models.FormInstance.sales_verified == True
+    if stream:
+        # Reject a bad cursor before the response has started
+        if after:
+            pagination.decode_cursor(after)
+        # The stream opens its own session on the same database as db
+        return StreamingResponse(
+            form_service.stream_forms(query_factory, serializer, after, bind=db.get_bind()),
+            media_type="application/x-ndjson"
         )
-        .all()
-    )
 
-    verified_forms = []
-    for form_instance in form_instances:
-        # Fetch customer data
-        customer = db.query(models.Customer).filter(
-            models.Customer.form_instance_id == form_instance.id
-        ).first()
-
-        # Fetch customer and sales responses
-        customer_responses = (
-            db.query(models.FormResponse)
-            .join(models.FormField)
-            .filter(
-                models.FormResponse.form_instance_id == form_instance.id,
-                models.FormField.filled_by == "customer"
-            )
-            .all()
-        )
+    items, next_cursor = form_service.paginate_forms(query_factory(db), serializer, limit, after)
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return items
 
-        sales_responses = (
-            db.query(models.FormResponse)
-            .join(models.FormField)
-            .filter(
-                models.FormResponse.form_instance_id == form_instance.id,
-                models.FormField.filled_by == "sales_executive"
-            )
-            .all()
-        )
 
-        # Prepare customer details dictionary with default values if customer is None
-        customer_details = {
-            "total_price": customer.total_price if customer else None,
-            "amount_paid": customer.amount_paid if customer else None,
-            "balance_amount": customer.balance_amount if customer else None,
-        }
-
-        verified_forms.append({
-            "form_instance_id": form_instance.id,
-            "customer_name": form_instance.customer_name,
-            "customer_data": [
-                {"field_name": resp.form_field.name, "value": resp.value}
-                for resp in customer_responses
-            ],
-            "sales_data": [
-                {"field_name": resp.form_field.name, "value": resp.value}
-                for resp in sales_responses
-            ],
-            "customer_details": customer_details
-        })
-
-    return verified_forms
+@router.get("/forms/sales-verified", response_model=List[dict])
+def get_sales_verified_forms(
+    response: Response,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+    db: Session = Depends(read_routing.get_read_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    """
+    Retrieve sales verified form instances with customer and sales data.
+    Results are paginated newest first; pass the X-Next-Cursor header value
+    as `after` to fetch the next page, or `stream=true` for NDJSON.
+    """
+    dealership_id = current_user.dealership_id
+    return _form_listing(
+        response,
+        lambda session: form_service.sales_verified_query(session, dealership_id),
+        form_service.serialize_sales_verified,
+        db, limit, after, stream
+    )
 
 
 @router.get("/forms/customer-submitted", response_model=List[dict])
 def get_customer_submitted_forms(
-    db: Session = Depends(database.get_db),
+    response: Response,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+    db: Session = Depends(read_routing.get_read_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     """
-    Retrieve all customer submitted form instances with customer data.
+    Retrieve customer submitted form instances with customer data.
+    Paginated and streamable like /forms/sales-verified.
     """
-    # Filter form instances that are customer submitted, belonging to the user's dealership
-    form_instances = (
-        db.query(models.FormInstance)
-        .join(models.FormTemplate)
-        .filter(
-            models.FormTemplate.dealership_id == current_user.dealership_id,
-            models.FormInstance.customer_submitted == True,
-            models.FormInstance.sales_verified == False
-        )
-        .all()
+    dealership_id = current_user.dealership_id
+    return _form_listing(
+        response,
+        lambda session: form_service.customer_submitted_query(session, dealership_id),
+        form_service.serialize_customer_submitted,
+        db, limit, after, stream
     )
 
-    submitted_forms = []
-    for form_instance in form_instances:
-        # Fetch customer responses
-        customer_responses = (
-            db.query(models.FormResponse)
-            .join(models.FormField)
-            .filter(
-                models.FormResponse.form_instance_id == form_instance.id,
-                models.FormField.filled_by == "customer"
-            )
-            .all()
-        )
-
-        submitted_forms.append({
-            "form_instance_id": form_instance.id,
-            "customer_name": form_instance.customer_name,
-            "customer_submitted_at": form_instance.customer_submitted_at,
-            "customer_data": [
-                {"field_name": resp.form_field.name, "value": resp.value}
-                for resp in customer_responses
-            ]
-        })
-
-    return submitted_forms
-
 
 
 
 @router.get("/accounts/get_pending_forms", response_model=List[Dict])
 def get_pending_sales_forms(
-    db: Session = Depends(database.get_db),
+    response: Response,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+    db: Session = Depends(read_routing.get_read_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     """
@@ -331,32 +294,13 @@ def get_pending_sales_forms(
     if current_user.role != models.RoleEnum.finance:
         raise HTTPException(status_code=403, detail="Unauthorized access")
 
-    # Query form instances that are customer submitted and sales verified
-    pending_forms = db.query(models.FormInstance).filter(
-        models.FormInstance.sales_verified == True,
-        models.FormInstance.customer_submitted == True
-    ).all()
-
-    # Prepare a detailed response with form and customer information
-    form_details = []
-    for form_instance in pending_forms:
-        # Fetch associated customer data
-        customer = db.query(models.Customer).filter(
-            models.Customer.form_instance_id == form_instance.id
-        ).first()
-
-        if customer:
-            form_detail = {
-                "form_instance_id": form_instance.id,
-                "customer_name": form_instance.customer_name,
-                "total_price": customer.total_price,
-                "amount_paid": customer.amount_paid,
-                "balance_amount": customer.balance_amount,
-                "vehicle_name": customer.vehicle.name if customer.vehicle else None
-            }
-            form_details.append(form_detail)
-
-    return form_details
+    dealership_id = current_user.dealership_id
+    return _form_listing(
+        response,
+        lambda session: form_service.pending_accounts_query(session, dealership_id),
+        form_service.serialize_pending_accounts,
+        db, limit, after, stream
+    )
 
 @router.post("/accounts/{form_instance_id}/verify", response_model=dict)
 def verify_accounts_data(
@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Form, UploadFile, File, Request
 import traceback 
 import json
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from services.websockets import notification_manager
 from sqlalchemy.sql import func
 from typing import List,Dict, Optional
 from schemas import form
 from services import employee as employee_service
-from core import oauth2, utils
+from services import form as form_service
+from services import storage, form_schema
+from core import oauth2, utils, read_routing
 import database
 from schemas import employee
 import models
@@ -27,7 +31,7 @@ async def notify_sales_executive(
     sales_exec_id: int,
     customer_name: str,
     form_id: int,
-    db: Session
+    db: AsyncSession
 ) -> None:
     """
     Send notification to sales executive about customer form submission
@@ -58,12 +62,53 @@ async def notify_sales_executive(
     )
 
 
+async def build_form_responses(
+    form_instance: models.FormInstance,
+    field_group: form_schema.FieldGroup,
+    data_dict: Dict,
+    files: Optional[List[UploadFile]],
+    db: AsyncSession
+) -> List[Dict]:
+    """
+    Validate a submission in one pass and build its response rows with typed,
+    normalized values, uploading matched image files to storage concurrently.
+    """
+    values, images = field_group.parse_submission(data_dict, files)
+    dealership_id = form_instance.dealership_id
+    values = await db.run_sync(
+        lambda session: field_group.normalize_values(values, session, dealership_id)
+    )
+
+    responses = [
+        dict(
+            form_instance_id=form_instance.id,
+            form_field_id=field.id,
+            value=value
+        )
+        for field, value in values
+    ]
+
+    # Upload all images to storage concurrently
+    s3_urls = await storage.upload_files([
+        (file, storage.form_upload_prefix(form_instance.id) + utils.generate_unique_filename(file.filename))
+        for _, file in images
+    ])
+    for (field, _), s3_url in zip(images, s3_urls):
+        responses.append(dict(
+            form_instance_id=form_instance.id,
+            form_field_id=field.id,
+            value=s3_url
+        ))
+
+    return responses
+
+
 @router.post("/forms/submit-customer/{form_instance_id}", response_model=Dict)
 async def submit_customer_data(
     form_instance_id: int,
     data: str = Form(...),  # JSON string of form data
     files: List[UploadFile] = File(...),  # Optional file uploads
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     # Debug logging
     logging.debug(f"Form Instance ID: {form_instance_id}")
@@ -80,9 +125,7 @@ async def submit_customer_data(
         )
 
     # Fetch the form instance
-    form_instance = db.query(models.FormInstance).filter(
-        models.FormInstance.id == form_instance_id
-    ).first()
+    form_instance = await db.get(models.FormInstance, form_instance_id)
 
     if not form_instance:
         raise HTTPException(
@@ -90,109 +133,177 @@ async def submit_customer_data(
             detail="Form instance not found"
         )
 
-    # Fetch customer-fillable fields
-    fields = db.query(models.FormField).filter(
-        models.FormField.template_id == form_instance.template_id,
-        models.FormField.filled_by == "customer"
-    ).all()
+    # Validate against the cached customer part of the template
+    schema = await db.run_sync(form_schema.get_form_schema, form_instance.template_id)
+    responses = await build_form_responses(form_instance, schema.customer, data_dict, files, db)
 
-    field_map = {field.name: field for field in fields}
-    responses = []
-    
-    # Validate all required fields are present first
-    for field in fields:
-        if field.is_required:
-            if field.field_type == "image":
-                # For image fields, find a matching file with a name containing the field name
-                matching_image_files = [
-                    file for file in files 
-                    if field.name.lower() in file.filename.lower()
-                ]
-                if not matching_image_files:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Required image file missing or not matching: {field.name}"
-                    )
-            else:
-                # For non-image fields, check in data_dict
-                if field.name not in data_dict:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Required field missing: {field.name}"
-                    )
+    return await complete_customer_submission(form_instance, schema.customer, responses, db)
 
-    # Process non-image fields
-    for field_name, value in data_dict.items():
-        if field_name not in field_map:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Unexpected field: {field_name}"
-            )
-        
-        field = field_map[field_name]
-        
-        if field.field_type != "image":
-            responses.append(models.FormResponse(
-                form_instance_id=form_instance.id,
-                form_field_id=field.id,
-                value=str(value)
-            ))
-
-    # Process image fields
-    if files:
-        for field in fields:
-            if field.field_type == "image":
-                # Find files that contain the field name (case-insensitive)
-                matching_files = [
-                    file for file in files 
-                    if field.name.lower() in file.filename.lower()
-                ]
-                
-                # If no matching files and field is required, raise an error
-                if field.is_required and not matching_files:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Required image file missing or not matching: {field.name}"
-                    )
-                
-                # Process the first matching file
-                if matching_files:
-                    file = matching_files[0]
-                    
-                    # Upload file to S3
-                    filename = utils.generate_unique_filename(file.filename)
-                    s3_url = await utils.upload_image_to_s3(file, "saastestd", filename)
-
-                    responses.append(models.FormResponse(
-                        form_instance_id=form_instance.id,
-                        form_field_id=field.id,
-                        value=s3_url
-                    ))
-
-    # Save responses
-    db.add_all(responses)
+
+async def complete_customer_submission(
+    form_instance: models.FormInstance,
+    customer_fields: form_schema.FieldGroup,
+    responses: List[Dict],
+    db: AsyncSession
+) -> Dict:
+    """
+    Save customer responses, mark the form as customer submitted and
+    notify the sales executive who generated it.
+    """
+    # Read what the notification needs now, the commit expires the instance
+    form_id = form_instance.id
+    sales_exec_id = form_instance.generated_by
+    customer_name = form_instance.customer_name
+
+    # Save responses, with their snapshot in the same transaction
+    await db.run_sync(lambda session: form_service.save_responses(
+        session, form_instance, models.FilledByEnum.customer.value, customer_fields.field_names, responses
+    ))
     
     # Update form instance status
     form_instance.customer_submitted = True
     form_instance.customer_submitted_at = func.now()
 
-    db.commit()
-    db.refresh(form_instance)
+    await db.commit()
 
     # Notify sales executive
     await notify_sales_executive(
-        sales_exec_id=form_instance.generated_by,
-        customer_name=form_instance.customer_name,
-        form_id=form_instance.id,
+        sales_exec_id=sales_exec_id,
+        customer_name=customer_name,
+        form_id=form_id,
         db=db
     )
 
     return {
         "message": "Customer data submitted successfully",
-        "form_id": form_instance.id
+        "form_id": form_id
     }
 
 
+@router.post("/forms/submit-customer/{form_instance_id}/upload-urls", response_model=List[form.ImageUploadTarget])
+async def create_customer_upload_urls(
+    form_instance_id: int,
+    uploads: List[form.ImageUploadRequest],
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Issue presigned PUT URLs so the customer uploads image fields straight
+    to storage. Pass the returned keys to the finalize endpoint afterwards.
+    """
+    form_instance = await db.get(models.FormInstance, form_instance_id)
+
+    if not form_instance:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form instance not found"
+        )
+
+    customer_fields = (await db.run_sync(form_schema.get_form_schema, form_instance.template_id)).customer
+
+    targets = []
+    for upload in uploads:
+        field = customer_fields.by_name.get(upload.field_name)
+        if not field or not field.is_image:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Not a customer image field: {upload.field_name}"
+            )
+        key = storage.form_upload_prefix(form_instance.id) + utils.generate_unique_filename(upload.filename)
+        targets.append(form.ImageUploadTarget(
+            field_name=upload.field_name,
+            key=key,
+            upload_url=await storage.get_storage().presign(key, upload.content_type)
+        ))
+
+    return targets
+
+
+@router.post("/forms/submit-customer/{form_instance_id}/finalize", response_model=Dict)
+async def finalize_customer_data(
+    form_instance_id: int,
+    submission: form.CustomerSubmissionFinalize,
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Complete a customer submission whose images were uploaded through
+    presigned URLs, recording the uploaded objects as responses.
+    """
+    form_instance = await db.get(models.FormInstance, form_instance_id)
+
+    if not form_instance:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form instance not found"
+        )
+
+    customer_fields = (await db.run_sync(form_schema.get_form_schema, form_instance.template_id)).customer
+    field_map = customer_fields.by_name
+    responses = []
+
+    # Validate all required fields are present first
+    required = [field.name for field in customer_fields.required_images] + list(customer_fields.required_values)
+    for field_name in required:
+        if field_name not in submission.uploads and field_name not in submission.data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Required field missing: {field_name}"
+            )
+
+    # Process non-image fields
+    values = []
+    for field_name, value in submission.data.items():
+        field = field_map.get(field_name)
+        if not field or field.is_image:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unexpected field: {field_name}"
+            )
+        values.append((field, value))
+
+    dealership_id = form_instance.dealership_id
+    normalized = await db.run_sync(
+        lambda session: customer_fields.normalize_values(values, session, dealership_id)
+    )
+    for field, value in normalized:
+        responses.append(dict(
+            form_instance_id=form_instance.id,
+            form_field_id=field.id,
+            value=value
+        ))
+
+    # Process uploaded images, which must belong to this form and exist in storage
+    uploads = {}
+    for field_name, key in submission.uploads.items():
+        field = field_map.get(field_name)
+        if not field or not field.is_image:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unexpected image field: {field_name}"
+            )
+        normalized = storage.normalize_form_upload_key(form_instance.id, key)
+        if normalized is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Upload key does not belong to this form: {field_name}"
+            )
+        uploads[field_name] = normalized
+
+    exists = await storage.objects_exist(list(uploads.values()))
+    for (field_name, key), found in zip(uploads.items(), exists):
+        if not found:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Image not uploaded: {field_name}"
+            )
+        responses.append(dict(
+            form_instance_id=form_instance.id,
+            form_field_id=field_map[field_name].id,
+            value=storage.get_storage().url(key)
+        ))
+
+    return await complete_customer_submission(form_instance, customer_fields, responses, db)
+
+
 @router.post("/templates/{template_id}/fields/", response_model=List[form.FormFieldResponse])
 def add_fields_to_template(template_id: int, fields: List[form.FormFieldCreate], db: Session = Depends(database.get_db)):
     try:
@@ -209,6 +320,7 @@ def add_fields_to_template(template_id: int, fields: List[form.FormFieldCreate],
         db.commit()
         for field in new_fields:
             db.refresh(field)
+        form_schema.invalidate_form_schema(template_id)
         
         return new_fields
     except Exception as e:
@@ -230,7 +342,7 @@ def create_form_template(template: form.FormTemplateCreate,
 
 @router.get("/templates/", response_model=List[form.FormListResponse])
 def list_form_templates(
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(read_routing.get_read_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
     # Filter templates by the user's dealership ID
@@ -279,6 +391,7 @@ def activate_form_template(
     template.last_activated_at = func.now()  # Set activation time
     db.commit()
     db.refresh(template)
+    form_schema.invalidate_form_schema(template.id)
 
     return {"message": f"Template '{template.name}' has been activated successfully."}
 
@@ -374,6 +487,7 @@ def create_form_instance(
     # Create a new form instance
     form_instance = models.FormInstance(
         template_id=template.id,
+        dealership_id=template.dealership_id,
         generated_by=current_user.id,
         customer_name=customer_name    )
 
@@ -390,7 +504,7 @@ async def submit_sales_data(
     form_instance_id: int,
     data: str = Form(...),  # JSON string of form data
     files: Optional[List[UploadFile]] = File(...),  # Optional file uploads
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user: models.User = Depends(oauth2.get_current_user),
 ):
     """
@@ -412,10 +526,12 @@ async def submit_sales_data(
         )
 
     # Fetch the form instance
-    form_instance = db.query(models.FormInstance).filter(
-        models.FormInstance.id == form_instance_id,
-        models.FormInstance.generated_by == current_user.id
-    ).first()
+    form_instance = (await db.execute(
+        select(models.FormInstance).filter(
+            models.FormInstance.id == form_instance_id,
+            models.FormInstance.generated_by == current_user.id
+        )
+    )).scalars().first()
   
 
     if not form_instance:
@@ -423,96 +539,22 @@ async def submit_sales_data(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Form instance not found"
         )
-    # Fetch sales-fillable fields
-    fields = db.query(models.FormField).filter(
-        models.FormField.template_id == form_instance.template_id,
-        models.FormField.filled_by == "sales_executive"
-    ).all()
-
-    field_map = {field.name: field for field in fields}
-
-    responses = []
-    # Validate all required fields are present first
-    for field in fields:
-        if field.is_required:
-            if field.field_type == "image":
-                # For image fields, find a matching file with a name containing the field name
-                matching_image_files = [
-                    file for file in files 
-                    if field.name.lower() in file.filename.lower()
-                ]
-                if not matching_image_files:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Required image file missing or not matching: {field.name}"
-                    )
-            else:
-                # For non-image fields, check in data_dict
-                if field.name not in data_dict:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Required field missing: {field.name}"
-                    )
-
-    # Process non-image fields
-    for field_name, value in data_dict.items():
-        if field_name not in field_map:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Unexpected field: {field_name}"
-            )
-        
-        field = field_map[field_name]
-        
-        if field.field_type != "image":
-            responses.append(models.FormResponse(
-                form_instance_id=form_instance.id,
-                form_field_id=field.id,
-                value=str(value)
-            ))
-
-    # Process image fields
-    if files:
-        for field in fields:
-            if field.field_type == "image":
-                # Find files that contain the field name (case-insensitive)
-                matching_files = [
-                    file for file in files 
-                    if field.name.lower() in file.filename.lower()
-                ]
-                
-                # If no matching files and field is required, raise an error
-                if field.is_required and not matching_files:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Required image file missing or not matching: {field.name}"
-                    )
-                
-                # Process the first matching file
-                if matching_files:
-                    file = matching_files[0]
-                    
-                    # Upload file to S3
-                    filename = utils.generate_unique_filename(file.filename)
-                    s3_url = await utils.upload_image_to_s3(file, "saastestd", filename)
-
-                    responses.append(models.FormResponse(
-                        form_instance_id=form_instance.id,
-                        form_field_id=field.id,
-                        value=s3_url
-                    ))
-
-    # Save responses
-    db.add_all(responses)
+    # Validate against the cached sales part of the template
+    schema = await db.run_sync(form_schema.get_form_schema, form_instance.template_id)
+    responses = await build_form_responses(form_instance, schema.sales, data_dict, files, db)
+
+    # Save responses, with their snapshot in the same transaction
+    await db.run_sync(lambda session: form_service.save_responses(
+        session, form_instance, models.FilledByEnum.sales_executive.value, schema.sales.field_names, responses
+    ))
     
     # Update form instance status
     form_instance.customer_submitted = True
     form_instance.customer_submitted_at = func.now()
 
-    db.commit()
-    db.refresh(form_instance)
+    await db.commit()
 
-    return {"message": "Sales data submitted successfully", "form_instance_id": form_instance.id}
+    return {"message": "Sales data submitted successfully", "form_instance_id": form_instance_id}
 
 @router.post("/forms/amount-data/{form_instance_id}/submit/sales", response_model=dict)
 def submit_customer_data(
@@ -575,32 +617,23 @@ def get_sales_data(
     """
     Fetch customer data submitted by the sales executive using form_instance_id.
     """
-    # Fetch the form instance
-    form_instance = db.query(models.FormInstance).filter(
+    # Fetch the form instance together with its customer in one query
+    form_instance = db.query(models.FormInstance).options(
+        joinedload(models.FormInstance.customer)
+    ).filter(
         models.FormInstance.id == form_instance_id
     ).first()
 
     if not form_instance:
         raise HTTPException(status_code=404, detail="Form instance not found.")
 
-    # Fetch the associated customer using the form_instance_id
-    customer = db.query(models.Customer).filter(
-        models.Customer.form_instance_id == form_instance_id
-    ).first()
+    customer = form_instance.customer
 
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found.")
 
-    # Fetch responses filled by the sales executive
-    responses = (
-        db.query(models.FormResponse)
-        .join(models.FormField, models.FormResponse.form_field_id == models.FormField.id)
-        .filter(
-            models.FormResponse.form_instance_id == form_instance_id,
-            models.FormField.filled_by == "sales_executive",
-        )
-        .all()
-    )
+    # Responses filled by the sales executive, from the snapshot
+    responses = form_instance.sales_snapshot
 
     if not responses:
         raise HTTPException(status_code=404, detail="No data found for this form instance.")
@@ -617,10 +650,7 @@ def get_sales_data(
             "user_id": customer.user_id,
             "created_at": customer.created_at,
         },
-        "responses": [
-            {"field_name": response.form_field.name, "value": response.value}
-            for response in responses
-        ],
+        "responses": responses,
     }
 
     return sales_data
@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from core import metrics, utils
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """
+    Per-engine connection pool counters for this worker process: checkouts,
+    connection wait time, overflow use and timeouts.
+    """
+    return {name: pool.snapshot() for name, pool in metrics.pool_metrics.items()}
+
+
+@router.get("/password-hashing")
+def get_password_hashing_metrics():
+    """Queue depth and rejections of the dedicated bcrypt pool."""
+    return utils.password_hasher.snapshot()
+
+
+@router.get("/websockets")
+def get_websocket_metrics():
+    """Outbound queue depth and drops per websocket manager, for this worker."""
+    return {name: queues.snapshot() for name, queues in metrics.send_queue_metrics.items()}
+
+
+@router.get("/caches")
+def get_cache_metrics():
+    """Hit rates of the in-process caches of this worker."""
+    return {name: cache.snapshot() for name, cache in metrics.cache_metrics.items()}
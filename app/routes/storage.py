@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from tempfile import SpooledTemporaryFile
+from services import storage
+
+router = APIRouter(
+    prefix="/storage",
+    tags=["Storage"]
+)
+
+# Uploads larger than this are spooled to disk before being stored
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def _api_served_backend() -> storage.ApiServedBackend:
+    """Objects are only served here when the backend has no HTTP server of its own."""
+    backend = storage.get_storage()
+    if not isinstance(backend, storage.ApiServedBackend):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return backend
+
+
+@router.put("/{key:path}", status_code=status.HTTP_200_OK)
+async def put_object(key: str, expires: int, signature: str, request: Request):
+    """
+    Target of presigned upload URLs issued by the local and memory backends.
+    """
+    backend = _api_served_backend()
+    if not backend.verify_signature(key, expires, signature):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired upload URL")
+
+    with SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        try:
+            await backend.put(key, body, request.headers.get("content-type"))
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {"key": key}
+
+
+@router.get("/{key:path}")
+async def get_object(key: str):
+    backend = _api_served_backend()
+    try:
+        content = await backend.get(key)
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Object not found")
+    return Response(content=content, media_type="application/octet-stream")
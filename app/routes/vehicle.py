@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from typing import List,Dict
 from schemas import vehicle
-from core import oauth2
+from core import oauth2, read_routing
 import database
 import models
 import logging
@@ -42,7 +42,7 @@ def create_vehicle(vehicle: vehicle.VehicleCreate,
 
 @router.get("/vehicles", response_model=list[vehicle.VehicleResponse])
 def get_vehicles(
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(read_routing.get_read_db),
     current_user=Depends(oauth2.get_current_user),
 ):
     """
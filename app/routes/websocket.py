@@ -1,10 +1,9 @@
 from fastapi import (
     APIRouter, WebSocket, WebSocketDisconnect, 
-    Depends, Query
+    Query
 )
 from core import oauth2
-from database import get_db
-from sqlalchemy.orm import Session
+from database import AsyncSessionLocal
 from services.websockets import notification_manager
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
@@ -12,12 +11,13 @@ router = APIRouter(prefix="/ws", tags=["WebSocket"])
 @router.websocket("/notifications")
 async def websocket_notifications(
     websocket: WebSocket, 
-    token: str = Query(...),
-    db: Session = Depends(get_db)
+    token: str = Query(...)
 ):
     try:
-        # Authenticate user
-        current_user = await oauth2.get_current_user_from_token(token, db)
+        # Authenticate user. The session is only held for the lookup, not for
+        # the lifetime of the socket, so idle sockets do not pin pool connections
+        async with AsyncSessionLocal() as db:
+            current_user = await oauth2.get_current_user_from_token(token, db)
         
         if not current_user:
             await websocket.close(code=4003, reason="Authentication failed")
@@ -33,8 +33,11 @@ async def websocket_notifications(
                 # You can handle incoming messages here if needed
                 
         except WebSocketDisconnect:
-            # Handle disconnection
-            notification_manager.disconnect(websocket, current_user.id)
+            pass
+        finally:
+            # Whatever ended the connection, stop its sender task and drop
+            # the backplane subscription
+            await notification_manager.disconnect(websocket, current_user.id)
             
     except Exception as e:
         await websocket.close(code=1008, reason=str(e))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from enum import Enum
 import models
 
@@ -43,3 +43,18 @@ class FormTemplateResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class ImageUploadRequest(BaseModel):
+    field_name: str
+    filename: str
+    content_type: Optional[str] = None
+
+class ImageUploadTarget(BaseModel):
+    field_name: str
+    key: str
+    upload_url: str
+
+class CustomerSubmissionFinalize(BaseModel):
+    data: Dict[str, Any] = {}
+    uploads: Dict[str, str] = {}  # Image field name -> uploaded object key
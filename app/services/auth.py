@@ -1,4 +1,6 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import models
 import schemas
 import core
@@ -31,11 +33,16 @@ def register_admin_user(user: user.AdminUserCreate, db: Session):
     
     return new_user
 
-def authenticate_user(user_credentials: OAuth2PasswordRequestForm, db: Session) :
-    user = db.query(models.User).filter(models.User.email == user_credentials.username).first()
+async def authenticate_user(user_credentials: OAuth2PasswordRequestForm, db: AsyncSession) :
+    user = (await db.execute(
+        select(models.User).filter(models.User.email == user_credentials.username)
+    )).scalars().first()
+    # Ends the read so the connection goes back to the pool while bcrypt runs;
+    # in a login storm logins otherwise wait for connections, not the hasher
+    await db.commit()
 
     # Check if user exists and the password is correct
-    if not user or not core.utils.verify(user_credentials.password, user.password):
+    if not user or not await core.utils.verify_async(user_credentials.password, user.password):
         raise ValueError("Invalid credentials")
 
     # Check activation status for non-admin users
@@ -0,0 +1,247 @@
+"""
+Pub/sub backplane that lets the websocket managers of several worker
+processes reach each other's connections.
+
+Each worker subscribes to a topic (e.g. "ws_user_12", "ws_chat_7") only while
+it holds a connection for it, so a published message is routed only to the
+workers that can deliver it. Messages carry an id and the publishing worker's
+id: the publisher delivers locally itself and ignores its own echo, and
+repeats of an id are dropped.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from sqlalchemy import delete, func, insert, select, text
+from config import settings
+import database
+import models
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Identifies this process in published envelopes
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD = 7999
+# Marks a NOTIFY payload as "<prefix><backplane_payloads id>"; an envelope
+# is JSON, so it never starts with it
+SPILLED_PREFIX = "spilled:"
+# Age at which spilled payloads are deleted; receivers load them at once
+SPILLED_RETENTION = timedelta(minutes=5)
+# Message ids remembered for deduplication
+SEEN_IDS_SIZE = 10000
+
+
+class Backplane(ABC):
+    def __init__(self):
+        self._handlers: Dict[str, Handler] = {}
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def _listen(self, topic: str) -> None:
+        """Start receiving messages published to topic in this worker."""
+
+    @abstractmethod
+    async def _unlisten(self, topic: str) -> None:
+        """Stop receiving messages published to topic."""
+
+    @abstractmethod
+    async def _send(self, topic: str, payload: str) -> None:
+        """Deliver an encoded envelope to every worker listening on topic."""
+
+    async def subscribe(self, topic: str, handler: Handler) -> None:
+        if topic in self._handlers:
+            return
+        self._handlers[topic] = handler
+        try:
+            await self._listen(topic)
+        except Exception as e:
+            logger.error(f"Backplane subscribe to {topic} failed: {str(e)}")
+
+    async def unsubscribe(self, topic: str) -> None:
+        if self._handlers.pop(topic, None) is None:
+            return
+        try:
+            await self._unlisten(topic)
+        except Exception as e:
+            logger.error(f"Backplane unsubscribe from {topic} failed: {str(e)}")
+
+    async def publish(self, topic: str, message: Dict[str, Any]) -> None:
+        """
+        Send message to the other workers subscribed to topic. The caller
+        delivers to its own local connections.
+        """
+        payload = json.dumps({"id": uuid.uuid4().hex, "origin": WORKER_ID, "data": message}, default=str)
+        try:
+            await self._send(topic, payload)
+        except Exception as e:
+            logger.error(f"Backplane publish to {topic} failed: {str(e)}")
+
+    def _is_duplicate(self, message_id: str) -> bool:
+        if message_id in self._seen:
+            return True
+        self._seen[message_id] = None
+        if len(self._seen) > SEEN_IDS_SIZE:
+            self._seen.popitem(last=False)
+        return False
+
+    def _receive(self, topic: str, payload: str) -> None:
+        """Decode an envelope and hand it to the topic's handler."""
+        try:
+            envelope = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed backplane payload on {topic}")
+            return
+        if envelope.get("origin") == WORKER_ID or self._is_duplicate(envelope.get("id")):
+            return
+        handler = self._handlers.get(topic)
+        if handler is None:
+            return
+        task = asyncio.get_running_loop().create_task(handler(envelope["data"]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class LocalBackplane(Backplane):
+    """Single process: there are no other workers to reach."""
+
+    async def _listen(self, topic: str) -> None:
+        pass
+
+    async def _unlisten(self, topic: str) -> None:
+        pass
+
+    async def _send(self, topic: str, payload: str) -> None:
+        pass
+
+
+class PostgresBackplane(Backplane):
+    """
+    Topics are Postgres channels. One asyncpg connection per worker LISTENs;
+    NOTIFY goes through the async engine's pool. The listening connection is
+    re-established, with its channels, if it drops.
+
+    Envelopes too large for a NOTIFY payload, e.g. long chat messages, are
+    written to backplane_payloads in the NOTIFY's transaction, and only a
+    reference to the row is notified.
+    """
+
+    RECONNECT_INTERVAL = 5
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        self.dsn = dsn
+        self._connection = None
+        self._lock = asyncio.Lock()
+        self._supervisor: Optional[asyncio.Task] = None
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        if payload.startswith(SPILLED_PREFIX):
+            if channel in self._handlers:
+                # _receive() then drops it if this worker published it
+                task = asyncio.get_running_loop().create_task(
+                    self._receive_spilled(channel, payload[len(SPILLED_PREFIX):])
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return
+        self._receive(channel, payload)
+
+    async def _receive_spilled(self, topic: str, payload_id: str) -> None:
+        try:
+            async with database.async_engine.connect() as connection:
+                payload = (await connection.execute(
+                    select(models.BackplanePayload.payload).where(models.BackplanePayload.id == payload_id)
+                )).scalar()
+        except Exception as e:
+            logger.error(f"Loading spilled backplane message {payload_id} on {topic} failed: {str(e)}")
+            return
+        if payload is None:
+            logger.warning(f"Spilled backplane message {payload_id} on {topic} no longer exists")
+            return
+        self._receive(topic, payload)
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn)
+        for topic in list(self._handlers):
+            await connection.add_listener(topic, self._on_notification)
+        self._connection = connection
+
+    async def _supervise(self) -> None:
+        while True:
+            await asyncio.sleep(self.RECONNECT_INTERVAL)
+            if self._connection is not None and not self._connection.is_closed():
+                continue
+            async with self._lock:
+                try:
+                    await self._connect()
+                    logger.info("Backplane listener connected")
+                except Exception as e:
+                    logger.error(f"Backplane listener connection failed: {str(e)}")
+
+    async def start(self) -> None:
+        async with self._lock:
+            try:
+                await self._connect()
+            except Exception as e:
+                logger.error(f"Backplane listener connection failed: {str(e)}")
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        if self._supervisor:
+            self._supervisor.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+
+    async def _listen(self, topic: str) -> None:
+        async with self._lock:
+            if self._connection is not None and not self._connection.is_closed():
+                await self._connection.add_listener(topic, self._on_notification)
+
+    async def _unlisten(self, topic: str) -> None:
+        async with self._lock:
+            if self._connection is not None and not self._connection.is_closed():
+                await self._connection.remove_listener(topic, self._on_notification)
+
+    async def _send(self, topic: str, payload: str) -> None:
+        async with database.async_engine.connect() as connection:
+            if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+                payload_id = uuid.uuid4().hex
+                await connection.execute(
+                    insert(models.BackplanePayload).values(id=payload_id, payload=payload)
+                )
+                await connection.execute(delete(models.BackplanePayload).where(
+                    models.BackplanePayload.created_at < func.now() - SPILLED_RETENTION
+                ))
+                payload = SPILLED_PREFIX + payload_id
+            # Delivered on commit, so receivers find the spilled row
+            await connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": topic, "payload": payload})
+            await connection.commit()
+
+
+@functools.lru_cache(maxsize=None)
+def get_backplane() -> Backplane:
+    """The backplane selected by settings.websocket_backplane."""
+    if settings.websocket_backplane == "postgres":
+        return PostgresBackplane(database.SQLALCHEMY_DATABASE_URL)
+    if settings.websocket_backplane == "local":
+        return LocalBackplane()
+    raise ValueError(f"Unknown websocket backplane: {settings.websocket_backplane}")
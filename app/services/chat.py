@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+import database
+import models
+
+logger = logging.getLogger(__name__)
+
+# Messages per history frame on connect, and the default scroll-back page
+HISTORY_PAGE_SIZE = 100
+MAX_HISTORY_PAGE_SIZE = 500
+
+
+def serialize_message(message: models.ChatMessage) -> Dict[str, Any]:
+    """Wire format of a chat message, shared by websocket frames and HTTP."""
+    return {
+        "id": message.id,
+        "content": message.content,
+        "sender_type": message.sender_type.upper(),
+        "sender_id": message.sender_id,
+        "created_at": message.created_at.isoformat()
+    }
+
+
+async def messages_after(
+    db: AsyncSession,
+    session_id: int,
+    since_id: int,
+    limit: int = HISTORY_PAGE_SIZE
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Oldest first page of messages newer than since_id, and whether more follow.
+    Uses the (session_id, id) index.
+    """
+    messages = (await db.execute(
+        select(models.ChatMessage).filter(
+            models.ChatMessage.session_id == session_id,
+            models.ChatMessage.id > since_id
+        ).order_by(models.ChatMessage.id.asc()).limit(limit + 1)
+    )).scalars().all()
+    return [serialize_message(message) for message in messages[:limit]], len(messages) > limit
+
+
+async def messages_before(
+    db: AsyncSession,
+    session_id: int,
+    before_id: Optional[int] = None,
+    limit: int = HISTORY_PAGE_SIZE
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    The limit messages preceding before_id (the latest ones when None), in
+    chronological order, and whether older ones exist.
+    """
+    query = select(models.ChatMessage).filter(models.ChatMessage.session_id == session_id)
+    if before_id is not None:
+        query = query.filter(models.ChatMessage.id < before_id)
+    messages = (await db.execute(
+        query.order_by(models.ChatMessage.id.desc()).limit(limit + 1)
+    )).scalars().all()
+    page = messages[:limit]
+    page.reverse()
+    return [serialize_message(message) for message in page], len(messages) > limit
+
+
+# Queued by close() to stop the writer after its current batch
+_STOP = object()
+
+
+class ChatMessageWriter:
+    """
+    Group commit for chat messages. Messages from every session are queued
+    and written together, once chat_write_batch_size are waiting or
+    chat_write_window_ms after the first, in a single multi-row
+    INSERT ... RETURNING and one commit. Each write() resolves with its own
+    serialized message, including the assigned id, once the batch commits.
+    """
+
+    def __init__(self):
+        self._queue: "Optional[asyncio.Queue[Tuple[Dict[str, Any], asyncio.Future]]]" = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def write(
+        self,
+        session_id: int,
+        sender_type: str,
+        sender_id: Optional[int],
+        content: str
+    ) -> Dict[str, Any]:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(({
+            "session_id": session_id,
+            "sender_type": sender_type,
+            "sender_id": sender_id,
+            "content": content,
+        }, future))
+        return await future
+
+    async def _collect(self) -> Tuple[List[Tuple[Dict[str, Any], asyncio.Future]], bool]:
+        """The next batch, and whether close() asked the writer to stop after it."""
+        batch = []
+        item = await self._queue.get()
+        deadline = asyncio.get_running_loop().time() + settings.chat_write_window_ms / 1000
+        while item is not _STOP:
+            batch.append(item)
+            if len(batch) >= settings.chat_write_batch_size:
+                return batch, False
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                return batch, False
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return batch, False
+        return batch, True
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        rows = [row for row, _ in batch]
+        try:
+            async with database.AsyncSessionLocal() as db:
+                result = await db.execute(
+                    insert(models.ChatMessage).returning(
+                        models.ChatMessage.id,
+                        models.ChatMessage.created_at,
+                        sort_by_parameter_order=True
+                    ),
+                    rows
+                )
+                inserted = result.all()
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} chat messages: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (row, future), (message_id, created_at) in zip(batch, inserted):
+            if not future.done():
+                future.set_result({
+                    "id": message_id,
+                    "content": row["content"],
+                    "sender_type": row["sender_type"].upper(),
+                    "sender_id": row["sender_id"],
+                    "created_at": created_at.isoformat()
+                })
+
+    async def _run(self) -> None:
+        while True:
+            batch, stop = await self._collect()
+            if batch:
+                await self._flush(batch)
+            if stop:
+                return
+
+    async def close(self) -> None:
+        """Stop the writer after writing whatever is still queued."""
+        if self._task is None:
+            return
+        if not self._task.done():
+            # Let the writer finish the batch it is collecting, rather than
+            # cancelling it with messages already taken off the queue
+            await self._queue.put(_STOP)
+            await self._task
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        # A later write() starts a new writer, with a queue on its own loop
+        self._queue = self._task = None
+        if pending:
+            await self._flush(pending)
+
+
+message_writer = ChatMessageWriter()
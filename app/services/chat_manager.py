@@ -1,7 +1,13 @@
+from collections import deque
 from fastapi import WebSocket
-from typing import Dict, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 import json
 import logging
+from config import settings
+from services.backplane import get_backplane
+from services.ws_sender import QueuedSender
+from services.chat_routing import ExecutiveLoadTable
+from core import metrics
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -10,21 +16,134 @@ class RoleTypes:
     SALES_EXECUTIVE = "sales_executive"  # Matches RoleEnum.SALES_EXECUTIVE.value
     CUSTOMER = "customer"
 
+def session_topic(session_id: int) -> str:
+    return f"ws_chat_{session_id}"
+
+def executive_topic(user_id: int) -> str:
+    return f"ws_chat_executive_{user_id}"
+
+
+class RecentMessages:
+    """
+    Ring buffer of a session's latest formatted messages, in id order.
+
+    complete_after is the id after which the buffer holds every message of
+    the session (None until seeded from the database); lookups reaching
+    further back than that are misses and go to the database.
+    """
+
+    def __init__(self, size: int, complete_after: Optional[int] = None):
+        self.messages: "deque[Dict[str, Any]]" = deque(maxlen=size)
+        self.complete_after = complete_after
+
+    def _store(self, messages: List[Dict[str, Any]]) -> None:
+        overflow = len(messages) - self.messages.maxlen
+        if overflow > 0:
+            if self.complete_after is not None:
+                self.complete_after = max(self.complete_after, messages[overflow - 1]["id"])
+            messages = messages[overflow:]
+        self.messages = deque(messages, maxlen=self.messages.maxlen)
+
+    def add(self, message: Dict[str, Any]) -> None:
+        if not self.messages or message["id"] > self.messages[-1]["id"]:
+            if len(self.messages) == self.messages.maxlen and self.complete_after is not None:
+                self.complete_after = max(self.complete_after, self.messages[0]["id"])
+            self.messages.append(message)
+            return
+        # Messages relayed from other workers can arrive out of order
+        if any(existing["id"] == message["id"] for existing in self.messages):
+            return
+        self._store(sorted([*self.messages, message], key=lambda m: m["id"]))
+
+    def seed(self, messages: List[Dict[str, Any]], complete_after: int) -> None:
+        """Fill from a contiguous database read, merged with anything already broadcast."""
+        if self.complete_after is not None:
+            return
+        merged = {message["id"]: message for message in messages}
+        for message in self.messages:
+            merged.setdefault(message["id"], message)
+        self.complete_after = complete_after
+        self._store([merged[message_id] for message_id in sorted(merged)])
+
+    def after(self, since_id: int) -> Optional[List[Dict[str, Any]]]:
+        if self.complete_after is None or since_id < self.complete_after:
+            return None
+        return [message for message in self.messages if message["id"] > since_id]
+
+    def latest(self, limit: int) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        if self.complete_after is None:
+            return None
+        messages = list(self.messages)
+        if len(messages) > limit:
+            return messages[-limit:], True
+        if self.complete_after == 0:
+            return messages, False
+        if len(messages) == limit:
+            return messages, True
+        return None
+
+
 class ChatManager:
+    """
+    Chat sockets of this worker by session and role. Messages reach
+    participants connected to other workers over the backplane, subscribed
+    per session with local participants.
+
+    Every socket has its own bounded send queue and writer task, so
+    broadcasting never waits on a slow client. Sessions with local clients
+    also keep their recent messages in memory, so reconnects rarely need
+    the database.
+
+    A sales executive with any connection here, a session socket or the
+    presence socket, is online for routing new chats (executive_load).
+    Messages for an executive's presence sockets travel over the backplane,
+    subscribed per executive with local presence sockets.
+    """
     def __init__(self):
         self.active_sessions: Dict[int, Dict[str, Set[WebSocket]]] = {}
+        self.senders: Dict[WebSocket, QueuedSender] = {}
+        self.recent: Dict[int, RecentMessages] = {}
+        self.executive_sockets: Dict[WebSocket, int] = {}
+        self.presence: Dict[int, Set[WebSocket]] = {}
+        self.executive_load = ExecutiveLoadTable()
+        self.metrics = metrics.register_send_queues("chat")
+        self.history_metrics = metrics.register_cache("chat_history")
         
-    async def connect(self, websocket: WebSocket, session_id: int, role: str):
-        """Connect a client to a chat session"""
+    async def connect(self, websocket: WebSocket, session_id: int, role: str, executive=None, paused: bool = False):
+        """
+        Connect a client to a chat session; executive is the authenticated
+        sales executive. A paused connection queues messages for the client
+        but writes none until resume().
+        """
         if session_id not in self.active_sessions:
             self.active_sessions[session_id] = {}
+            self.recent[session_id] = RecentMessages(settings.chat_recent_buffer_size)
+            await get_backplane().subscribe(
+                session_topic(session_id),
+                lambda envelope: self.send_local(session_id, envelope["message"], envelope["sender_role"])
+            )
         if role not in self.active_sessions[session_id]:
             self.active_sessions[session_id][role] = set()
         self.active_sessions[session_id][role].add(websocket)
+        self.senders[websocket] = QueuedSender(
+            websocket,
+            self.metrics,
+            lambda: self.disconnect(session_id, role, websocket),
+            paused=paused
+        )
+        if executive is not None:
+            self.executive_sockets[websocket] = executive.id
+            await self.executive_load.executive_connected(executive)
         logger.info(f"Connected {role} to session {session_id}")
         
     async def disconnect(self, session_id: int, role: str, websocket: WebSocket):
         """Disconnect a client from a chat session"""
+        sender = self.senders.pop(websocket, None)
+        if sender:
+            sender.close()
+        executive_id = self.executive_sockets.pop(websocket, None)
+        if executive_id is not None:
+            await self.executive_load.executive_disconnected(executive_id)
         try:
             if session_id in self.active_sessions and role in self.active_sessions[session_id]:
                 self.active_sessions[session_id][role].remove(websocket)
@@ -32,6 +151,8 @@ class ChatManager:
                     del self.active_sessions[session_id][role]
                 if not self.active_sessions[session_id]:
                     del self.active_sessions[session_id]
+                    self.evict_history(session_id)
+                    await get_backplane().unsubscribe(session_topic(session_id))
                 logger.info(f"Disconnected {role} from session {session_id}")
         except KeyError:
             logger.warning(f"Attempted to disconnect non-existent session/role: {session_id}/{role}")
@@ -40,22 +161,100 @@ class ChatManager:
                 
     async def broadcast_message(self, session_id: int, message: dict, sender_role: str):
         """
-        Broadcast message to all connected clients in the session except sender.
+        Broadcast message to all connected clients in the session except sender,
+        in this worker and, via the backplane, in others.
         """
+        await self.send_local(session_id, message, sender_role)
+        await get_backplane().publish(
+            session_topic(session_id),
+            {"message": message, "sender_role": sender_role}
+        )
+
+    def resume(self, websocket: WebSocket):
+        """Start writing the messages queued for a paused connection."""
+        sender = self.senders.get(websocket)
+        if sender:
+            sender.resume()
+
+    def send(self, websocket: WebSocket, message: dict):
+        """Queue a message to one connected socket without waiting for it to be sent."""
+        sender = self.senders.get(websocket)
+        if sender:
+            sender.send(message)
+
+    async def send_local(self, session_id: int, message: dict, sender_role: str):
+        """Queue to this worker's clients in the session, except the sender's role."""
+        recent = self.recent.get(session_id)
+        if recent is not None and message.get("type") == "message":
+            recent.add(message["data"])
         if session_id in self.active_sessions:
             for role, websockets in self.active_sessions[session_id].items():
                 if role != sender_role:  # Don't send back to sender
-                    disconnected_sockets = set()
+                    logger.debug(f"Broadcasting message in session {session_id} from {sender_role} to {role}")
                     for websocket in websockets:
-                        try:
-                            logger.debug(f"Broadcasting message in session {session_id} from {sender_role} to {role}")
-                            await websocket.send_json(message)
-                        except Exception as e:
-                            logger.error(f"Error broadcasting message to {role} in session {session_id}: {str(e)}")
-                            disconnected_sockets.add(websocket)
-                    
-                    # Clean up disconnected sockets
-                    for ws in disconnected_sockets:
-                        await self.disconnect(session_id, role, ws)
-
-chat_manager = ChatManager()
\ No newline at end of file
+                        self.send(websocket, message)
+
+    def latest_history(self, session_id: int, limit: int) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+        """Latest page of the session and whether older messages exist, if in memory."""
+        recent = self.recent.get(session_id)
+        page = recent.latest(limit) if recent is not None else None
+        self.history_metrics.record(page is not None)
+        return page
+
+    def history_after(self, session_id: int, since_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Every message newer than since_id, if all of them are in memory."""
+        recent = self.recent.get(session_id)
+        messages = recent.after(since_id) if recent is not None else None
+        self.history_metrics.record(messages is not None)
+        return messages
+
+    def seed_history(self, session_id: int, messages: List[Dict[str, Any]], complete_after: int):
+        recent = self.recent.get(session_id)
+        if recent is not None:
+            recent.seed(messages, complete_after)
+
+    def evict_history(self, session_id: int):
+        self.recent.pop(session_id, None)
+
+    async def connect_executive(self, websocket: WebSocket, executive):
+        """Register a sales executive's presence socket, marking them online."""
+        executive_id = executive.id
+        if executive_id not in self.presence:
+            self.presence[executive_id] = set()
+            await get_backplane().subscribe(
+                executive_topic(executive_id),
+                lambda message: self.send_executive_local(executive_id, message)
+            )
+        self.presence[executive_id].add(websocket)
+        self.senders[websocket] = QueuedSender(
+            websocket,
+            self.metrics,
+            lambda: self.disconnect_executive(websocket)
+        )
+        self.executive_sockets[websocket] = executive_id
+        await self.executive_load.executive_connected(executive)
+        logger.info(f"Sales executive {executive.id} online for chat routing")
+
+    async def disconnect_executive(self, websocket: WebSocket):
+        sender = self.senders.pop(websocket, None)
+        if sender:
+            sender.close()
+        executive_id = self.executive_sockets.pop(websocket, None)
+        if executive_id is None:
+            return
+        await self.executive_load.executive_disconnected(executive_id)
+        sockets = self.presence.get(executive_id, set())
+        sockets.discard(websocket)
+        if not sockets and self.presence.pop(executive_id, None) is not None:
+            await get_backplane().unsubscribe(executive_topic(executive_id))
+
+    async def notify_executive(self, executive_id: int, message: dict):
+        """Send to the executive's presence sockets in this worker and, via the backplane, in others."""
+        await self.send_executive_local(executive_id, message)
+        await get_backplane().publish(executive_topic(executive_id), message)
+
+    async def send_executive_local(self, executive_id: int, message: dict):
+        for websocket in self.presence.get(executive_id, set()):
+            self.send(websocket, message)
+
+chat_manager = ChatManager()
@@ -0,0 +1,248 @@
+"""
+Routing of new chat sessions to the least-loaded online sales executive.
+
+Each worker keeps the load in memory (ExecutiveLoadTable) and picks from it
+without querying the database. Workers share their changes over the
+ROUTING_TOPIC backplane topic:
+
+- "presence": this worker's connection count for one executive, sent on
+  connect and disconnect
+- "load": one more or one fewer ACTIVE session of an executive, sent as
+  sessions are assigned and closed
+- "snapshot": all of this worker's connection counts, sent every
+  chat_load_resync_seconds, in answer to a starting worker's "hello" and,
+  empty, on shutdown
+
+Connections of a worker that sent no snapshot for two resync intervals are
+forgotten, so a crashed worker's executives go offline. Every resync also
+reloads the ACTIVE session counts with one GROUP BY, which corrects counts
+drifted by lost messages.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from services.backplane import WORKER_ID, get_backplane
+import database
+import models
+
+logger = logging.getLogger(__name__)
+
+ROUTING_TOPIC = "chat_routing"
+
+
+class OnlineExecutive:
+    __slots__ = ("user_id", "dealership_id", "branch_id", "connections")
+
+    def __init__(self, user_id: int, dealership_id: Optional[int], branch_id: Optional[int]):
+        self.user_id = user_id
+        self.dealership_id = dealership_id
+        self.branch_id = branch_id
+        # Connection count per worker id
+        self.connections: Dict[str, int] = {}
+
+
+class ExecutiveLoadTable:
+    """
+    In-memory load of sales executives for routing new chat sessions.
+
+    online holds executives with a ChatManager connection in any worker,
+    updated on connect and disconnect. active_sessions counts ACTIVE chat
+    sessions per executive, updated as sessions are assigned and closed.
+    """
+
+    def __init__(self):
+        self.online: Dict[int, OnlineExecutive] = {}
+        self.active_sessions: Dict[int, int] = {}
+        self._synced_at: Optional[float] = None
+        self._workers_seen: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _set_connections(
+        self,
+        worker_id: str,
+        user_id: int,
+        dealership_id: Optional[int],
+        branch_id: Optional[int],
+        connections: int
+    ) -> None:
+        executive = self.online.get(user_id)
+        if connections > 0:
+            if executive is None:
+                executive = self.online[user_id] = OnlineExecutive(user_id, dealership_id, branch_id)
+            executive.connections[worker_id] = connections
+        elif executive is not None:
+            executive.connections.pop(worker_id, None)
+            if not executive.connections:
+                del self.online[user_id]
+
+    def _local_connections(self, executive: OnlineExecutive) -> Dict[str, Any]:
+        return {
+            "user_id": executive.user_id,
+            "dealership_id": executive.dealership_id,
+            "branch_id": executive.branch_id,
+            "connections": executive.connections.get(WORKER_ID, 0),
+        }
+
+    def _add_load(self, user_id: int, change: int) -> None:
+        remaining = self.active_sessions.get(user_id, 0) + change
+        if remaining > 0:
+            self.active_sessions[user_id] = remaining
+        else:
+            self.active_sessions.pop(user_id, None)
+
+    async def _publish(self, message: Dict[str, Any]) -> None:
+        await get_backplane().publish(ROUTING_TOPIC, {**message, "worker": WORKER_ID})
+
+    async def executive_connected(self, user) -> None:
+        executive = self.online.get(user.id)
+        connections = executive.connections.get(WORKER_ID, 0) + 1 if executive else 1
+        self._set_connections(WORKER_ID, user.id, user.dealership_id, user.branch_id, connections)
+        await self._publish({"event": "presence", **self._local_connections(self.online[user.id])})
+
+    async def executive_disconnected(self, user_id: int) -> None:
+        executive = self.online.get(user_id)
+        if executive is None or WORKER_ID not in executive.connections:
+            return
+        self._set_connections(
+            WORKER_ID, user_id, executive.dealership_id, executive.branch_id,
+            executive.connections[WORKER_ID] - 1
+        )
+        await self._publish({"event": "presence", **self._local_connections(executive)})
+
+    async def session_assigned(self, user_id: int) -> None:
+        self._add_load(user_id, 1)
+        await self._publish({"event": "load", "user_id": user_id, "change": 1})
+
+    async def session_closed(self, user_id: int) -> None:
+        self._add_load(user_id, -1)
+        await self._publish({"event": "load", "user_id": user_id, "change": -1})
+
+    async def _on_message(self, message: Dict[str, Any]) -> None:
+        event = message.get("event")
+        worker_id = message.get("worker")
+        if event == "load":
+            self._add_load(message["user_id"], message["change"])
+        elif event == "presence":
+            self._workers_seen[worker_id] = time.monotonic()
+            self._set_connections(
+                worker_id, message["user_id"], message["dealership_id"],
+                message["branch_id"], message["connections"]
+            )
+        elif event == "snapshot":
+            self._workers_seen[worker_id] = time.monotonic()
+            self._forget_worker(worker_id)
+            for executive in message["executives"]:
+                self._set_connections(
+                    worker_id, executive["user_id"], executive["dealership_id"],
+                    executive["branch_id"], executive["connections"]
+                )
+        elif event == "hello":
+            await self._publish_snapshot()
+
+    def _forget_worker(self, worker_id: str) -> None:
+        for executive in list(self.online.values()):
+            self._set_connections(worker_id, executive.user_id, None, None, 0)
+
+    async def _publish_snapshot(self, executives: Optional[List[Dict[str, Any]]] = None) -> None:
+        if executives is None:
+            executives = [
+                self._local_connections(executive) for executive in self.online.values()
+                if WORKER_ID in executive.connections
+            ]
+        await self._publish({"event": "snapshot", "executives": executives})
+
+    async def _load_sessions(self, db: AsyncSession) -> None:
+        rows = (await db.execute(
+            select(models.ChatSession.employee_id, func.count()).filter(
+                models.ChatSession.status == "ACTIVE"
+            ).group_by(models.ChatSession.employee_id)
+        )).all()
+        self.active_sessions = {employee_id: count for employee_id, count in rows}
+        self._synced_at = time.monotonic()
+
+    async def resync(self) -> None:
+        """Reload session counts, announce this worker and forget silent workers."""
+        async with database.AsyncSessionLocal() as db:
+            await self._load_sessions(db)
+        await self._publish_snapshot()
+        stale_before = time.monotonic() - 2 * settings.chat_load_resync_seconds
+        for worker_id, seen_at in list(self._workers_seen.items()):
+            if seen_at < stale_before:
+                del self._workers_seen[worker_id]
+                self._forget_worker(worker_id)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.resync()
+            except Exception as e:
+                logger.error(f"Chat load resync failed: {str(e)}")
+            await asyncio.sleep(settings.chat_load_resync_seconds)
+
+    async def start(self) -> None:
+        """Join the other workers' load tables and keep this one in sync."""
+        await get_backplane().subscribe(ROUTING_TOPIC, self._on_message)
+        await self._publish({"event": "hello"})
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Other workers drop this worker's executives at once
+        await self._publish_snapshot([])
+        await get_backplane().unsubscribe(ROUTING_TOPIC)
+
+    async def _offline_candidates(
+        self,
+        db: AsyncSession,
+        dealership_id: Optional[int],
+        branch_id: Optional[int]
+    ) -> List[int]:
+        query = select(models.User.id).filter(
+            models.User.is_activated == True,
+            models.User.role == models.RoleEnum.sales_executive,
+            models.User.dealership_id == dealership_id
+        )
+        if branch_id is not None:
+            query = query.filter(models.User.branch_id == branch_id)
+        return list((await db.execute(query)).scalars().all())
+
+    async def pick(
+        self,
+        db: AsyncSession,
+        dealership_id: Optional[int],
+        branch_id: Optional[int]
+    ) -> Optional[int]:
+        """
+        Least-loaded online executive of the dealership (and branch, when
+        known), lowest id on ties. If none is online, the least-loaded
+        activated executive in scope, so the chat still gets an owner. None
+        when the scope has none.
+
+        The new session is counted against the executive before returning,
+        so concurrent picks spread out; call session_closed() if the session
+        is not created after all.
+        """
+        if self._synced_at is None:
+            await self._load_sessions(db)
+        candidates = [
+            executive.user_id for executive in self.online.values()
+            if executive.dealership_id == dealership_id
+            and (branch_id is None or executive.branch_id == branch_id)
+        ]
+        if not candidates:
+            candidates = await self._offline_candidates(db, dealership_id, branch_id)
+        if not candidates:
+            return None
+        user_id = min(candidates, key=lambda user_id: (self.active_sessions.get(user_id, 0), user_id))
+        await self.session_assigned(user_id)
+        return user_id
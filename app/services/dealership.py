@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 import models
+from core import user_cache
 from schemas import dealership
 
 def register_dealership_service(
@@ -34,9 +35,12 @@ def register_dealership_service(
     db.add_all(dealership_roles)
     db.commit()
 
-    # Link the dealership with the current admin user
-    current_user.dealership_id = dealership.id
+    # Link the dealership with the current admin user. current_user is the
+    # shared cached principal, so the row is updated and the cache refreshed
+    user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    user.dealership_id = dealership.id
     db.commit()
+    user_cache.invalidate(user.id)
 
     # Return a success message
     return {"message": "Dealership registered successfully", "dealership_id": dealership.id}
\ No newline at end of file
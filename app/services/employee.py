@@ -1,14 +1,17 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 import models
 from schemas import employee
-from schemas.employee import NotificationType
-from core.utils import hash, verify
+from core.utils import hash_async, verify_async
 from core.otp import generate_otp, send_otp
+from core import user_cache
 import random, string
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
-from core.notifications import send_email, send_sms, NotificationError
+from services import notification_outbox
 
 
 def get_user_notifications(
@@ -43,11 +46,11 @@ def get_user_notifications(
 async def notify_employee(
     employee_id: int,
     notification_data: employee.SingleNotification,
-    db: Session,
+    db: AsyncSession,
     current_user: models.User
 ) -> Dict[str, Any]:
     """
-    Send notification to a single employee
+    Queue an email and/or SMS notification to a single employee
     
     Args:
         employee_id: ID of employee to notify
@@ -56,10 +59,10 @@ async def notify_employee(
         current_user: Currently authenticated user
     
     Returns:
-        Dict containing success message or error details
+        Dict containing a confirmation message
     
     Raises:
-        HTTPException: For permission, validation or notification errors
+        HTTPException: For permission or validation errors
     """
     # Check permissions
     if current_user.role != models.RoleEnum.admin and current_user.id != employee_id:
@@ -69,10 +72,12 @@ async def notify_employee(
         )
     
     # Get employee
-    employee = db.query(models.User).filter(
-        models.User.id == employee_id,
-        models.User.dealership_id == current_user.dealership_id
-    ).first()
+    employee = (await db.execute(
+        select(models.User).filter(
+            models.User.id == employee_id,
+            models.User.dealership_id == current_user.dealership_id
+        )
+    )).scalars().first()
     
     if not employee:
         raise HTTPException(
@@ -80,59 +85,24 @@ async def notify_employee(
             detail=f"Employee with id {employee_id} not found"
         )
 
-    notification_sent = False
-    errors = []
-
-    try:
-        if notification_data.notification_type in [NotificationType.EMAIL, NotificationType.BOTH]:
-            if employee.email:
-                await send_email(
-                    to_email=employee.email,
-                    subject=notification_data.subject or "New Notification",
-                    message=notification_data.message,
-                    priority=notification_data.priority
-                )
-                notification_sent = True
-            else:
-                errors.append("Email address not available")
-
-        if notification_data.notification_type in [NotificationType.SMS, NotificationType.BOTH]:
-            if employee.phone_number:
-                await send_sms(
-                    to_phone=employee.phone_number,
-                    message=notification_data.message,
-                    priority=notification_data.priority
-                )
-                notification_sent = True
-            else:
-                errors.append("Phone number not available")
-
-        if not notification_sent:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Could not send notification: {', '.join(errors)}"
-            )
-
-        return {"message": "Notification sent successfully"}
-
-    except NotificationError as e:
+    jobs, errors = notification_outbox.build_jobs(employee, notification_data, current_user.id)
+    if not jobs:
         raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Notification delivery failed: {str(e)}"
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Server error while sending notification: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not send notification: {', '.join(errors)}"
         )
 
+    # Delivered by the outbox worker, with retries
+    await notification_outbox.enqueue(db, jobs)
+    return {"message": "Notification queued for delivery"}
+
 async def notify_batch_employees(
     notification_data: employee.BatchNotification,
-    db: Session,
+    db: AsyncSession,
     current_user: models.User
 ) -> Dict[str, Any]:
     """
-    Send notifications to multiple employees based on filters
+    Queue notifications to multiple employees based on filters
     
     Args:
         notification_data: Batch notification settings and content
@@ -140,7 +110,7 @@ async def notify_batch_employees(
         current_user: Currently authenticated user
         
     Returns:
-        Dict containing success/failure counts and details
+        Dict containing queued/failure counts and details
     
     Raises:
         HTTPException: For permission or validation errors
@@ -152,7 +122,7 @@ async def notify_batch_employees(
         )
 
     # Build query based on filters
-    query = db.query(models.User).filter(
+    query = select(models.User).filter(
         models.User.dealership_id == current_user.dealership_id
     )
 
@@ -164,7 +134,7 @@ async def notify_batch_employees(
     if filters.employee_ids:
         query = query.filter(models.User.id.in_(filters.employee_ids))
 
-    employees = query.all()
+    employees = (await db.execute(query)).scalars().all()
     if not employees:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -173,49 +143,24 @@ async def notify_batch_employees(
 
     results = {
         "total_employees": len(employees),
+        "queued_count": 0,
+        # Kept for existing clients; sends now happen later, so it counts
+        # queued notifications like queued_count
         "success_count": 0,
         "failure_count": 0,
         "failures": []
     }
 
+    jobs = []
     for employee in employees:
-        try:
-            if notification_data.notification_type in [NotificationType.EMAIL, NotificationType.BOTH]:
-                if employee.email:
-                    try:
-                        await send_email(
-                            to_email=employee.email,
-                            subject=notification_data.subject or "New Notification",
-                            message=notification_data.message,
-                            priority=notification_data.priority
-                        )
-                        results["success_count"] += 1
-                    except NotificationError as e:
-                        results["failures"].append(f"Employee {employee.id} email failed: {str(e)}")
-                        results["failure_count"] += 1
-                else:
-                    results["failures"].append(f"Employee {employee.id}: Email address not available")
-                    results["failure_count"] += 1
-
-            if notification_data.notification_type in [NotificationType.SMS, NotificationType.BOTH]:
-                if employee.phone_number:
-                    try:
-                        await send_sms(
-                            to_phone=employee.phone_number,
-                            message=notification_data.message,
-                            priority=notification_data.priority
-                        )
-                        results["success_count"] += 1
-                    except NotificationError as e:
-                        results["failures"].append(f"Employee {employee.id} SMS failed: {str(e)}")
-                        results["failure_count"] += 1
-                else:
-                    results["failures"].append(f"Employee {employee.id}: Phone number not available")
-                    results["failure_count"] += 1
-
-        except Exception as e:
-            results["failures"].append(f"Employee {employee.id}: Unexpected error: {str(e)}")
-            results["failure_count"] += 1
+        employee_jobs, errors = notification_outbox.build_jobs(employee, notification_data, current_user.id)
+        jobs.extend(employee_jobs)
+        results["failures"].extend(f"Employee {employee.id}: {error}" for error in errors)
+
+    # Delivered by the outbox worker, with retries
+    await notification_outbox.enqueue(db, jobs)
+    results["queued_count"] = results["success_count"] = len(jobs)
+    results["failure_count"] = len(results["failures"])
 
     # Only include failures list if there were any failures
     if not results["failures"]:
@@ -224,7 +169,7 @@ async def notify_batch_employees(
     return results
 
 
-def create_employee(employee_data: employee.EmployeeCreate, db: Session, current_user: models.User):
+async def create_employee(employee_data: employee.EmployeeCreate, db: AsyncSession, current_user: models.User):
     if current_user.role != models.RoleEnum.admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -232,7 +177,9 @@ def create_employee(employee_data: employee.EmployeeCreate, db: Session, current
         )
     
     # Check if email already exists
-    existing_user = db.query(models.User).filter(models.User.email == employee_data.email).first()
+    existing_user = (await db.execute(
+        select(models.User).filter(models.User.email == employee_data.email)
+    )).scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -241,10 +188,12 @@ def create_employee(employee_data: employee.EmployeeCreate, db: Session, current
     
     # Verify all branch_ids belong to the current dealership
     for branch_id in employee_data.branch_ids:
-        branch = db.query(models.Branch).filter(
-            models.Branch.id == branch_id,
-            models.Branch.dealership_id == current_user.dealership_id
-        ).first()
+        branch = (await db.execute(
+            select(models.Branch).filter(
+                models.Branch.id == branch_id,
+                models.Branch.dealership_id == current_user.dealership_id
+            )
+        )).scalars().first()
         if not branch:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -252,7 +201,7 @@ def create_employee(employee_data: employee.EmployeeCreate, db: Session, current
             )
     
     # Create employee user
-    hashed_password = hash(employee_data.password)
+    hashed_password = await hash_async(employee_data.password)
     employee_dict = employee_data.model_dump(exclude={'branch_ids', 'password'})
     new_employee = models.User(
         **employee_dict,
@@ -262,8 +211,8 @@ def create_employee(employee_data: employee.EmployeeCreate, db: Session, current
     )
     
     db.add(new_employee)
-    db.commit()
-    db.refresh(new_employee)
+    await db.commit()
+    await db.refresh(new_employee)
     
     return new_employee
 
@@ -289,6 +238,7 @@ def update_employee(employee_id: int, employee_data: employee.EmployeeUpdate, db
     
     employee_query.update(employee_data.model_dump(exclude_unset=True))
     db.commit()
+    user_cache.invalidate(employee_id)
     return employee_query.first()
 
 def delete_employee(employee_id: int, db: Session, current_user: models.User):
@@ -306,12 +256,15 @@ def delete_employee(employee_id: int, db: Session, current_user: models.User):
     
     employee_query.delete()
     db.commit()
+    user_cache.invalidate(employee_id)
     return {"message": "Employee deleted successfully"}
 
 
-def activate_employee_account(activation_data: employee.EmployeeActivation, db: Session):
+async def activate_employee_account(activation_data: employee.EmployeeActivation, db: AsyncSession):
     # Get the employee by email
-    employee = db.query(models.User).filter(models.User.email == activation_data.email).first()
+    employee = (await db.execute(
+        select(models.User).filter(models.User.email == activation_data.email)
+    )).scalars().first()
 
     if not employee:
         raise HTTPException(
@@ -320,7 +273,7 @@ def activate_employee_account(activation_data: employee.EmployeeActivation, db:
         )
     
     # Verify the current password
-    if not verify(activation_data.current_password, employee.password):
+    if not await verify_async(activation_data.current_password, employee.password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid current password"
@@ -339,11 +292,12 @@ def activate_employee_account(activation_data: employee.EmployeeActivation, db:
     if not employee.phone_number:
         employee.phone_number = activation_data.phone_number
     
-    employee.password = hash(activation_data.new_password)
+    employee.password = await hash_async(activation_data.new_password)
     employee.is_activated = True  # Mark account as activated
     
     
-    db.commit()
+    await db.commit()
+    await run_in_threadpool(user_cache.invalidate, employee.id)
     return {"message": "Account activated successfully"}
     
 
@@ -398,6 +352,7 @@ def update_employee_role(
     # Update the role
     employee.role = role_update.role
     db.commit()
+    user_cache.invalidate(employee_id)
     db.refresh(employee)
     
     return employee
@@ -427,7 +382,7 @@ def get_available_roles(db: Session, current_user: models.User):
 
 async def create_in_app_notification(
     notification_data: employee.NotificationCreate, 
-    db: Session,
+    db: AsyncSession,
     current_user: models.User = None
 ) -> models.Notification:
     """
@@ -453,8 +408,8 @@ async def create_in_app_notification(
     )
     
     db.add(new_notification)
-    db.commit()
-    db.refresh(new_notification)
+    await db.commit()
+    await db.refresh(new_notification)
     
     # Prepare notification data for WebSocket broadcast
     websocket_data = {
@@ -0,0 +1,234 @@
+from sqlalchemy import func, insert, literal, select, true, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session, selectinload
+from fastapi.encoders import jsonable_encoder
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple
+import json
+import models
+import database
+from core import pagination
+
+# Rows pulled per round trip from the server-side cursor when streaming
+STREAM_BATCH_SIZE = 500
+
+
+def _form_instances_query(db: Session, dealership_id: int):
+    """
+    Base query for a dealership's form instances with the customer eager
+    loaded. Responses come from the snapshot columns on the row itself, so
+    the number of round trips does not grow with the number of forms.
+    """
+    return (
+        db.query(models.FormInstance)
+        .filter(models.FormInstance.dealership_id == dealership_id)
+        .options(selectinload(models.FormInstance.customer))
+    )
+
+
+SNAPSHOT_COLUMNS = {
+    models.FilledByEnum.customer.value: "customer_snapshot",
+    models.FilledByEnum.sales_executive.value: "sales_snapshot",
+}
+
+
+def bulk_insert_responses(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Insert form_responses rows given as dicts of column values.
+
+    A single executemany-style INSERT lets SQLAlchemy batch the rows into
+    multi-row VALUES statements instead of flushing one ORM object at a
+    time, which also suits batch imports with thousands of rows.
+    """
+    if rows:
+        db.execute(insert(models.FormResponse), rows)
+
+
+def append_response_snapshot(
+    db: Session,
+    form_instance: models.FormInstance,
+    filled_by: str,
+    field_names: Dict[int, str],
+    rows: List[Dict[str, Any]]
+) -> None:
+    """
+    Mirror newly added responses into the instance's JSONB snapshot so they
+    are committed in the same transaction as the form_responses rows.
+
+    The append is a single UPDATE ... SET col = coalesce(col, '[]') || entries,
+    so overlapping submissions for one instance each add their entries
+    instead of overwriting each other's read-modify-write.
+    """
+    if not rows:
+        return
+    column_name = SNAPSHOT_COLUMNS[filled_by]
+    column = getattr(models.FormInstance, column_name)
+    entries = [
+        {"field_name": field_names[row["form_field_id"]], "value": row["value"]}
+        for row in rows
+    ]
+    db.execute(
+        update(models.FormInstance)
+        .where(models.FormInstance.id == form_instance.id)
+        .values({
+            column: func.coalesce(column, literal([], JSONB)).op("||", return_type=JSONB)(literal(entries, JSONB))
+        })
+        .execution_options(synchronize_session=False)
+    )
+    # Reloaded from the row on next access
+    db.expire(form_instance, [column_name])
+
+
+def save_responses(
+    db: Session,
+    form_instance: models.FormInstance,
+    filled_by: str,
+    field_names: Dict[int, str],
+    rows: List[Dict[str, Any]]
+) -> None:
+    """Write response rows and their snapshot; the caller commits."""
+    bulk_insert_responses(db, rows)
+    append_response_snapshot(db, form_instance, filled_by, field_names, rows)
+
+
+def sales_verified_query(db: Session, dealership_id: int):
+    return _form_instances_query(db, dealership_id).filter(
+        models.FormInstance.status.in_([
+            models.FormStatusEnum.sales_verified.value,
+            models.FormStatusEnum.accounts_verified.value,
+        ])
+    )
+
+
+def serialize_sales_verified(form_instance: models.FormInstance) -> Dict[str, Any]:
+    customer = form_instance.customer
+
+    # Prepare customer details dictionary with default values if customer is None
+    customer_details = {
+        "total_price": customer.total_price if customer else None,
+        "amount_paid": customer.amount_paid if customer else None,
+        "balance_amount": customer.balance_amount if customer else None,
+    }
+
+    return {
+        "form_instance_id": form_instance.id,
+        "customer_name": form_instance.customer_name,
+        "customer_data": form_instance.customer_snapshot or [],
+        "sales_data": form_instance.sales_snapshot or [],
+        "customer_details": customer_details
+    }
+
+
+def customer_submitted_query(db: Session, dealership_id: int):
+    return _form_instances_query(db, dealership_id).filter(
+        models.FormInstance.status == models.FormStatusEnum.customer_submitted.value
+    )
+
+
+def serialize_customer_submitted(form_instance: models.FormInstance) -> Dict[str, Any]:
+    return {
+        "form_instance_id": form_instance.id,
+        "customer_name": form_instance.customer_name,
+        "customer_submitted_at": form_instance.customer_submitted_at,
+        "customer_data": form_instance.customer_snapshot or []
+    }
+
+
+def pending_accounts_query(db: Session, dealership_id: int):
+    """
+    Finance queue: sales verified forms of a dealership not yet verified by
+    accounts, with customer amounts and vehicle name in a single join.
+
+    Served by the partial ix_form_instances_sales_verified_queue index, so a
+    page costs the same however many forms other dealerships or stages hold.
+    Forms without a customer are left out; a form with several customer rows
+    is listed once, with its first customer, so keyset pages stay stable.
+    """
+    customer = (
+        select(
+            models.Customer.total_price,
+            models.Customer.amount_paid,
+            models.Customer.balance_amount,
+            models.Customer.vehicle_id,
+        )
+        .where(models.Customer.form_instance_id == models.FormInstance.id)
+        .order_by(models.Customer.id)
+        .limit(1)
+        .lateral("customer")
+    )
+    return (
+        db.query(
+            models.FormInstance.id,
+            models.FormInstance.created_at,
+            models.FormInstance.customer_name,
+            customer.c.total_price,
+            customer.c.amount_paid,
+            customer.c.balance_amount,
+            models.Vehicle.name.label("vehicle_name"),
+        )
+        # The lateral is the only joined target, so the left side must be named
+        .select_from(models.FormInstance)
+        .join(customer, true())
+        .outerjoin(models.Vehicle, models.Vehicle.id == customer.c.vehicle_id)
+        .filter(
+            models.FormInstance.dealership_id == dealership_id,
+            models.FormInstance.status == models.FormStatusEnum.sales_verified.value
+        )
+    )
+
+
+def serialize_pending_accounts(row) -> Dict[str, Any]:
+    return {
+        "form_instance_id": row.id,
+        "customer_name": row.customer_name,
+        "total_price": row.total_price,
+        "amount_paid": row.amount_paid,
+        "balance_amount": row.balance_amount,
+        "vehicle_name": row.vehicle_name
+    }
+
+
+def paginate_forms(
+    query,
+    serializer: Callable[[models.FormInstance], Dict[str, Any]],
+    limit: int = pagination.DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One keyset page of form instances, newest first on (created_at, id).
+    """
+    return pagination.paginate(
+        query,
+        models.FormInstance.created_at,
+        models.FormInstance.id,
+        serializer,
+        limit=limit,
+        after=after,
+    )
+
+
+def stream_forms(
+    query_factory: Callable[[Session], Any],
+    serializer: Callable[[models.FormInstance], Dict[str, Any]],
+    after: Optional[str] = None,
+    bind=None,
+) -> Iterator[str]:
+    """
+    Yield form instances as NDJSON lines read from a server-side cursor.
+
+    The generator owns its session because the request scoped one is closed
+    before a streaming body is sent. Rows are fetched STREAM_BATCH_SIZE at a
+    time, and eager loads run per batch, so memory stays flat. bind selects
+    the engine (e.g. the read replica), defaulting to the primary.
+    """
+    db = database.SessionLocal(bind=bind) if bind is not None else database.SessionLocal()
+    try:
+        query = pagination.apply_keyset(
+            query_factory(db),
+            models.FormInstance.created_at,
+            models.FormInstance.id,
+            after,
+        ).yield_per(STREAM_BATCH_SIZE)
+        for form_instance in query:
+            yield json.dumps(jsonable_encoder(serializer(form_instance))) + "\n"
+    finally:
+        db.close()
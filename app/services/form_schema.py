@@ -0,0 +1,292 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+import models
+from config import settings
+
+
+AMOUNT_QUANTUM = Decimal("0.01")
+# Significant digits and decimal places a number may have: the precision of
+# the default decimal context, beyond which normalize() and quantize() round
+# or fail, and a bound on the length of the formatted value
+MAX_NUMBER_DIGITS = 28
+
+
+def _to_decimal(value: Any) -> Decimal:
+    if isinstance(value, bool):
+        raise ValueError("must be a number")
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError("must be a number")
+    if not number.is_finite():
+        raise ValueError("must be a finite number")
+    # Checked before any arithmetic or formatting, e.g. of "1e999999"
+    if (
+        len(number.as_tuple().digits) > MAX_NUMBER_DIGITS
+        or not -MAX_NUMBER_DIGITS <= number.adjusted() < MAX_NUMBER_DIGITS
+    ):
+        raise ValueError(f"must have at most {MAX_NUMBER_DIGITS} digits")
+    return number
+
+
+def _coerce_text(value: Any) -> str:
+    return str(value)
+
+
+def _coerce_number(value: Any) -> str:
+    return format(_to_decimal(value).normalize(), "f")
+
+
+def _coerce_amount(value: Any) -> str:
+    amount = _to_decimal(value)
+    if amount < 0:
+        raise ValueError("must not be negative")
+    try:
+        quantized = amount.quantize(AMOUNT_QUANTUM)
+    except InvalidOperation:
+        # More integer digits than the context precision leaves room for
+        raise ValueError("is too large")
+    if amount != quantized:
+        raise ValueError("must have at most 2 decimal places")
+    return str(quantized)
+
+
+def _coerce_date(value: Any) -> str:
+    try:
+        return date.fromisoformat(str(value).strip()).isoformat()
+    except ValueError:
+        raise ValueError("must be a date in YYYY-MM-DD format")
+
+
+def _coerce_vehicle(value: Any) -> str:
+    if isinstance(value, bool):
+        raise ValueError("must be a vehicle id")
+    try:
+        return str(int(str(value).strip()))
+    except ValueError:
+        raise ValueError("must be a vehicle id")
+
+
+# Normalized string form stored in FormResponse.value for each field type, so
+# reports can cast values in SQL (::numeric, ::date, ::int) without parsing rows
+_COERCERS = {
+    models.FieldTypeEnum.text.value: _coerce_text,
+    models.FieldTypeEnum.number.value: _coerce_number,
+    models.FieldTypeEnum.amount.value: _coerce_amount,
+    models.FieldTypeEnum.date.value: _coerce_date,
+    models.FieldTypeEnum.vehicle.value: _coerce_vehicle,
+}
+
+
+@dataclass(frozen=True)
+class CompiledField:
+    id: int
+    name: str
+    field_type: str
+    is_required: bool
+    filled_by: str
+    order: int
+
+    @property
+    def is_image(self) -> bool:
+        return self.field_type == models.FieldTypeEnum.image.value
+
+    @property
+    def is_vehicle(self) -> bool:
+        return self.field_type == models.FieldTypeEnum.vehicle.value
+
+    def coerce(self, value: Any) -> str:
+        """Normalized value for storage, raising ValueError if it does not parse."""
+        return _COERCERS.get(self.field_type, _coerce_text)(value)
+
+
+@dataclass(frozen=True)
+class FieldGroup:
+    """The fields of a template filled by one party (customer or sales executive)."""
+    fields: Tuple[CompiledField, ...]
+    by_name: Mapping[str, CompiledField]
+    field_names: Mapping[int, str]
+    required_values: Tuple[str, ...]
+    required_images: Tuple[CompiledField, ...]
+    # (lowercased name, field) of image fields, for matching uploaded filenames
+    image_index: Tuple[Tuple[str, CompiledField], ...]
+
+    @classmethod
+    def build(cls, fields: Sequence[CompiledField]) -> "FieldGroup":
+        fields = tuple(fields)
+        return cls(
+            fields=fields,
+            by_name=MappingProxyType({field.name: field for field in fields}),
+            field_names=MappingProxyType({field.id: field.name for field in fields}),
+            required_values=tuple(
+                field.name for field in fields if field.is_required and not field.is_image
+            ),
+            required_images=tuple(field for field in fields if field.is_required and field.is_image),
+            image_index=tuple((field.name.lower(), field) for field in fields if field.is_image),
+        )
+
+    def match_files(self, files: Optional[List[UploadFile]]) -> Dict[str, UploadFile]:
+        """
+        First uploaded file whose name contains an image field's name
+        (case-insensitive), keyed by field name, in one pass over the files.
+        """
+        matches: Dict[str, UploadFile] = {}
+        for file in files or []:
+            filename = file.filename.lower()
+            for name, field in self.image_index:
+                if name in filename and field.name not in matches:
+                    matches[field.name] = file
+        return matches
+
+    def parse_submission(
+        self,
+        data_dict: Dict[str, Any],
+        files: Optional[List[UploadFile]]
+    ) -> Tuple[List[Tuple[CompiledField, Any]], List[Tuple[CompiledField, UploadFile]]]:
+        """
+        Validate a submission against the group and split it into
+        (field, value) pairs for plain fields and (field, file) pairs for images.
+        """
+        image_files = self.match_files(files)
+
+        # Validate all required fields are present first
+        for field in self.required_images:
+            if field.name not in image_files:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Required image file missing or not matching: {field.name}"
+                )
+        for name in self.required_values:
+            if name not in data_dict:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Required field missing: {name}"
+                )
+
+        values = []
+        for field_name, value in data_dict.items():
+            field = self.by_name.get(field_name)
+            if not field:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unexpected field: {field_name}"
+                )
+            if not field.is_image:
+                values.append((field, value))
+
+        images = [(self.by_name[name], file) for name, file in image_files.items()]
+        return values, images
+
+    def normalize_values(
+        self,
+        values: List[Tuple[CompiledField, Any]],
+        db: Session,
+        dealership_id: Optional[int]
+    ) -> List[Tuple[CompiledField, str]]:
+        """
+        Type check and normalize every plain value of a submission at once.
+
+        All errors are reported together, and vehicle ids are resolved with
+        a single query against the dealership's vehicles.
+        """
+        normalized = []
+        errors = []
+        for field, value in values:
+            try:
+                normalized.append((field, field.coerce(value)))
+            except ValueError as e:
+                errors.append(f"{field.name}: {e}")
+
+        vehicle_ids = {int(value) for field, value in normalized if field.is_vehicle}
+        if vehicle_ids:
+            query = db.query(models.Vehicle.id).filter(models.Vehicle.id.in_(vehicle_ids))
+            if dealership_id is not None:
+                query = query.filter(models.Vehicle.dealership_id == dealership_id)
+            known = {vehicle_id for vehicle_id, in query.all()}
+            errors.extend(
+                f"{field.name}: unknown vehicle {value}"
+                for field, value in normalized
+                if field.is_vehicle and int(value) not in known
+            )
+
+        if errors:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=errors
+            )
+        return normalized
+
+
+@dataclass(frozen=True)
+class CompiledFormSchema:
+    template_id: int
+    customer: FieldGroup
+    sales: FieldGroup
+
+    def group(self, filled_by: str) -> FieldGroup:
+        if filled_by == models.FilledByEnum.customer.value:
+            return self.customer
+        return self.sales
+
+
+# template_id -> (compiled at, schema). Entries also expire after a TTL so
+# workers that did not see an invalidation pick up new fields eventually.
+_cache: Dict[int, Tuple[float, CompiledFormSchema]] = {}
+_cache_lock = threading.Lock()
+
+
+def compile_form_schema(template_id: int, fields: Sequence[models.FormField]) -> CompiledFormSchema:
+    compiled = sorted(
+        (
+            CompiledField(
+                id=field.id,
+                name=field.name,
+                field_type=models.FieldTypeEnum(field.field_type).value,
+                is_required=bool(field.is_required),
+                filled_by=models.FilledByEnum(field.filled_by).value,
+                order=field.order,
+            )
+            for field in fields
+        ),
+        key=lambda field: (field.order, field.id)
+    )
+    return CompiledFormSchema(
+        template_id=template_id,
+        customer=FieldGroup.build(
+            field for field in compiled if field.filled_by == models.FilledByEnum.customer.value
+        ),
+        sales=FieldGroup.build(
+            field for field in compiled if field.filled_by == models.FilledByEnum.sales_executive.value
+        ),
+    )
+
+
+def get_form_schema(db: Session, template_id: int) -> CompiledFormSchema:
+    """
+    Compiled schema of a template, querying its fields only on a cache miss.
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(template_id)
+    if entry and now - entry[0] < settings.form_schema_cache_ttl:
+        return entry[1]
+
+    fields = db.query(models.FormField).filter(
+        models.FormField.template_id == template_id
+    ).all()
+    schema = compile_form_schema(template_id, fields)
+    with _cache_lock:
+        _cache[template_id] = (now, schema)
+    return schema
+
+
+def invalidate_form_schema(template_id: int) -> None:
+    with _cache_lock:
+        _cache.pop(template_id, None)
@@ -0,0 +1,209 @@
+"""
+Notification outbox: the API enqueues email/SMS jobs in notification_outbox
+and this worker delivers them, so SMTP or Twilio latency never reaches a
+request. Run one or more workers next to the API (from the app directory):
+
+    python -m services.notification_outbox
+
+Workers claim due jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number
+can run at once without sending a job twice. Claiming is its own short
+transaction: it counts the attempt and moves next_attempt_at OUTBOX_LEASE
+ahead, and commits before anything is sent, so no row lock or transaction
+is held while SMTP or Twilio respond. The outcomes are recorded in a second
+short transaction. A job whose worker dies mid-batch becomes due again once
+its lease runs out.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+import database
+import models
+from config import settings
+from core.notifications import send_email, send_sms, NotificationError, gather_bounded
+from schemas.employee import NotificationType
+
+logger = logging.getLogger(__name__)
+
+# Jobs claimed per transaction, and idle wait between polls when none are due
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_POLL_INTERVAL = 5
+# How long a claimed job is left to its worker before others may retry it
+OUTBOX_LEASE = timedelta(minutes=5)
+
+
+def build_jobs(
+    employee: models.User,
+    notification_data: Any,
+    sender_id: Optional[int]
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Outbox rows for one employee and the channels requested, plus an error
+    for each requested channel the employee has no address for.
+    """
+    jobs = []
+    errors = []
+    channels = []
+    if notification_data.notification_type in [NotificationType.EMAIL, NotificationType.BOTH]:
+        channels.append((NotificationType.EMAIL, employee.email, "Email address not available"))
+    if notification_data.notification_type in [NotificationType.SMS, NotificationType.BOTH]:
+        channels.append((NotificationType.SMS, employee.phone_number, "Phone number not available"))
+
+    for channel, destination, missing in channels:
+        if not destination:
+            errors.append(missing)
+            continue
+        jobs.append({
+            "recipient_id": employee.id,
+            "sender_id": sender_id,
+            "channel": channel.value,
+            "destination": destination,
+            "subject": (notification_data.subject or "New Notification") if channel == NotificationType.EMAIL else None,
+            "message": notification_data.message,
+            "priority": notification_data.priority.value,
+        })
+    return jobs, errors
+
+
+async def enqueue(db: AsyncSession, jobs: List[Dict[str, Any]]) -> None:
+    """Insert jobs in one executemany and commit."""
+    if jobs:
+        await db.execute(insert(models.NotificationOutbox), jobs)
+    await db.commit()
+
+
+async def deliver(job) -> None:
+    if job.channel == NotificationType.EMAIL.value:
+        await send_email(
+            to_email=job.destination,
+            subject=job.subject,
+            message=job.message,
+            priority=job.priority
+        )
+    else:
+        await send_sms(
+            to_phone=job.destination,
+            message=job.message,
+            priority=job.priority
+        )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff from notification_retry_delay after the nth failed attempt."""
+    return timedelta(seconds=settings.notification_retry_delay * 2 ** (attempts - 1))
+
+
+def outcome_values(attempts: int, error: Optional[str]) -> Dict[str, Any]:
+    """
+    Column values recording the outcome of a job's attempts-th attempt:
+    sent, retried after retry_delay, or failed once notification_retry_attempts
+    attempts have been made.
+    """
+    if error is None:
+        return {
+            "status": models.OutboxStatusEnum.sent.value,
+            "sent_at": func.now(),
+            "last_error": None,
+        }
+    if attempts >= settings.notification_retry_attempts:
+        return {
+            "status": models.OutboxStatusEnum.failed.value,
+            "last_error": error,
+        }
+    return {
+        "next_attempt_at": func.now() + retry_delay(attempts),
+        "last_error": error,
+    }
+
+
+async def claim_batch(db: AsyncSession) -> List[Any]:
+    """
+    Claim up to OUTBOX_BATCH_SIZE due jobs and commit. Each claimed job has
+    its attempt counted and is leased for OUTBOX_LEASE; the returned rows are
+    plain values, not session-bound instances.
+    """
+    outbox = models.NotificationOutbox
+    due = select(outbox.id).filter(
+        outbox.status == models.OutboxStatusEnum.pending.value,
+        outbox.next_attempt_at <= func.now()
+    ).order_by(
+        outbox.next_attempt_at,
+        outbox.id
+    ).limit(OUTBOX_BATCH_SIZE).with_for_update(skip_locked=True)
+    jobs = (await db.execute(
+        update(outbox)
+        .where(outbox.id.in_(due.scalar_subquery()))
+        .values(attempts=outbox.attempts + 1, next_attempt_at=func.now() + OUTBOX_LEASE)
+        .returning(
+            outbox.id, outbox.channel, outbox.destination, outbox.subject,
+            outbox.message, outbox.priority, outbox.attempts
+        )
+        .execution_options(synchronize_session=False)
+    )).all()
+    await db.commit()
+    return jobs
+
+
+async def record_outcomes(db: AsyncSession, jobs: List[Any], errors: List[Optional[str]]) -> None:
+    """
+    Store the outcome of each job's attempt and commit. A job whose lease ran
+    out and was claimed again meanwhile (attempts moved on) is left to its new
+    claimant.
+    """
+    outbox = models.NotificationOutbox
+    for job, error in zip(jobs, errors):
+        if error is not None and job.attempts >= settings.notification_retry_attempts:
+            logger.error(f"Outbox job {job.id} failed after {job.attempts} attempts: {error}")
+        await db.execute(
+            update(outbox)
+            .where(outbox.id == job.id, outbox.attempts == job.attempts)
+            .values(**outcome_values(job.attempts, error))
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+
+
+async def process_batch(db: AsyncSession) -> int:
+    """
+    Claim due jobs, send them concurrently outside any transaction, and
+    record the outcome of each. Returns the number of jobs claimed.
+    """
+    jobs = await claim_batch(db)
+    if not jobs:
+        return 0
+
+    async def attempt(job) -> Optional[str]:
+        try:
+            await deliver(job)
+            return None
+        except NotificationError as e:
+            return str(e)
+        except Exception as e:
+            logger.error(f"Unexpected error delivering outbox job {job.id}: {str(e)}")
+            return f"Unexpected error: {str(e)}"
+
+    errors = await gather_bounded((attempt(job) for job in jobs), settings.notification_concurrency)
+    await record_outcomes(db, jobs, errors)
+    return len(jobs)
+
+
+async def run_worker() -> None:
+    logger.info("Notification outbox worker started")
+    while True:
+        try:
+            async with database.AsyncSessionLocal() as db:
+                claimed = await process_batch(db)
+        except Exception as e:
+            logger.error(f"Notification outbox worker error: {str(e)}", exc_info=True)
+            claimed = 0
+        # Keep draining while there is a backlog
+        if claimed < OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(OUTBOX_POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker())
@@ -0,0 +1,306 @@
+import asyncio
+import functools
+import hashlib
+import hmac
+import logging
+import os
+import posixpath
+import shutil
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError, NoCredentialsError
+from fastapi import HTTPException, UploadFile, status
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Files above the threshold are sent as multipart uploads in chunks of this size
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD,
+    multipart_chunksize=MULTIPART_CHUNKSIZE,
+    max_concurrency=4,
+)
+
+# Bounded pool the blocking storage calls run on, so they never run on the event loop
+_storage_executor = ThreadPoolExecutor(
+    max_workers=settings.upload_concurrency,
+    thread_name_prefix="storage"
+)
+
+
+async def _run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_storage_executor, functools.partial(func, *args, **kwargs))
+
+
+class StorageBackend(ABC):
+    """
+    Object storage for uploaded form files. Keys are relative paths such as
+    "forms/12/<uuid>.jpg"; url() gives the address stored in FormResponse.
+    """
+
+    @abstractmethod
+    async def put(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> str:
+        """Store the contents of a file object under key and return its URL."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        """Return the contents stored under key, raising KeyError if missing."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove key; deleting a missing key is not an error."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under key."""
+
+    @abstractmethod
+    async def presign(self, key: str, content_type: Optional[str] = None) -> str:
+        """URL a client can PUT the object to directly, valid for upload_url_expiry_seconds."""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public URL of key."""
+
+
+class S3Backend(StorageBackend):
+    def __init__(self, bucket_name: str, endpoint_url: Optional[str] = None):
+        self.bucket_name = bucket_name
+        self.endpoint_url = endpoint_url
+        # boto3 clients are thread safe; the connection pool is sized so every
+        # storage worker (and its multipart parts) gets a socket
+        self.client = boto3.client(
+            's3',
+            aws_access_key_id=settings.AWS_SERVER_PUBLIC_KEY,
+            aws_secret_access_key=settings.AWS_SERVER_SECRET_KEY,
+            endpoint_url=endpoint_url,
+            config=Config(max_pool_connections=settings.upload_concurrency * TRANSFER_CONFIG.max_request_concurrency),
+        )
+
+    def _upload_fileobj(self, fileobj: BinaryIO, key: str, content_type: Optional[str]) -> None:
+        extra_args = {"ContentType": content_type} if content_type else None
+        self.client.upload_fileobj(fileobj, self.bucket_name, key, ExtraArgs=extra_args, Config=TRANSFER_CONFIG)
+
+    def _get(self, key: str) -> bytes:
+        try:
+            return self.client.get_object(Bucket=self.bucket_name, Key=key)["Body"].read()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise KeyError(key)
+            raise
+
+    def _exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket_name, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def put(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> str:
+        await _run_blocking(self._upload_fileobj, fileobj, key, content_type)
+        return self.url(key)
+
+    async def get(self, key: str) -> bytes:
+        return await _run_blocking(self._get, key)
+
+    async def delete(self, key: str) -> None:
+        await _run_blocking(self.client.delete_object, Bucket=self.bucket_name, Key=key)
+
+    async def exists(self, key: str) -> bool:
+        return await _run_blocking(self._exists, key)
+
+    async def presign(self, key: str, content_type: Optional[str] = None) -> str:
+        # Signing is a local computation, no need for the executor
+        params = {"Bucket": self.bucket_name, "Key": key}
+        if content_type:
+            params["ContentType"] = content_type
+        return self.client.generate_presigned_url(
+            "put_object",
+            Params=params,
+            ExpiresIn=settings.upload_url_expiry_seconds,
+        )
+
+    def url(self, key: str) -> str:
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket_name}/{key}"
+        return f"https://{self.bucket_name}.s3.amazonaws.com/{key}"
+
+
+class ApiServedBackend(StorageBackend):
+    """
+    Base for backends without their own HTTP server. Objects are read and
+    presigned uploads are accepted by the /storage routes of this API, with
+    upload URLs signed by an HMAC of the key and expiry.
+    """
+
+    def url(self, key: str) -> str:
+        return f"{settings.public_base_url.rstrip('/')}/storage/{quote(key)}"
+
+    @staticmethod
+    def signature(key: str, expires: int) -> str:
+        message = f"{key}:{expires}".encode()
+        return hmac.new(settings.secret_key.encode(), message, hashlib.sha256).hexdigest()
+
+    def verify_signature(self, key: str, expires: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self.signature(key, expires), signature)
+
+    async def presign(self, key: str, content_type: Optional[str] = None) -> str:
+        expires = int(time.time()) + settings.upload_url_expiry_seconds
+        query = urlencode({"expires": expires, "signature": self.signature(key, expires)})
+        return f"{self.url(key)}?{query}"
+
+
+class LocalBackend(ApiServedBackend):
+    """Stores objects as files under a root directory."""
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _put(self, key: str, fileobj: BinaryIO) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+
+    def _get(self, key: str) -> bytes:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def _delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def put(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> str:
+        await _run_blocking(self._put, key, fileobj)
+        return self.url(key)
+
+    async def get(self, key: str) -> bytes:
+        return await _run_blocking(self._get, key)
+
+    async def delete(self, key: str) -> None:
+        await _run_blocking(self._delete, key)
+
+    async def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+
+class MemoryBackend(ApiServedBackend):
+    """Keeps objects in a dict; for tests and benchmarks in a single process."""
+
+    def __init__(self):
+        self.objects: Dict[str, bytes] = {}
+
+    async def put(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> str:
+        self.objects[key] = fileobj.read()
+        return self.url(key)
+
+    async def get(self, key: str) -> bytes:
+        return self.objects[key]
+
+    async def delete(self, key: str) -> None:
+        self.objects.pop(key, None)
+
+    async def exists(self, key: str) -> bool:
+        return key in self.objects
+
+
+@functools.lru_cache(maxsize=None)
+def get_storage() -> StorageBackend:
+    """The storage backend selected by settings.storage_backend."""
+    if settings.storage_backend == "s3":
+        return S3Backend(settings.s3_bucket_name, settings.s3_endpoint_url)
+    if settings.storage_backend == "local":
+        return LocalBackend(settings.local_storage_path)
+    if settings.storage_backend == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
+
+
+def form_upload_prefix(form_instance_id: int) -> str:
+    """Key prefix every directly uploaded image of a form instance lives under."""
+    return f"forms/{form_instance_id}/"
+
+
+def normalize_form_upload_key(form_instance_id: int, key: str) -> Optional[str]:
+    """
+    The normalized form of a client supplied upload key, or None unless it
+    is a plain relative key under the form's upload prefix. Keys with ".."
+    segments, a leading "/" or NUL bytes are rejected outright, so one form
+    cannot reference another form's objects.
+    """
+    if not key or key.startswith("/") or "\0" in key or ".." in key.split("/"):
+        return None
+    normalized = posixpath.normpath(key)
+    prefix = form_upload_prefix(form_instance_id)
+    if not normalized.startswith(prefix):
+        return None
+    return normalized
+
+
+async def objects_exist(keys: List[str]) -> List[bool]:
+    """Check concurrently whether each key has been uploaded."""
+    storage = get_storage()
+    return await asyncio.gather(*(storage.exists(key) for key in keys))
+
+
+async def upload_file(file: UploadFile, key: str) -> str:
+    """
+    Store an UploadFile and return its URL.
+
+    The underlying spooled file is streamed as is (no in-memory copy), on
+    the storage executor rather than the event loop thread.
+    """
+    try:
+        file.file.seek(0)
+        return await get_storage().put(key, file.file, file.content_type)
+    except NoCredentialsError:
+        logger.error("S3 credentials not available")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="S3 credentials not available")
+    except Exception as e:
+        logger.error(f"Error uploading image: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error uploading image")
+
+
+async def upload_files(uploads: List[Tuple[UploadFile, str]]) -> List[str]:
+    """
+    Upload several (file, key) pairs concurrently, returning URLs in input order.
+
+    Overall latency is roughly that of the slowest single upload, with
+    concurrency bounded by the executor size. A file object listed more than
+    once (one upload matching several image fields) is uploaded once, under
+    its first key, and every pair gets that URL: concurrent uploads would
+    otherwise seek and read the same file from several threads.
+    """
+    distinct: Dict[int, Tuple[UploadFile, str]] = {}
+    for file, key in uploads:
+        distinct.setdefault(id(file), (file, key))
+    urls = await asyncio.gather(*(
+        upload_file(file, key) for file, key in distinct.values()
+    ))
+    url_by_file = dict(zip(distinct, urls))
+    return [url_by_file[id(file)] for file, _ in uploads]
@@ -1,41 +1,68 @@
 import asyncio
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List
+from typing import Any, Dict, List
+from services.backplane import get_backplane
+from services.ws_sender import QueuedSender
+from core import metrics
+
+
+def user_topic(user_id: int) -> str:
+    return f"ws_user_{user_id}"
+
 
 class NotificationManager:
+    """
+    Notification sockets of this worker. Messages for users connected to
+    other workers travel over the backplane, subscribed per connected user.
+    Each socket is written by its own task from a bounded queue.
+    """
     def __init__(self):
         self.active_connections: Dict[int, List[WebSocket]] = {}
+        self.senders: Dict[WebSocket, QueuedSender] = {}
+        self.metrics = metrics.register_send_queues("notifications")
 
     async def connect(self, websocket: WebSocket, user_id: int):
         try:
             await websocket.accept()
             if user_id not in self.active_connections:
                 self.active_connections[user_id] = []
+                await get_backplane().subscribe(
+                    user_topic(user_id),
+                    lambda message: self.send_local(user_id, message)
+                )
             self.active_connections[user_id].append(websocket)
+            self.senders[websocket] = QueuedSender(
+                websocket,
+                self.metrics,
+                lambda: self.disconnect(websocket, user_id)
+            )
         except Exception as e:
             print(f"Error connecting websocket: {str(e)}")
             await websocket.close(code=1011)
 
-    def disconnect(self, websocket: WebSocket, user_id: int):
+    async def disconnect(self, websocket: WebSocket, user_id: int):
+        sender = self.senders.pop(websocket, None)
+        if sender:
+            sender.close()
         try:
-            if user_id in self.active_connections:
+            if websocket in self.active_connections.get(user_id, []):
                 self.active_connections[user_id].remove(websocket)
                 if not self.active_connections[user_id]:
                     del self.active_connections[user_id]
+                    await get_backplane().unsubscribe(user_topic(user_id))
         except Exception as e:
             print(f"Error disconnecting websocket: {str(e)}")
 
     async def broadcast_to_user(self, user_id: int, message: dict):
-        if user_id in self.active_connections:
-            disconnected = []
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    disconnected.append(connection)
-            
-            # Clean up any disconnected websockets
-            for connection in disconnected:
-                self.disconnect(connection, user_id)
+        """Send to the user's sockets in this worker and, via the backplane, in others."""
+        await self.send_local(user_id, message)
+        await get_backplane().publish(user_topic(user_id), message)
+
+    async def send_local(self, user_id: int, message: Dict[str, Any]):
+        """Queue to the user's sockets in this worker without waiting on them."""
+        for connection in self.active_connections.get(user_id, []):
+            sender = self.senders.get(connection)
+            if sender:
+                sender.send(message)
 
 notification_manager = NotificationManager()
\ No newline at end of file
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Set
+from fastapi import WebSocket, status
+from config import settings
+from core.metrics import SendQueueMetrics
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+# Keeps slow-consumer disconnect tasks referenced until they finish
+_closing: Set[asyncio.Task] = set()
+
+
+class QueuedSender:
+    """
+    Bounded outbound queue of one websocket, drained by its own writer task,
+    so a slow client only delays its own messages. send() never waits: when
+    the queue is full, settings.ws_overflow_policy either drops the oldest
+    queued message or disconnects the client.
+
+    on_close is awaited once the connection is unusable (send error or slow
+    consumer) so the owning manager can forget it.
+
+    A sender created paused queues without writing until resume(), so the
+    caller can first write a backlog of any length to the socket directly.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        metrics: SendQueueMetrics,
+        on_close: Callable[[], Awaitable[None]],
+        paused: bool = False
+    ):
+        self.websocket = websocket
+        self.metrics = metrics
+        self.on_close = on_close
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=settings.ws_send_queue_size)
+        self.closed = False
+        self.failed = False
+        self.resumed = asyncio.Event()
+        if not paused:
+            self.resumed.set()
+        metrics.queues.add(self.queue)
+        self.task = asyncio.create_task(self._write())
+
+    def send(self, message: Dict[str, Any]) -> None:
+        if self.closed or self.failed:
+            return
+        if self.queue.full():
+            if settings.ws_overflow_policy == DISCONNECT:
+                self.metrics.slow_disconnects += 1
+                self.failed = True
+                logger.warning("Disconnecting slow websocket consumer")
+                task = asyncio.create_task(self._close_connection(status.WS_1013_TRY_AGAIN_LATER))
+                _closing.add(task)
+                task.add_done_callback(_closing.discard)
+                return
+            self.queue.get_nowait()
+            self.metrics.dropped += 1
+        self.queue.put_nowait(message)
+        self.metrics.enqueued += 1
+        self.metrics.peak_depth = max(self.metrics.peak_depth, self.queue.qsize())
+
+    def resume(self) -> None:
+        self.resumed.set()
+
+    async def _write(self) -> None:
+        await self.resumed.wait()
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.websocket.send_json(message)
+                self.metrics.sent += 1
+            except Exception as e:
+                logger.error(f"Error sending websocket message: {str(e)}")
+                self.failed = True
+                await self.on_close()
+                return
+
+    async def _close_connection(self, close_code: int) -> None:
+        try:
+            await self.websocket.close(code=close_code)
+        except Exception:
+            pass
+        await self.on_close()
+
+    def close(self) -> None:
+        """Stop the writer; queued messages are discarded."""
+        if self.closed:
+            return
+        self.closed = True
+        self.metrics.queues.discard(self.queue)
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
@@ -0,0 +1,61 @@
+"""
+Shared by the benchmark scripts: puts the app directory on sys.path, makes
+the rows they need and summarizes latencies.
+
+The scripts use the app's settings, from the environment or .env. Those
+touching the database want a throwaway, migrated one: they add their own
+rows and leave them in place.
+"""
+import logging
+import os
+import sys
+import uuid
+from typing import Sequence, Tuple
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+# The app logs every pool checkout; keep the results readable
+logging.disable(logging.INFO)
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_summary(seconds: Sequence[float]) -> str:
+    """p50, p99 and max of latencies in seconds, as milliseconds."""
+    if not seconds:
+        return "no samples"
+    return "p50 {:.1f} ms  p99 {:.1f} ms  max {:.1f} ms".format(
+        percentile(seconds, 0.5) * 1000, percentile(seconds, 0.99) * 1000, max(seconds) * 1000
+    )
+
+
+def make_dealership(db) -> Tuple[int, int]:
+    """A new dealership with an activated sales executive: (dealership id, executive id)."""
+    import models
+
+    tag = uuid.uuid4().hex[:8]
+    admin = models.User(
+        first_name="Bench", last_name="Admin", email=f"bench-admin-{tag}@example.com",
+        role=models.RoleEnum.admin, password="x", is_activated=True
+    )
+    db.add(admin)
+    db.flush()
+    dealership = models.Dealership(
+        name=f"Benchmark {tag}", address="Main St", contact_number="1", num_employees=1,
+        num_branches=1, contact_email=f"bench-dealer-{tag}@example.com", creator_id=admin.id
+    )
+    db.add(dealership)
+    db.flush()
+    admin.dealership_id = dealership.id
+    executive = models.User(
+        first_name="Bench", last_name="Sales", email=f"bench-sales-{tag}@example.com",
+        role=models.RoleEnum.sales_executive, password="x", is_activated=True,
+        dealership_id=dealership.id
+    )
+    db.add(executive)
+    db.commit()
+    return dealership.id, executive.id
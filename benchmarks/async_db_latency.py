@@ -0,0 +1,120 @@
+"""
+p99 latency under mixed websocket and HTTP load, for an async def handler
+querying through the blocking sync Session (how async routes used to run)
+and through AsyncSession (database.get_async_db).
+
+HTTP clients call the handler back to back, each call running a query that
+takes --query-ms in Postgres. Meanwhile websocket clients send a ping every
+--ping-ms to an echo socket and time the reply. Everything shares one event
+loop, as in a uvicorn worker, so a query that blocks the loop shows up in
+both latencies.
+
+    python benchmarks/async_db_latency.py --seconds 10 --http-clients 8 --websocket-clients 50
+
+Keep --http-clients within db_pool_size + db_max_overflow: in the sync
+variant a pool wait would itself block the loop.
+"""
+import argparse
+import asyncio
+import time
+
+import _support
+import httpx
+from fastapi import Depends, FastAPI, WebSocket, WebSocketDisconnect
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import database
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+parser.add_argument("--seconds", type=float, default=10)
+parser.add_argument("--http-clients", type=int, default=8)
+parser.add_argument("--websocket-clients", type=int, default=50)
+parser.add_argument("--query-ms", type=float, default=5)
+parser.add_argument("--ping-ms", type=float, default=50)
+args = parser.parse_args()
+
+QUERY = text("SELECT pg_sleep(:seconds)")
+
+app = FastAPI()
+
+
+@app.get("/sync")
+async def sync_query(db: Session = Depends(database.get_db)):
+    db.execute(QUERY, {"seconds": args.query_ms / 1000})
+    return {}
+
+
+@app.get("/async")
+async def async_query(db: AsyncSession = Depends(database.get_async_db)):
+    await db.execute(QUERY, {"seconds": args.query_ms / 1000})
+    return {}
+
+
+@app.websocket("/echo")
+async def echo(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        while True:
+            await websocket.send_text(await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+
+
+async def websocket_client(deadline: float, round_trips: list):
+    """Drives the echo socket through the ASGI interface directly."""
+    to_app, from_app = asyncio.Queue(), asyncio.Queue()
+    scope = {
+        "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": "/echo",
+        "raw_path": b"/echo", "root_path": "", "query_string": b"", "headers": [],
+        "subprotocols": [], "client": ("benchmark", 1), "server": ("benchmark", 80),
+    }
+    await to_app.put({"type": "websocket.connect"})
+    server = asyncio.create_task(app(scope, to_app.get, from_app.put))
+    assert (await from_app.get())["type"] == "websocket.accept"
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await to_app.put({"type": "websocket.receive", "text": "ping"})
+        await from_app.get()
+        round_trips.append(time.perf_counter() - start)
+        await asyncio.sleep(args.ping_ms / 1000)
+    await to_app.put({"type": "websocket.disconnect", "code": 1000})
+    await server
+
+
+async def http_client(client: httpx.AsyncClient, path: str, deadline: float, latencies: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(path)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+
+async def run(path: str):
+    latencies, round_trips = [], []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        # Warm both pools up before measuring
+        await asyncio.gather(*(client.get(path) for _ in range(args.http_clients)))
+        deadline = time.perf_counter() + args.seconds
+        await asyncio.gather(
+            *(http_client(client, path, deadline, latencies) for _ in range(args.http_clients)),
+            *(websocket_client(deadline, round_trips) for _ in range(args.websocket_clients)),
+        )
+    await database.async_engine.dispose()
+    return latencies, round_trips
+
+
+def benchmark():
+    print(
+        f"{args.http_clients} HTTP clients, {args.websocket_clients} websocket clients, "
+        f"{args.query_ms:g} ms queries, {args.seconds:g} s per variant"
+    )
+    for name, path in (("sync Session", "/sync"), ("AsyncSession", "/async")):
+        latencies, round_trips = asyncio.run(run(path))
+        print(f"{name}:")
+        print(f"  HTTP       {len(latencies) / args.seconds:7.0f} req/s  {_support.latency_summary(latencies)}")
+        print(f"  websocket  {len(round_trips) / args.seconds:7.0f} msg/s  {_support.latency_summary(round_trips)}")
+
+
+if __name__ == "__main__":
+    benchmark()
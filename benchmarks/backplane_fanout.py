@@ -0,0 +1,135 @@
+"""
+Multi-worker fan-out over the Postgres backplane. --workers processes each
+hold the connections of every --workers-th user and subscribe to their
+topics, as NotificationManager does; this process publishes --messages
+notifications round-robin over --users users. Reports publish rate, delivery
+latency from publish to the receiving worker's handler, and checks every
+message reached exactly the worker holding its user, once.
+
+    python benchmarks/backplane_fanout.py --workers 4 --users 400 --messages 5000 --concurrency 32
+
+--payload-bytes above the NOTIFY limit (8000) measures the spilled path.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import queue
+import time
+
+import _support
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+parser.add_argument("--workers", type=int, default=4)
+parser.add_argument("--users", type=int, default=400)
+parser.add_argument("--messages", type=int, default=5000)
+parser.add_argument("--concurrency", type=int, default=32, help="publishes in flight")
+parser.add_argument("--payload-bytes", type=int, default=200)
+parser.add_argument("--timeout", type=float, default=60, help="seconds workers wait for their messages")
+args = parser.parse_args()
+
+
+def expected_for(worker: int):
+    return sum(1 for n in range(args.messages) if n % args.users % args.workers == worker)
+
+
+async def hold_users(worker: int, ready, results):
+    import database
+    from services.backplane import PostgresBackplane
+    from services.websockets import user_topic
+
+    backplane = PostgresBackplane(database.SQLALCHEMY_DATABASE_URL)
+    await backplane.start()
+    expected = expected_for(worker)
+    latencies, seen, misrouted = [], set(), 0
+    all_received = asyncio.Event()
+
+    async def deliver(message):
+        nonlocal misrouted
+        latencies.append(time.time() - message["sent_at"])
+        seen.add(message["n"])
+        if message["user_id"] % args.workers != worker:
+            misrouted += 1
+        if len(latencies) >= expected:
+            all_received.set()
+
+    for user_id in range(worker, args.users, args.workers):
+        await backplane.subscribe(user_topic(user_id), deliver)
+    ready.put(worker)
+    try:
+        await asyncio.wait_for(all_received.wait(), args.timeout)
+    except asyncio.TimeoutError:
+        pass
+    results.put((worker, expected, latencies, len(latencies) - len(seen), misrouted))
+    await backplane.stop()
+    await database.async_engine.dispose()
+
+
+def worker_process(worker: int, ready, results):
+    asyncio.run(hold_users(worker, ready, results))
+
+
+async def publish_all() -> float:
+    import database
+    from services.backplane import PostgresBackplane
+    from services.websockets import user_topic
+
+    backplane = PostgresBackplane(database.SQLALCHEMY_DATABASE_URL)
+    padding = "x" * args.payload_bytes
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def publish(n: int):
+        user_id = n % args.users
+        async with limit:
+            await backplane.publish(user_topic(user_id), {
+                "type": "notification", "n": n, "user_id": user_id, "sent_at": time.time(), "body": padding
+            })
+
+    start = time.perf_counter()
+    await asyncio.gather(*(publish(n) for n in range(args.messages)))
+    elapsed = time.perf_counter() - start
+    await database.async_engine.dispose()
+    return elapsed
+
+
+def benchmark():
+    # Each worker needs its own backplane WORKER_ID, so no fork
+    context = multiprocessing.get_context("spawn")
+    ready, results = context.Queue(), context.Queue()
+    processes = [
+        context.Process(target=worker_process, args=(worker, ready, results))
+        for worker in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=60)
+
+    elapsed = asyncio.run(publish_all())
+
+    latencies, delivered, expected, duplicates, misrouted = [], 0, 0, 0, 0
+    for _ in processes:
+        try:
+            _, worker_expected, worker_latencies, worker_duplicates, worker_misrouted = results.get(
+                timeout=args.timeout + 30
+            )
+        except queue.Empty:
+            break
+        latencies += worker_latencies
+        delivered += len(worker_latencies)
+        expected += worker_expected
+        duplicates += worker_duplicates
+        misrouted += worker_misrouted
+    for process in processes:
+        process.join(timeout=10)
+
+    print(
+        f"{args.messages} messages of {args.payload_bytes} bytes to {args.users} users "
+        f"on {args.workers} workers, {args.concurrency} publishes in flight"
+    )
+    print(f"  published {args.messages / elapsed:.0f} msg/s")
+    print(f"  delivered {delivered}/{expected}  duplicates {duplicates}  misrouted {misrouted}")
+    print(f"  latency {_support.latency_summary(latencies)}")
+
+
+if __name__ == "__main__":
+    benchmark()
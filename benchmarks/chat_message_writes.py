@@ -0,0 +1,95 @@
+"""
+Messages/s persisting chat messages: one add/commit/refresh per message, as
+chat_websocket used to, against the group-commit ChatMessageWriter, with
+--senders clients each waiting for the ack of one message before sending
+the next, spread over --sessions chat sessions.
+
+    python benchmarks/chat_message_writes.py --messages 5000 --senders 1 10 50 200
+"""
+import argparse
+import asyncio
+import time
+
+import _support
+import database
+import models
+from services.chat import ChatMessageWriter
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+parser.add_argument("--messages", type=int, default=5000, help="per run")
+parser.add_argument("--senders", type=int, nargs="+", default=[1, 10, 50, 200])
+parser.add_argument("--sessions", type=int, default=20)
+args = parser.parse_args()
+
+
+def make_sessions(count: int):
+    db = database.SessionLocal()
+    try:
+        dealership_id, executive_id = _support.make_dealership(db)
+        template = models.FormTemplate(name="Benchmark", dealership_id=dealership_id)
+        db.add(template)
+        db.flush()
+        sessions = []
+        for index in range(count):
+            form_instance = models.FormInstance(
+                template_id=template.id, dealership_id=dealership_id, generated_by=executive_id
+            )
+            db.add(form_instance)
+            db.flush()
+            sessions.append(models.ChatSession(
+                form_instance_id=form_instance.id, customer_name=f"Customer {index}",
+                employee_id=executive_id, status="ACTIVE"
+            ))
+        db.add_all(sessions)
+        db.commit()
+        return [session.id for session in sessions]
+    finally:
+        db.close()
+
+
+async def commit_each(session_id: int, count: int, latencies: list):
+    async with database.AsyncSessionLocal() as db:
+        for n in range(count):
+            start = time.perf_counter()
+            message = models.ChatMessage(session_id=session_id, sender_type="customer", content=f"message {n}")
+            db.add(message)
+            await db.commit()
+            await db.refresh(message)
+            latencies.append(time.perf_counter() - start)
+
+
+async def group_commit(writer: ChatMessageWriter, session_id: int, count: int, latencies: list):
+    for n in range(count):
+        start = time.perf_counter()
+        await writer.write(session_id, "customer", None, f"message {n}")
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(session_ids, senders: int, grouped: bool):
+    writer = ChatMessageWriter()
+    latencies = []
+    per_sender = args.messages // senders
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        group_commit(writer, session_ids[index % len(session_ids)], per_sender, latencies) if grouped
+        else commit_each(session_ids[index % len(session_ids)], per_sender, latencies)
+        for index in range(senders)
+    ))
+    elapsed = time.perf_counter() - start
+    await writer.close()
+    await database.async_engine.dispose()
+    return per_sender * senders / elapsed, latencies
+
+
+def benchmark():
+    session_ids = make_sessions(args.sessions)
+    print(f"{args.messages} messages per run over {args.sessions} sessions")
+    print(f"{'senders':>7}  {'per-message msg/s':>17}  {'group commit msg/s':>18}  group commit ack latency")
+    for senders in args.senders:
+        each, _ = asyncio.run(run(session_ids, senders, grouped=False))
+        grouped, latencies = asyncio.run(run(session_ids, senders, grouped=True))
+        print(f"{senders:>7}  {each:>17.0f}  {grouped:>18.0f}  {_support.latency_summary(latencies)}")
+
+
+if __name__ == "__main__":
+    benchmark()
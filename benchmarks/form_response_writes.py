@@ -0,0 +1,93 @@
+"""
+Rows/s writing a submission's form_responses: the ORM path submissions used
+to take (add_all, commit, then refresh the instance) against
+services.form.bulk_insert_responses, at 10, 100 and 1,000 fields.
+
+    python benchmarks/form_response_writes.py --fields 10 100 1000 --repeat 20
+"""
+import argparse
+import time
+
+import _support
+import database
+import models
+from services import form as form_service
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+parser.add_argument("--fields", type=int, nargs="+", default=[10, 100, 1000])
+parser.add_argument("--repeat", type=int, default=20, help="submissions written per path and size")
+args = parser.parse_args()
+
+
+def make_template(db, field_count: int):
+    dealership_id, executive_id = _support.make_dealership(db)
+    template = models.FormTemplate(name="Benchmark", dealership_id=dealership_id)
+    db.add(template)
+    db.flush()
+    fields = [
+        models.FormField(
+            template_id=template.id, name=f"field{index}", field_type=models.FieldTypeEnum.text,
+            filled_by=models.FilledByEnum.customer, order=index
+        )
+        for index in range(field_count)
+    ]
+    db.add_all(fields)
+    db.commit()
+    return template.id, dealership_id, executive_id, [field.id for field in fields]
+
+
+def new_instance(db, template_id: int, dealership_id: int, executive_id: int) -> models.FormInstance:
+    form_instance = models.FormInstance(
+        template_id=template_id, dealership_id=dealership_id, generated_by=executive_id
+    )
+    db.add(form_instance)
+    db.commit()
+    return form_instance
+
+
+def write_orm(db, form_instance: models.FormInstance, field_ids):
+    db.add_all([
+        models.FormResponse(form_instance_id=form_instance.id, form_field_id=field_id, value="value")
+        for field_id in field_ids
+    ])
+    db.commit()
+    db.refresh(form_instance)
+
+
+def write_bulk(db, form_instance: models.FormInstance, field_ids):
+    form_service.bulk_insert_responses(db, [
+        {"form_instance_id": form_instance.id, "form_field_id": field_id, "value": "value"}
+        for field_id in field_ids
+    ])
+    db.commit()
+
+
+def rows_per_second(db, write, setup, field_ids) -> float:
+    elapsed = 0.0
+    for _ in range(args.repeat):
+        form_instance = new_instance(db, *setup)
+        start = time.perf_counter()
+        write(db, form_instance, field_ids)
+        elapsed += time.perf_counter() - start
+    return args.repeat * len(field_ids) / elapsed
+
+
+def benchmark():
+    db = database.SessionLocal()
+    try:
+        print(f"{'fields':>6}  {'orm rows/s':>11}  {'bulk rows/s':>11}  speedup")
+        for field_count in args.fields:
+            template_id, dealership_id, executive_id, field_ids = make_template(db, field_count)
+            setup = (template_id, dealership_id, executive_id)
+            # One unmeasured write each, so connection setup is not counted
+            write_bulk(db, new_instance(db, *setup), field_ids)
+            write_orm(db, new_instance(db, *setup), field_ids)
+            orm = rows_per_second(db, write_orm, setup, field_ids)
+            bulk = rows_per_second(db, write_bulk, setup, field_ids)
+            print(f"{field_count:>6}  {orm:>11.0f}  {bulk:>11.0f}  {bulk / orm:.1f}x")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,112 @@
+"""
+Throughput of customer form submissions with images on the local-disk
+storage backend: the whole POST /form-builder/forms/submit-customer path (validation,
+concurrent image uploads, the response write and the notification), with
+several submissions in flight, and no AWS account needed.
+
+    python benchmarks/form_submission_storage.py --submissions 200 --concurrency 16 --images 3 --image-kb 256
+
+Images are written under a temporary directory, removed afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+parser.add_argument("--submissions", type=int, default=200)
+parser.add_argument("--concurrency", type=int, default=16)
+parser.add_argument("--images", type=int, default=3, help="image fields per form")
+parser.add_argument("--image-kb", type=int, default=256)
+args = parser.parse_args()
+
+storage_root = tempfile.mkdtemp(prefix="storage-benchmark-")
+# Read by config when the app modules are imported below
+os.environ["storage_backend"] = "local"
+os.environ["local_storage_path"] = storage_root
+os.environ["websocket_backplane"] = "local"
+
+import _support
+import httpx
+import database
+import main
+import models
+
+
+def make_forms(count: int, images: int):
+    db = database.SessionLocal()
+    try:
+        dealership_id, executive_id = _support.make_dealership(db)
+        template = models.FormTemplate(name="Benchmark", is_active=True, dealership_id=dealership_id)
+        db.add(template)
+        db.flush()
+        db.add(models.FormField(
+            template_id=template.id, name="phone", field_type=models.FieldTypeEnum.text,
+            filled_by=models.FilledByEnum.customer, order=0
+        ))
+        db.add_all([
+            models.FormField(
+                template_id=template.id, name=f"photo{index}", field_type=models.FieldTypeEnum.image,
+                filled_by=models.FilledByEnum.customer, order=index + 1
+            )
+            for index in range(images)
+        ])
+        forms = [
+            models.FormInstance(
+                template_id=template.id, dealership_id=dealership_id,
+                generated_by=executive_id, customer_name=f"Customer {index}"
+            )
+            for index in range(count)
+        ]
+        db.add_all(forms)
+        db.commit()
+        return [form.id for form in forms]
+    finally:
+        db.close()
+
+
+async def run(form_ids):
+    image = os.urandom(args.image_kb * 1024)
+    limit = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://benchmark") as client:
+        async def submit(form_id: int):
+            files = [("files", (f"photo{index}.jpg", image, "image/jpeg")) for index in range(args.images)]
+            async with limit:
+                start = time.perf_counter()
+                response = await client.post(
+                    f"/form-builder/forms/submit-customer/{form_id}",
+                    data={"data": json.dumps({"phone": "555 0100"})},
+                    files=files
+                )
+                latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(submit(form_id) for form_id in form_ids))
+        elapsed = time.perf_counter() - start
+    await database.async_engine.dispose()
+    return elapsed, latencies
+
+
+def benchmark():
+    form_ids = make_forms(args.submissions, args.images)
+    try:
+        elapsed, latencies = asyncio.run(run(form_ids))
+    finally:
+        shutil.rmtree(storage_root, ignore_errors=True)
+    megabytes = args.submissions * args.images * args.image_kb / 1024
+    print(
+        f"{args.submissions} submissions, {args.images} x {args.image_kb} KB images, "
+        f"concurrency {args.concurrency}"
+    )
+    print(f"  {args.submissions / elapsed:.1f} submissions/s  {megabytes / elapsed:.1f} MB/s")
+    print(f"  latency {_support.latency_summary(latencies)}")
+
+
+if __name__ == "__main__":
+    benchmark()
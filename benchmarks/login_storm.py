@@ -0,0 +1,99 @@
+"""
+A shift-start login storm: --logins POST /login requests at once, while a
+probe keeps calling a cheap sync endpoint (GET /metrics/db-pool) that needs
+a thread from the shared anyio limiter.
+
+Runs twice: with bcrypt on the dedicated password pool, and with bcrypt on
+the shared threadpool as before it. Reports login throughput and latency,
+429 rejections, the probe's latency and the password pool's peak depth.
+
+    python benchmarks/login_storm.py --logins 200
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import _support
+import httpx
+from starlette.concurrency import run_in_threadpool
+import core.utils
+import database
+import main
+import models
+
+parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+parser.add_argument("--logins", type=int, default=200)
+parser.add_argument("--probe-ms", type=float, default=20, help="pause between probe requests")
+args = parser.parse_args()
+
+PASSWORD = "benchmark-password"
+
+
+def make_user() -> str:
+    db = database.SessionLocal()
+    try:
+        _, executive_id = _support.make_dealership(db)
+        executive = db.get(models.User, executive_id)
+        executive.email = f"bench-login-{uuid.uuid4().hex[:8]}@example.com"
+        executive.password = core.utils.pwd_context.hash(PASSWORD)
+        db.commit()
+        return executive.email
+    finally:
+        db.close()
+
+
+async def shared_threadpool_verify(plain_password: str, hashed_pass: str) -> bool:
+    return await run_in_threadpool(core.utils.pwd_context.verify, plain_password, hashed_pass)
+
+
+async def storm(email: str):
+    logins, probes, statuses = [], [], {}
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=main.app), base_url="http://benchmark", timeout=None
+    ) as client:
+        async def login():
+            start = time.perf_counter()
+            response = await client.post("/login", data={"username": email, "password": PASSWORD})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                logins.append(time.perf_counter() - start)
+
+        async def probe(done: asyncio.Event):
+            while not done.is_set():
+                start = time.perf_counter()
+                (await client.get("/metrics/db-pool")).raise_for_status()
+                probes.append(time.perf_counter() - start)
+                await asyncio.sleep(args.probe_ms / 1000)
+
+        done = asyncio.Event()
+        prober = asyncio.create_task(probe(done))
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+    await database.async_engine.dispose()
+    return elapsed, logins, probes, statuses
+
+
+def benchmark():
+    email = make_user()
+    hasher = core.utils.password_hasher
+    print(f"{args.logins} concurrent logins; password pool: {hasher.workers} workers, {hasher.max_pending} max pending")
+    dedicated_verify = core.utils.verify_async
+    for name, verify in (("dedicated pool", dedicated_verify), ("shared threadpool", shared_threadpool_verify)):
+        core.utils.verify_async = verify
+        hasher.peak_pending = 0
+        elapsed, logins, probes, statuses = asyncio.run(storm(email))
+        print(f"{name}:")
+        print(f"  {len(logins) / elapsed:.1f} logins/s  responses {dict(sorted(statuses.items()))}")
+        print(f"  login  {_support.latency_summary(logins)}")
+        print(f"  probe  {_support.latency_summary(probes)}")
+        if verify is dedicated_verify:
+            print(f"  password pool peak pending {hasher.peak_pending}")
+    core.utils.verify_async = dedicated_verify
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,90 @@
+"""
+Rows shared by the database tests.
+"""
+import models
+from services import form as form_service
+
+
+def make_dealership(db, forms: int) -> int:
+    tag = f"d{forms}"
+    admin = models.User(
+        first_name="Ada", last_name="Admin", email=f"admin-{tag}@example.com",
+        role=models.RoleEnum.admin, password="x", is_activated=True
+    )
+    db.add(admin)
+    db.flush()
+    dealership = models.Dealership(
+        name="Dealer", address="Main St", contact_number="1", num_employees=1,
+        num_branches=1, contact_email=f"dealer-{tag}@example.com", creator_id=admin.id
+    )
+    db.add(dealership)
+    db.flush()
+    executive = models.User(
+        first_name="Sam", last_name="Sales", email=f"sales-{tag}@example.com",
+        role=models.RoleEnum.sales_executive, password="x", is_activated=True,
+        dealership_id=dealership.id
+    )
+    template = models.FormTemplate(name="Sale", is_active=True, dealership_id=dealership.id)
+    db.add_all([executive, template])
+    db.flush()
+    customer_field = models.FormField(
+        template_id=template.id, name="phone", field_type=models.FieldTypeEnum.text,
+        filled_by=models.FilledByEnum.customer, order=1
+    )
+    sales_field = models.FormField(
+        template_id=template.id, name="model", field_type=models.FieldTypeEnum.text,
+        filled_by=models.FilledByEnum.sales_executive, order=2
+    )
+    vehicle = models.Vehicle(dealership_id=dealership.id, name="Roadster", total_price=1000)
+    db.add_all([customer_field, sales_field, vehicle])
+    db.flush()
+
+    for index in range(forms):
+        # Alternate stages so every dashboard has rows
+        verified = index % 2 == 0
+        form_instance = models.FormInstance(
+            template_id=template.id, dealership_id=dealership.id,
+            generated_by=executive.id, customer_name=f"Customer {index}",
+            customer_submitted=True, sales_verified=verified
+        )
+        db.add(form_instance)
+        db.flush()
+        db.add(models.Customer(
+            form_instance_id=form_instance.id, total_price=1000, amount_paid=100,
+            balance_amount=900, dealership_id=dealership.id, vehicle_id=vehicle.id
+        ))
+        form_service.save_responses(
+            db, form_instance, models.FilledByEnum.customer.value,
+            {customer_field.id: "phone"},
+            [{"form_instance_id": form_instance.id, "form_field_id": customer_field.id, "value": "555"}]
+        )
+        if verified:
+            form_service.save_responses(
+                db, form_instance, models.FilledByEnum.sales_executive.value,
+                {sales_field.id: "model"},
+                [{"form_instance_id": form_instance.id, "form_field_id": sales_field.id, "value": "Roadster"}]
+            )
+    db.commit()
+    return dealership.id
+
+
+def make_chat_session(db):
+    executive = models.User(
+        first_name="Sam", last_name="Sales", email="sales@example.com",
+        role=models.RoleEnum.sales_executive, password="x", is_activated=True
+    )
+    template = models.FormTemplate(name="Sale")
+    db.add_all([executive, template])
+    db.flush()
+    form_instance = models.FormInstance(template_id=template.id, generated_by=executive.id)
+    db.add(form_instance)
+    db.flush()
+    chat_session = models.ChatSession(
+        form_instance_id=form_instance.id, customer_name="Casey", employee_id=executive.id, status="ACTIVE"
+    )
+    db.add(chat_session)
+    db.flush()
+    executive_id, session_id = executive.id, chat_session.id
+    db.commit()
+    db.close()
+    return executive_id, session_id
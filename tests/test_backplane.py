@@ -0,0 +1,95 @@
+"""Cross-worker websocket fan-out through services.backplane."""
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")
+
+from sqlalchemy import text
+import database
+import models
+from services import backplane
+
+
+def envelope(message_id: str, data, origin: str = "other-worker") -> str:
+    return json.dumps({"id": message_id, "origin": origin, "data": data})
+
+
+def test_delivers_other_workers_messages_once():
+    async def scenario():
+        bus = backplane.LocalBackplane()
+        received = []
+
+        async def handler(data):
+            received.append(data)
+
+        await bus.subscribe("ws_user_1", handler)
+        bus._receive("ws_user_1", envelope("a", {"n": 1}))
+        # A repeated id, our own echo, another topic and garbage are dropped
+        bus._receive("ws_user_1", envelope("a", {"n": 1}))
+        bus._receive("ws_user_1", envelope("b", {"n": 2}, origin=backplane.WORKER_ID))
+        bus._receive("ws_user_2", envelope("c", {"n": 3}))
+        bus._receive("ws_user_1", "not json")
+        await bus.unsubscribe("ws_user_1")
+        bus._receive("ws_user_1", envelope("d", {"n": 4}))
+        await asyncio.sleep(0)
+        return received
+
+    assert asyncio.run(scenario()) == [{"n": 1}]
+
+
+def test_postgres_backplane_routes_notifications_to_subscribed_topics(db_tables):
+    async def scenario():
+        bus = backplane.PostgresBackplane(database.SQLALCHEMY_DATABASE_URL)
+        received = asyncio.Queue()
+
+        async def handler(data):
+            await received.put(data)
+
+        await bus.start()
+        try:
+            await bus.subscribe("ws_chat_1", handler)
+            # As published by another worker
+            async with database.async_engine.connect() as connection:
+                for topic, message_id in (("ws_chat_2", "x"), ("ws_chat_1", "y")):
+                    await connection.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        {"channel": topic, "payload": envelope(message_id, {"topic": topic})}
+                    )
+                await connection.commit()
+            first = await asyncio.wait_for(received.get(), timeout=5)
+            await asyncio.sleep(0.2)
+            return first, received.qsize()
+        finally:
+            await bus.stop()
+            await database.async_engine.dispose()
+
+    assert asyncio.run(scenario()) == ({"topic": "ws_chat_1"}, 0)
+
+
+def test_oversized_messages_reach_other_workers(db):
+    async def scenario():
+        bus = backplane.PostgresBackplane(database.SQLALCHEMY_DATABASE_URL)
+        received = asyncio.Queue()
+
+        async def handler(data):
+            await received.put(data)
+
+        content = "é" * backplane.MAX_NOTIFY_PAYLOAD
+        await bus.start()
+        try:
+            await bus.subscribe("ws_chat_1", handler)
+            # As another worker publishes it, and this worker's own echo
+            await bus._send("ws_chat_1", envelope("big", {"content": content}))
+            await bus._send("ws_chat_1", envelope("own", {"content": content}, origin=backplane.WORKER_ID))
+            first = await asyncio.wait_for(received.get(), timeout=5)
+            await asyncio.sleep(0.2)
+            return first, received.qsize()
+        finally:
+            await bus.stop()
+            await database.async_engine.dispose()
+
+    assert asyncio.run(scenario()) == ({"content": "é" * backplane.MAX_NOTIFY_PAYLOAD}, 0)
+    # Published through backplane_payloads, not dropped
+    assert db.query(models.BackplanePayload).count() == 2
@@ -0,0 +1,226 @@
+"""
+Routing new chat sessions from the in-memory load table: least-loaded
+selection, ties, scope, and load and presence shared by other workers.
+"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+import database
+import models
+from services import chat_routing
+
+OTHER_WORKER = "other-worker"
+
+
+@pytest.fixture
+def dealership(db):
+    """Executives a, b, c of one branch with 2, 1 and 1 ACTIVE sessions, and one elsewhere."""
+    admin = models.User(
+        first_name="Ada", last_name="Admin", email="admin@example.com",
+        role=models.RoleEnum.admin, password="x", is_activated=True
+    )
+    db.add(admin)
+    db.flush()
+    dealership = models.Dealership(
+        name="Dealer", address="Main St", contact_number="1", num_employees=4,
+        num_branches=2, contact_email="dealer@example.com", creator_id=admin.id
+    )
+    db.add(dealership)
+    db.flush()
+    branch, other_branch = models.Branch(dealership_id=dealership.id, name="North"), \
+        models.Branch(dealership_id=dealership.id, name="South")
+    db.add_all([branch, other_branch])
+    db.flush()
+
+    def executive(name, branch_id):
+        user = models.User(
+            first_name=name, last_name="Sales", email=f"{name}@example.com",
+            role=models.RoleEnum.sales_executive, password="x", is_activated=True,
+            dealership_id=dealership.id, branch_id=branch_id
+        )
+        db.add(user)
+        db.flush()
+        return user
+
+    users = {name: executive(name, branch.id) for name in ("a", "b", "c")}
+    users["south"] = executive("south", other_branch.id)
+    template = models.FormTemplate(name="Sale", dealership_id=dealership.id)
+    db.add(template)
+    db.flush()
+    for name, status in (("a", "ACTIVE"), ("a", "ACTIVE"), ("b", "ACTIVE"), ("b", "CLOSED"), ("c", "ACTIVE")):
+        form_instance = models.FormInstance(
+            template_id=template.id, dealership_id=dealership.id, generated_by=users[name].id
+        )
+        db.add(form_instance)
+        db.flush()
+        db.add(models.ChatSession(
+            form_instance_id=form_instance.id, customer_name="Casey",
+            employee_id=users[name].id, status=status
+        ))
+    db.commit()
+    return SimpleNamespace(
+        id=dealership.id, branch_id=branch.id,
+        users={name: SimpleNamespace(id=user.id, dealership_id=user.dealership_id, branch_id=user.branch_id)
+               for name, user in users.items()}
+    )
+
+
+def run(scenario):
+    async def wrapped():
+        try:
+            return await scenario()
+        finally:
+            await database.async_engine.dispose()
+    return asyncio.run(wrapped())
+
+
+def names(dealership, picks):
+    by_id = {user.id: name for name, user in dealership.users.items()}
+    return [by_id.get(user_id) for user_id in picks]
+
+
+def test_least_loaded_executive_is_picked_and_ties_go_to_the_lowest_id(dealership):
+    table = chat_routing.ExecutiveLoadTable()
+
+    async def scenario():
+        for name in ("a", "b", "c"):
+            await table.executive_connected(dealership.users[name])
+        async with database.AsyncSessionLocal() as db:
+            return [await table.pick(db, dealership.id, dealership.branch_id) for _ in range(4)]
+
+    # b and c tie at 1 (b's closed session does not count); each pick adds
+    # to the load, so the next one goes elsewhere
+    assert names(dealership, run(scenario)) == ["b", "c", "a", "b"]
+    assert table.active_sessions[dealership.users["b"].id] == 3
+
+
+def test_closed_sessions_free_the_executive(dealership):
+    table = chat_routing.ExecutiveLoadTable()
+
+    async def scenario():
+        for name in ("a", "b"):
+            await table.executive_connected(dealership.users[name])
+        async with database.AsyncSessionLocal() as db:
+            await table._load_sessions(db)
+            await table.session_closed(dealership.users["a"].id)
+            await table.session_closed(dealership.users["a"].id)
+            return await table.pick(db, dealership.id, dealership.branch_id)
+
+    assert names(dealership, [run(scenario)]) == ["a"]
+
+
+def test_online_executives_come_first_within_scope(dealership):
+    table = chat_routing.ExecutiveLoadTable()
+
+    async def scenario():
+        async with database.AsyncSessionLocal() as db:
+            # Nobody online: the least-loaded activated executive of the branch
+            offline = await table.pick(db, dealership.id, dealership.branch_id)
+            # Online beats a lighter load; other branches never qualify
+            await table.executive_connected(dealership.users["a"])
+            await table.executive_connected(dealership.users["south"])
+            online = await table.pick(db, dealership.id, dealership.branch_id)
+            elsewhere = await table.pick(db, dealership.id + 1, None)
+            return [offline, online], elsewhere
+
+    picks, elsewhere = run(scenario)
+    assert names(dealership, picks) == ["b", "a"]
+    assert elsewhere is None
+
+
+def test_disconnected_executives_go_offline(dealership):
+    table = chat_routing.ExecutiveLoadTable()
+    user = dealership.users["a"]
+
+    async def scenario():
+        await table.executive_connected(user)
+        await table.executive_connected(user)
+        await table.executive_disconnected(user.id)
+        still_online = user.id in table.online
+        await table.executive_disconnected(user.id)
+        return still_online
+
+    assert run(scenario) is True
+    assert table.online == {}
+
+
+def other_worker_presence(user, connections: int):
+    return {
+        "event": "presence", "worker": OTHER_WORKER, "user_id": user.id,
+        "dealership_id": user.dealership_id, "branch_id": user.branch_id, "connections": connections,
+    }
+
+
+def test_other_workers_share_presence_and_load(dealership):
+    table = chat_routing.ExecutiveLoadTable()
+    a, c = dealership.users["a"], dealership.users["c"]
+
+    async def scenario():
+        async with database.AsyncSessionLocal() as db:
+            await table._load_sessions(db)
+            # c connected to another worker, a to this one
+            await table._on_message(other_worker_presence(c, 1))
+            await table.executive_connected(a)
+            # Another worker assigned c two more sessions
+            for _ in range(2):
+                await table._on_message({"event": "load", "worker": OTHER_WORKER, "user_id": c.id, "change": 1})
+            first = await table.pick(db, dealership.id, dealership.branch_id)
+            # A snapshot replaces everything the worker said before
+            await table._on_message({"event": "snapshot", "worker": OTHER_WORKER, "executives": []})
+            second = await table.pick(db, dealership.id, dealership.branch_id)
+            return [first, second]
+
+    assert names(dealership, run(scenario)) == ["a", "a"]
+    assert set(table.online) == {a.id}
+
+
+def test_silent_workers_are_forgotten(dealership, monkeypatch):
+    table = chat_routing.ExecutiveLoadTable()
+    c = dealership.users["c"]
+
+    async def scenario():
+        await table._on_message(other_worker_presence(c, 2))
+        await table.resync()
+        heard = c.id in table.online
+        monkeypatch.setattr(chat_routing.settings, "chat_load_resync_seconds", 0)
+        await table.resync()
+        return heard
+
+    assert run(scenario) is True
+    assert table.online == {}
+    # Session counts were reloaded from the database
+    assert table.active_sessions == {
+        dealership.users["a"].id: 2, dealership.users["b"].id: 1, c.id: 1
+    }
+
+
+def test_sessions_are_counted_when_created_and_closed(db, dealership, app_client):
+    from core import oauth2
+    from services.chat_manager import chat_manager
+
+    b = dealership.users["b"]
+    form_instance_id = db.query(models.FormInstance.id).order_by(models.FormInstance.id).first()[0]
+    db.query(models.ChatSession).filter(models.ChatSession.form_instance_id == form_instance_id).delete()
+    db.commit()
+    token = oauth2.create_access_token({"user_id": b.id})
+    load = chat_manager.executive_load
+
+    with app_client.websocket_connect(f"/chat/ws/executive?token={token}") as presence:
+        response = app_client.post(f"/chat/sessions?form_instance_id={form_instance_id}")
+        assert response.status_code == 200
+        session_id = response.json()["id"]
+        assert presence.receive_json()["session_id"] == session_id
+    # b was the only executive online
+    assert response.json()["employee_id"] == b.id
+    assert load.active_sessions[b.id] == 2
+
+    response = app_client.put(f"/chat/sessions/{session_id}/close", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert load.active_sessions[b.id] == 1
+    # Closing again does not count twice
+    app_client.put(f"/chat/sessions/{session_id}/close", headers={"Authorization": f"Bearer {token}"})
+    assert load.active_sessions[b.id] == 1
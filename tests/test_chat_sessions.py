@@ -0,0 +1,184 @@
+"""
+Chat session listing and message history over HTTP: what each employee can
+see, the listing filters and keyset paging.
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+import models
+from core import oauth2, user_cache
+
+START = datetime(2024, 1, 1, 9, 0)
+
+
+@pytest.fixture
+def chats(db):
+    """
+    Two dealerships. In the first, executive e1 has sessions s1 (ACTIVE),
+    s2 (CLOSED) and s3 (ACTIVE) and executive e2 has s4; in the second,
+    executive e3 has s5. Session n was created n hours after START.
+    """
+    user_cache._cache.clear()
+    users, sessions, templates = {}, {}, {}
+
+    def user(name, role, dealership_id=None):
+        users[name] = models.User(
+            first_name=name, last_name="User", email=f"{name}@example.com",
+            role=role, password="x", is_activated=True, dealership_id=dealership_id
+        )
+        db.add(users[name])
+        db.flush()
+        return users[name]
+
+    for number in (1, 2):
+        admin = user(f"admin{number}", models.RoleEnum.admin)
+        dealership = models.Dealership(
+            name=f"Dealer {number}", address="Main St", contact_number="1", num_employees=2,
+            num_branches=1, contact_email=f"dealer{number}@example.com", creator_id=admin.id
+        )
+        db.add(dealership)
+        db.flush()
+        admin.dealership_id = dealership.id
+        template = models.FormTemplate(name="Sale", dealership_id=dealership.id)
+        db.add(template)
+        db.flush()
+        executives = ("e1", "e2") if number == 1 else ("e3",)
+        for name in executives:
+            user(name, models.RoleEnum.sales_executive, dealership.id)
+            templates[name] = template.id
+
+    for number, (owner, status) in enumerate(
+        (("e1", "ACTIVE"), ("e1", "CLOSED"), ("e1", "ACTIVE"), ("e2", "ACTIVE"), ("e3", "ACTIVE")), 1
+    ):
+        executive = users[owner]
+        form_instance = models.FormInstance(
+            template_id=templates[owner], dealership_id=executive.dealership_id,
+            generated_by=executive.id
+        )
+        db.add(form_instance)
+        db.flush()
+        sessions[f"s{number}"] = models.ChatSession(
+            form_instance_id=form_instance.id, customer_name=f"Customer {number}",
+            employee_id=executive.id, status=status, created_at=START + timedelta(hours=number)
+        )
+        db.add(sessions[f"s{number}"])
+    db.flush()
+    for session in sessions.values():
+        db.add_all([
+            models.ChatMessage(session_id=session.id, sender_type="customer", content=f"message {n}")
+            for n in range(3)
+        ])
+    db.commit()
+    yield SimpleNamespace(
+        users={name: user.id for name, user in users.items()},
+        sessions={name: session.id for name, session in sessions.items()}
+    )
+    user_cache._cache.clear()
+
+
+def auth(chats, name: str):
+    token = oauth2.create_access_token({"user_id": chats.users[name]})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def listed(chats, response):
+    assert response.status_code == 200, response.text
+    by_id = {session_id: name for name, session_id in chats.sessions.items()}
+    return [by_id[session["id"]] for session in response.json()]
+
+
+def test_listing_requires_a_login(app_client, chats):
+    assert app_client.get("/chat/sessions").status_code == 401
+    assert app_client.get(f"/chat/sessions/{chats.sessions['s1']}/messages").status_code == 401
+
+
+def test_sessions_are_scoped_to_the_dealership(app_client, chats):
+    assert listed(chats, app_client.get("/chat/sessions", headers=auth(chats, "admin1"))) == [
+        "s4", "s3", "s2", "s1"
+    ]
+    assert listed(chats, app_client.get("/chat/sessions", headers=auth(chats, "admin2"))) == ["s5"]
+    # Another dealership's employee id matches nothing
+    response = app_client.get(f"/chat/sessions?employee_id={chats.users['e3']}", headers=auth(chats, "admin1"))
+    assert listed(chats, response) == []
+
+
+def test_sales_executives_only_see_their_own_sessions(app_client, chats):
+    assert listed(chats, app_client.get("/chat/sessions", headers=auth(chats, "e1"))) == ["s3", "s2", "s1"]
+    # employee_id cannot widen it
+    response = app_client.get(f"/chat/sessions?employee_id={chats.users['e2']}", headers=auth(chats, "e1"))
+    assert listed(chats, response) == ["s3", "s2", "s1"]
+
+
+def test_sessions_filter_by_status_employee_and_creation_time(app_client, chats):
+    headers = auth(chats, "admin1")
+    assert listed(chats, app_client.get("/chat/sessions?status=closed", headers=headers)) == ["s2"]
+    assert listed(chats, app_client.get("/chat/sessions?status=ACTIVE", headers=headers)) == ["s4", "s3", "s1"]
+    response = app_client.get(f"/chat/sessions?employee_id={chats.users['e2']}", headers=headers)
+    assert listed(chats, response) == ["s4"]
+    response = app_client.get(
+        f"/chat/sessions?employee_id={chats.users['e1']}&status=active", headers=headers
+    )
+    assert listed(chats, response) == ["s3", "s1"]
+
+    # created_from is inclusive, created_to exclusive
+    created_from = (START + timedelta(hours=2)).isoformat()
+    created_to = (START + timedelta(hours=4)).isoformat()
+    response = app_client.get(
+        "/chat/sessions", params={"created_from": created_from, "created_to": created_to}, headers=headers
+    )
+    assert listed(chats, response) == ["s3", "s2"]
+
+
+def test_sessions_are_paged_by_cursor(app_client, chats):
+    headers = auth(chats, "admin1")
+    pages, after = [], None
+    while True:
+        params = {"limit": 3} if after is None else {"limit": 3, "after": after}
+        response = app_client.get("/chat/sessions", params=params, headers=headers)
+        pages.append(listed(chats, response))
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+
+    assert pages == [["s4", "s3", "s2"], ["s1"]]
+    # Filters carry over to later pages
+    response = app_client.get("/chat/sessions?status=active&limit=2", headers=headers)
+    assert listed(chats, response) == ["s4", "s3"]
+    response = app_client.get(
+        "/chat/sessions",
+        params={"status": "active", "limit": 2, "after": response.headers["X-Next-Cursor"]},
+        headers=headers
+    )
+    assert listed(chats, response) == ["s1"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def messages(app_client, chats, session: str, name: str, **params):
+    return app_client.get(
+        f"/chat/sessions/{chats.sessions[session]}/messages", params=params, headers=auth(chats, name)
+    )
+
+
+def test_messages_are_readable_only_where_the_session_is_listed(app_client, chats):
+    for session, name in (("s1", "e1"), ("s1", "admin1"), ("s4", "admin1"), ("s5", "admin2")):
+        response = messages(app_client, chats, session, name)
+        assert response.status_code == 200
+        assert [message["content"] for message in response.json()] == ["message 0", "message 1", "message 2"]
+
+    # Another executive's session, or another dealership's
+    for session, name in (("s4", "e1"), ("s1", "e2"), ("s5", "admin1"), ("s1", "admin2"), ("s1", "e3")):
+        assert messages(app_client, chats, session, name).status_code == 404
+
+
+def test_messages_page_backwards(app_client, chats):
+    latest = messages(app_client, chats, "s1", "e1", limit=2)
+    assert [message["content"] for message in latest.json()] == ["message 1", "message 2"]
+
+    older = messages(app_client, chats, "s1", "e1", limit=2, before_id=latest.headers["X-Next-Cursor"])
+    assert [message["content"] for message in older.json()] == ["message 0"]
+    assert "X-Next-Cursor" not in older.headers
@@ -0,0 +1,71 @@
+"""
+History a chat socket receives on connect and reconnect.
+"""
+import asyncio
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from starlette.websockets import WebSocket
+import models
+from services import chat as chat_service
+from services import ws_sender
+from factories import make_chat_session
+
+
+def add_messages(db, session_id: int, count: int):
+    db.add_all([
+        models.ChatMessage(session_id=session_id, sender_type="customer", content=f"message {n}")
+        for n in range(count)
+    ])
+    db.commit()
+    return [message_id for message_id, in db.query(models.ChatMessage.id).order_by(models.ChatMessage.id)]
+
+
+def receive_history(chat):
+    frames = [chat.receive_json()]
+    while frames[-1].get("has_more"):
+        frames.append(chat.receive_json())
+    return frames
+
+
+@pytest.mark.parametrize("policy", [ws_sender.DROP_OLDEST, ws_sender.DISCONNECT])
+def test_reconnect_catches_up_a_gap_larger_than_the_send_queue(db, app_client, monkeypatch, policy):
+    monkeypatch.setattr(ws_sender.settings, "ws_send_queue_size", 2)
+    monkeypatch.setattr(ws_sender.settings, "ws_overflow_policy", policy)
+    send_json = WebSocket.send_json
+
+    async def slow_send_json(self, data, mode="text"):
+        # A client on a slow link, reading slower than pages are loaded
+        await asyncio.sleep(0.05)
+        await send_json(self, data, mode)
+
+    monkeypatch.setattr(WebSocket, "send_json", slow_send_json)
+    _, session_id = make_chat_session(db)
+    ids = add_messages(db, session_id, chat_service.HISTORY_PAGE_SIZE * 4 + 10)
+    since_id = ids[5]
+
+    with app_client.websocket_connect(f"/chat/ws/{session_id}/customer?since_id={since_id}") as chat:
+        assert chat.receive_json()["type"] == "connection_established"
+        frames = receive_history(chat)
+
+        # Every page arrives, in order, and the socket is still usable
+        assert len(frames) == 5
+        assert [message["id"] for frame in frames for message in frame["messages"]] == ids[6:]
+        chat.send_json({"content": "still here"})
+        reply = chat.receive_json()
+        assert reply["type"] == "message" and reply["data"]["content"] == "still here"
+
+
+def test_connect_sends_the_latest_page(db, app_client):
+    _, session_id = make_chat_session(db)
+    ids = add_messages(db, session_id, chat_service.HISTORY_PAGE_SIZE + 1)
+
+    with app_client.websocket_connect(f"/chat/ws/{session_id}/customer") as chat:
+        chat.receive_json()
+        history = chat.receive_json()
+
+    assert [message["id"] for message in history["messages"]] == ids[1:]
+    assert history["has_older"] is True
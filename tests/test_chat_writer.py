@@ -0,0 +1,112 @@
+"""Group commit of chat messages by services.chat.ChatMessageWriter."""
+import asyncio
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")
+
+from sqlalchemy import event, func, select
+import database
+from config import settings
+import models
+from services import chat as chat_service
+
+MESSAGES = 50
+
+
+def make_chat_session(db) -> int:
+    executive = models.User(
+        first_name="Sam", last_name="Sales", email="sales@example.com",
+        role=models.RoleEnum.sales_executive, password="x", is_activated=True
+    )
+    template = models.FormTemplate(name="Sale")
+    db.add_all([executive, template])
+    db.flush()
+    form_instance = models.FormInstance(template_id=template.id, generated_by=executive.id)
+    db.add(form_instance)
+    db.flush()
+    chat_session = models.ChatSession(
+        form_instance_id=form_instance.id, customer_name="Casey", employee_id=executive.id, status="ACTIVE"
+    )
+    db.add(chat_session)
+    db.commit()
+    return chat_session.id
+
+
+def test_concurrent_messages_share_one_insert_and_get_their_own_ids(db):
+    session_id = make_chat_session(db)
+    inserts = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO CHAT_MESSAGES"):
+            inserts.append(statement)
+
+    async def scenario():
+        writer = chat_service.ChatMessageWriter()
+        try:
+            return await asyncio.gather(*(
+                writer.write(session_id=session_id, sender_type="customer", sender_id=None, content=f"m{index}")
+                for index in range(MESSAGES)
+            ))
+        finally:
+            await writer.close()
+            await database.async_engine.dispose()
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        saved = asyncio.run(scenario())
+    finally:
+        event.remove(database.async_engine.sync_engine, "before_cursor_execute", record)
+
+    # Every ack carries its own row, in the order the messages were written
+    assert [message["content"] for message in saved] == [f"m{index}" for index in range(MESSAGES)]
+    ids = [message["id"] for message in saved]
+    assert ids == sorted(set(ids))
+    assert all(message["sender_type"] == "CUSTOMER" for message in saved)
+    assert len(inserts) <= 2
+    stored = dict(db.execute(
+        select(models.ChatMessage.id, models.ChatMessage.content)
+        .where(models.ChatMessage.session_id == session_id)
+    ).all())
+    assert stored == {message["id"]: message["content"] for message in saved}
+
+
+def test_close_writes_the_batch_being_collected(db, monkeypatch):
+    monkeypatch.setattr(settings, "chat_write_window_ms", 60000)
+    session_id = make_chat_session(db)
+
+    async def scenario():
+        writer = chat_service.ChatMessageWriter()
+        try:
+            pending = asyncio.ensure_future(
+                writer.write(session_id=session_id, sender_type="customer", sender_id=None, content="last")
+            )
+            # The writer has taken the message and waits for its window to close
+            await asyncio.sleep(0.05)
+            assert writer._queue.empty() and not pending.done()
+            await writer.close()
+            return await asyncio.wait_for(pending, timeout=5)
+        finally:
+            await database.async_engine.dispose()
+
+    saved = asyncio.run(scenario())
+
+    assert saved["content"] == "last"
+    assert db.execute(select(func.count()).select_from(models.ChatMessage)).scalar() == 1
+
+
+def test_writer_restarts_after_close(db):
+    """As when the app starts again in the same process, on a new event loop."""
+    session_id = make_chat_session(db)
+    writer = chat_service.ChatMessageWriter()
+
+    async def write_and_close(content):
+        try:
+            saved = await writer.write(session_id=session_id, sender_type="customer", sender_id=None, content=content)
+            await writer.close()
+            return saved["content"]
+        finally:
+            await database.async_engine.dispose()
+
+    assert asyncio.run(asyncio.wait_for(write_and_close("first"), 5)) == "first"
+    assert asyncio.run(asyncio.wait_for(write_and_close("second"), 5)) == "second"
@@ -0,0 +1,49 @@
+"""The async session layer used by async def routes."""
+import asyncio
+import time
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")
+
+from sqlalchemy import text
+import database
+
+
+def run_async(make_coroutine):
+    async def main():
+        try:
+            return await make_coroutine()
+        finally:
+            await database.async_engine.dispose()
+    return asyncio.run(main())
+
+
+def test_async_queries_do_not_block_the_event_loop(db_tables):
+    sleepers = 5
+
+    async def query():
+        async for session in database.get_async_db():
+            return (await session.execute(text("SELECT pg_sleep(0.5), 1"))).all()[0][1]
+
+    async def ticker(ticks):
+        # Keeps running only if the loop is free while queries wait on Postgres
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.05)
+
+    async def scenario():
+        ticks = []
+        ticking = asyncio.create_task(ticker(ticks))
+        started = time.monotonic()
+        results = await asyncio.gather(*(query() for _ in range(sleepers)))
+        elapsed = time.monotonic() - started
+        ticking.cancel()
+        return results, elapsed, ticks
+
+    results, elapsed, ticks = run_async(scenario)
+
+    assert results == [1] * sleepers
+    # Concurrent, not one after another
+    assert elapsed < 1.5
+    assert len(ticks) >= 5
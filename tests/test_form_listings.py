@@ -0,0 +1,54 @@
+"""
+The employee form dashboards must load a page in a fixed number of queries,
+however many forms the dealership has.
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from sqlalchemy import event
+import database
+from core import pagination
+from services import form as form_service
+from factories import make_dealership
+
+
+def count_statements(db, listing) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    try:
+        listing()
+    finally:
+        event.remove(database.engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+LISTINGS = {
+    "sales_verified": (form_service.sales_verified_query, form_service.serialize_sales_verified),
+    "customer_submitted": (form_service.customer_submitted_query, form_service.serialize_customer_submitted),
+    "pending_accounts": (form_service.pending_accounts_query, form_service.serialize_pending_accounts),
+}
+
+
+@pytest.mark.parametrize("listing", sorted(LISTINGS))
+def test_listing_query_count_does_not_grow_with_forms(db, listing):
+    query, serializer = LISTINGS[listing]
+    dealerships = {forms: make_dealership(db, forms) for forms in (4, 40)}
+    counts = []
+    for forms, dealership_id in dealerships.items():
+        db.expire_all()
+
+        def load_page():
+            items, _ = form_service.paginate_forms(
+                query(db, dealership_id), serializer, limit=pagination.MAX_PAGE_SIZE
+            )
+            assert len(items) == forms // 2
+        counts.append(count_statements(db, load_page))
+
+    assert counts[0] == counts[1]
+    assert counts[0] <= 2
@@ -0,0 +1,95 @@
+"""
+Keyset pages and NDJSON streams of the employee form listings.
+"""
+import json
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from datetime import datetime
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+import models
+from core import oauth2, pagination
+from routes import employee
+from factories import make_dealership
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert pagination.decode_cursor(pagination.encode_cursor(created_at, 42)) == (created_at, 42)
+    assert pagination.decode_cursor(pagination.encode_cursor(None, 7)) == (None, 7)
+
+
+def test_invalid_cursor_is_a_bad_request():
+    with pytest.raises(HTTPException) as raised:
+        pagination.decode_cursor("not-a-cursor")
+    assert raised.value.status_code == 400
+
+
+@pytest.fixture
+def client(db):
+    # 20 forms, 10 of them sales verified
+    dealership_id = make_dealership(db, 20)
+    app = FastAPI()
+    app.include_router(employee.router)
+    app.dependency_overrides[oauth2.get_current_user] = lambda: SimpleNamespace(
+        id=1, dealership_id=dealership_id, role=models.RoleEnum.sales_executive
+    )
+    with TestClient(app) as client:
+        yield client
+
+
+def test_pages_follow_the_next_cursor_to_the_last_page(client):
+    ids, after, pages = [], None, 0
+    while True:
+        params = {"limit": 4}
+        if after:
+            params["after"] = after
+        response = client.get("/employees/forms/sales-verified", params=params)
+        assert response.status_code == 200
+        pages += 1
+        ids += [item["form_instance_id"] for item in response.json()]
+        after = response.headers.get(pagination.NEXT_CURSOR_HEADER)
+        if after is None:
+            break
+
+    # 4 + 4 + 2, newest first, and the short last page has no cursor
+    assert pages == 3
+    assert len(ids) == 10
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_exact_last_page_has_no_next_cursor(client):
+    response = client.get("/employees/forms/sales-verified", params={"limit": 10})
+    assert len(response.json()) == 10
+    assert pagination.NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_stream_writes_every_row_as_ndjson(client):
+    paged = client.get("/employees/forms/customer-submitted", params={"limit": 200}).json()
+
+    response = client.get("/employees/forms/customer-submitted", params={"stream": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    assert [item["form_instance_id"] for item in streamed] == [item["form_instance_id"] for item in paged]
+    assert len(streamed) == 10
+
+
+def test_stream_resumes_after_a_cursor(client):
+    first = client.get("/employees/forms/sales-verified", params={"limit": 3})
+    after = first.headers[pagination.NEXT_CURSOR_HEADER]
+
+    response = client.get("/employees/forms/sales-verified", params={"stream": "true", "after": after})
+    streamed = [json.loads(line)["form_instance_id"] for line in response.text.splitlines()]
+    assert len(streamed) == 7
+    assert max(streamed) < min(item["form_instance_id"] for item in first.json())
+
+
+def test_stream_rejects_a_bad_cursor_before_streaming(client):
+    response = client.get("/employees/forms/sales-verified", params={"stream": "true", "after": "bad"})
+    assert response.status_code == 400
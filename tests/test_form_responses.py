@@ -0,0 +1,84 @@
+"""Response writes through services.form.save_responses."""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from sqlalchemy import func, select
+import models
+from services import form as form_service
+
+
+def make_form(db, fields: int):
+    template = models.FormTemplate(name="Import")
+    db.add(template)
+    db.flush()
+    form_fields = [
+        models.FormField(
+            template_id=template.id, name=f"field_{index}", field_type=models.FieldTypeEnum.text,
+            filled_by=models.FilledByEnum.customer, order=index
+        )
+        for index in range(fields)
+    ]
+    form_instance = models.FormInstance(template_id=template.id, generated_by=1)
+    db.add_all([*form_fields, form_instance])
+    db.commit()
+    return form_instance, {field.id: field.name for field in form_fields}
+
+
+def rows_for(form_instance, field_names, value):
+    return [
+        {"form_instance_id": form_instance.id, "form_field_id": field_id, "value": f"{value}-{name}"}
+        for field_id, name in field_names.items()
+    ]
+
+
+@pytest.mark.parametrize("fields", [10, 100, 1000])
+def test_save_responses_writes_rows_and_snapshot(db, fields):
+    form_instance, field_names = make_form(db, fields)
+
+    form_service.save_responses(
+        db, form_instance, models.FilledByEnum.customer.value, field_names,
+        rows_for(form_instance, field_names, "a")
+    )
+    db.commit()
+
+    assert db.execute(
+        select(func.count()).select_from(models.FormResponse)
+        .where(models.FormResponse.form_instance_id == form_instance.id)
+    ).scalar() == fields
+    assert form_instance.customer_snapshot == [
+        {"field_name": name, "value": f"a-{name}"} for name in field_names.values()
+    ]
+    assert form_instance.sales_snapshot is None
+
+
+def test_snapshot_append_does_not_lose_overlapping_submission(db):
+    import database
+
+    form_instance, field_names = make_form(db, 2)
+    first, second = list(field_names.items())
+    other = database.SessionLocal()
+    try:
+        # Both requests loaded the instance before either saved
+        stale = other.get(models.FormInstance, form_instance.id)
+        assert stale.customer_snapshot is None
+
+        form_service.save_responses(
+            db, form_instance, models.FilledByEnum.customer.value, dict([first]),
+            rows_for(form_instance, dict([first]), "a")
+        )
+        db.commit()
+        form_service.save_responses(
+            other, stale, models.FilledByEnum.customer.value, dict([second]),
+            rows_for(stale, dict([second]), "b")
+        )
+        other.commit()
+    finally:
+        other.close()
+
+    db.expire_all()
+    assert form_instance.customer_snapshot == [
+        {"field_name": first[1], "value": f"a-{first[1]}"},
+        {"field_name": second[1], "value": f"b-{second[1]}"},
+    ]
@@ -0,0 +1,169 @@
+"""
+Compiled form schemas: cached per template and dropped when the template's
+fields or activation change, and the typed values they accept.
+"""
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+import models
+from routes import form as form_routes
+from schemas import form
+from services import form_schema
+
+
+@pytest.fixture
+def template(db):
+    form_schema._cache.clear()
+    admin = models.User(
+        first_name="Ada", last_name="Admin", email="admin@example.com",
+        role=models.RoleEnum.admin, password="x", is_activated=True
+    )
+    db.add(admin)
+    db.flush()
+    dealership = models.Dealership(
+        name="Dealer", address="Main St", contact_number="1", num_employees=1,
+        num_branches=1, contact_email="dealer@example.com", creator_id=admin.id
+    )
+    db.add(dealership)
+    db.flush()
+    admin.dealership_id = dealership.id
+    template = models.FormTemplate(name="Sale", dealership_id=dealership.id)
+    db.add(template)
+    db.flush()
+    db.add(models.FormField(
+        template_id=template.id, name="phone", field_type=models.FieldTypeEnum.text,
+        filled_by=models.FilledByEnum.customer, order=1
+    ))
+    db.commit()
+    yield template
+    form_schema._cache.clear()
+
+
+def test_schema_is_compiled_once_per_template(db, template):
+    first = form_schema.get_form_schema(db, template.id)
+    assert list(first.customer.by_name) == ["phone"]
+    assert form_schema.get_form_schema(db, template.id) is first
+
+
+def test_adding_fields_invalidates_the_schema(db, template):
+    stale = form_schema.get_form_schema(db, template.id)
+
+    form_routes.add_fields_to_template(template.id, [
+        form.FormFieldCreate(name="model", field_type="text", filled_by="sales_executive", order=2),
+        form.FormFieldCreate(name="licence", field_type="image", filled_by="customer", order=3),
+    ], db=db)
+
+    fresh = form_schema.get_form_schema(db, template.id)
+    assert fresh is not stale
+    assert list(fresh.customer.by_name) == ["phone", "licence"]
+    assert list(fresh.sales.by_name) == ["model"]
+    assert [field.name for field in fresh.customer.required_images] == ["licence"]
+
+
+def test_activating_a_template_invalidates_its_schema(db, template):
+    stale = form_schema.get_form_schema(db, template.id)
+
+    form_routes.activate_form_template(
+        template.id, db=db, current_user=SimpleNamespace(dealership_id=template.dealership_id)
+    )
+
+    assert form_schema.get_form_schema(db, template.id) is not stale
+
+
+def test_expired_schema_is_recompiled(db, template, monkeypatch):
+    stale = form_schema.get_form_schema(db, template.id)
+    monkeypatch.setattr(form_schema.settings, "form_schema_cache_ttl", 0)
+    assert form_schema.get_form_schema(db, template.id) is not stale
+
+
+def make_field(field_type: str, name: str = "field", field_id: int = 1) -> form_schema.CompiledField:
+    return form_schema.CompiledField(
+        id=field_id, name=name, field_type=field_type, is_required=True,
+        filled_by=models.FilledByEnum.customer.value, order=field_id
+    )
+
+
+@pytest.mark.parametrize("value, stored", [
+    ("12", "12"), (" 12.50 ", "12.5"), (3, "3"), ("1e-5", "0.00001"),
+    ("1E+3", "1000"), ("-4.0", "-4"), ("9" * 28, "9" * 28),
+])
+def test_number_is_normalized(value, stored):
+    assert make_field("number").coerce(value) == stored
+
+
+@pytest.mark.parametrize("value", [
+    "abc", "", True, "NaN", "Infinity", "1e999999", "1e-999999", "9" * 29, "0." + "1" * 29,
+])
+def test_number_rejects(value):
+    with pytest.raises(ValueError):
+        make_field("number").coerce(value)
+
+
+@pytest.mark.parametrize("value, stored", [
+    ("12", "12.00"), ("12.5", "12.50"), (0, "0.00"), ("1" * 26, "1" * 26 + ".00"),
+])
+def test_amount_is_quantized(value, stored):
+    assert make_field("amount").coerce(value) == stored
+
+
+@pytest.mark.parametrize("value, error", [
+    ("-1", "negative"), ("1.005", "2 decimal places"), ("1" * 27, "too large"),
+    ("1e30", "digits"), ("abc", "number"),
+])
+def test_amount_rejects(value, error):
+    with pytest.raises(ValueError, match=error):
+        make_field("amount").coerce(value)
+
+
+def test_date_is_iso_formatted():
+    assert make_field("date").coerce(" 2024-02-29 ") == "2024-02-29"
+    for value in ("2023-02-29", "29/02/2024", ""):
+        with pytest.raises(ValueError):
+            make_field("date").coerce(value)
+
+
+def test_vehicle_is_an_integer_id():
+    assert make_field("vehicle").coerce(" 7 ") == "7"
+    for value in ("seven", "7.5", False):
+        with pytest.raises(ValueError):
+            make_field("vehicle").coerce(value)
+
+
+def test_text_is_stored_as_given():
+    assert make_field("text").coerce(12) == "12"
+    assert make_field("text").coerce(" a ") == " a "
+
+
+def test_normalize_values_reports_every_error_at_once():
+    group = form_schema.FieldGroup.build([
+        make_field("amount", "price", 1), make_field("date", "delivery", 2), make_field("text", "note", 3),
+    ])
+    fields = group.by_name
+    with pytest.raises(form_schema.HTTPException) as raised:
+        group.normalize_values(
+            [(fields["price"], "1" * 40), (fields["delivery"], "soon"), (fields["note"], "ok")], None, None
+        )
+    assert raised.value.status_code == 400
+    assert [error.split(":")[0] for error in raised.value.detail] == ["price", "delivery"]
+
+    assert group.normalize_values(
+        [(fields["price"], "10"), (fields["delivery"], "2024-01-02"), (fields["note"], "ok")], None, None
+    ) == [(fields["price"], "10.00"), (fields["delivery"], "2024-01-02"), (fields["note"], "ok")]
+
+
+def test_normalize_values_checks_vehicles_of_the_dealership(db, template):
+    vehicle = models.Vehicle(dealership_id=template.dealership_id, name="Roadster", total_price=1000)
+    db.add(vehicle)
+    db.commit()
+    field = make_field("vehicle", "vehicle")
+    group = form_schema.FieldGroup.build([field])
+
+    assert group.normalize_values([(field, str(vehicle.id))], db, template.dealership_id) == [
+        (field, str(vehicle.id))
+    ]
+    with pytest.raises(form_schema.HTTPException) as raised:
+        group.normalize_values([(field, str(vehicle.id))], db, template.dealership_id + 1)
+    assert raised.value.detail == [f"vehicle: unknown vehicle {vehicle.id}"]
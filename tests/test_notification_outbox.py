@@ -0,0 +1,179 @@
+"""
+Notification outbox: job building, and the worker's claim, retry with
+backoff and delivery status, with the email and SMS senders replaced by
+fakes that record or fail deliveries.
+"""
+import asyncio
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("twilio")
+pytest.importorskip("aiohttp")
+
+from sqlalchemy import select, text, update
+import database
+import models
+from config import settings
+from core.notifications import NotificationError
+from schemas.employee import NotificationPriority, NotificationType, SingleNotification
+from services import notification_outbox
+
+
+class FakeSender:
+    """Stands in for send_email and send_sms, failing while failures remain."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.sent = []
+
+    async def send_email(self, to_email, subject, message, priority):
+        await self._send(("email", to_email, subject, message))
+
+    async def send_sms(self, to_phone, message, priority):
+        await self._send(("sms", to_phone, message))
+
+    async def _send(self, delivery):
+        if self.failures:
+            self.failures -= 1
+            raise NotificationError("provider unavailable")
+        self.sent.append(delivery)
+
+
+@pytest.fixture
+def sender(monkeypatch):
+    fake = FakeSender()
+    monkeypatch.setattr(notification_outbox, "send_email", fake.send_email)
+    monkeypatch.setattr(notification_outbox, "send_sms", fake.send_sms)
+    return fake
+
+
+def employee(**columns) -> models.User:
+    values = dict(
+        id=7, first_name="Eve", last_name="Employee", email="eve@example.com",
+        phone_number="+15550100", role=models.RoleEnum.sales_executive, password="x"
+    )
+    values.update(columns)
+    return models.User(**values)
+
+
+def notification(notification_type: NotificationType, subject=None) -> SingleNotification:
+    return SingleNotification(
+        message="Shift starts at 9",
+        notification_type=notification_type,
+        priority=NotificationPriority.HIGH,
+        subject=subject
+    )
+
+
+def test_build_jobs_one_row_per_channel():
+    jobs, errors = notification_outbox.build_jobs(employee(), notification(NotificationType.BOTH), sender_id=3)
+
+    assert errors == []
+    assert [(job["channel"], job["destination"], job["subject"]) for job in jobs] == [
+        ("email", "eve@example.com", "New Notification"),
+        ("sms", "+15550100", None),
+    ]
+    assert all(job["recipient_id"] == 7 and job["sender_id"] == 3 for job in jobs)
+    assert all(job["priority"] == "high" and job["message"] == "Shift starts at 9" for job in jobs)
+
+
+def test_build_jobs_reports_missing_destinations():
+    jobs, errors = notification_outbox.build_jobs(
+        employee(phone_number=None), notification(NotificationType.BOTH, subject="Rota"), sender_id=None
+    )
+
+    assert [(job["channel"], job["subject"]) for job in jobs] == [("email", "Rota")]
+    assert errors == ["Phone number not available"]
+
+
+def test_retry_delay_doubles_per_attempt(monkeypatch):
+    monkeypatch.setattr(settings, "notification_retry_delay", 60)
+
+    assert [notification_outbox.retry_delay(attempts).total_seconds() for attempts in (1, 2, 3)] == [60, 120, 240]
+
+
+def run_async(make_coroutine):
+    """Run on a fresh event loop; pooled asyncpg connections are bound to their loop."""
+    async def main():
+        try:
+            return await make_coroutine()
+        finally:
+            await database.async_engine.dispose()
+    return asyncio.run(main())
+
+
+def enqueue_for(db, notification_type: NotificationType):
+    recipient = employee(id=None)
+    db.add(recipient)
+    db.commit()
+    jobs, _ = notification_outbox.build_jobs(recipient, notification(notification_type), sender_id=None)
+
+    async def enqueue():
+        async with database.AsyncSessionLocal() as session:
+            await notification_outbox.enqueue(session, jobs)
+    run_async(enqueue)
+
+
+def process_batch() -> int:
+    async def run():
+        async with database.AsyncSessionLocal() as session:
+            return await notification_outbox.process_batch(session)
+    return run_async(run)
+
+
+def outbox_rows(db):
+    db.expire_all()
+    return db.execute(select(models.NotificationOutbox).order_by(models.NotificationOutbox.id)).scalars().all()
+
+
+def test_process_batch_delivers_and_marks_sent(db, sender):
+    enqueue_for(db, NotificationType.BOTH)
+
+    assert process_batch() == 2
+
+    assert sender.sent == [
+        ("email", "eve@example.com", "New Notification", "Shift starts at 9"),
+        ("sms", "+15550100", "Shift starts at 9"),
+    ]
+    rows = outbox_rows(db)
+    assert [(row.status, row.attempts, row.last_error) for row in rows] == [("sent", 1, None)] * 2
+    assert all(row.sent_at is not None for row in rows)
+    assert process_batch() == 0
+
+
+def test_process_batch_backs_off_then_gives_up(db, sender, monkeypatch):
+    monkeypatch.setattr(settings, "notification_retry_attempts", 2)
+    monkeypatch.setattr(settings, "notification_retry_delay", 60)
+    sender.failures = 2
+    enqueue_for(db, NotificationType.EMAIL)
+
+    assert process_batch() == 1
+    [row] = outbox_rows(db)
+    assert (row.status, row.attempts, row.last_error) == ("pending", 1, "provider unavailable")
+    # Backed off by retry_delay(1), so not due yet
+    assert db.execute(text(
+        "SELECT next_attempt_at > now() + interval '55 seconds' FROM notification_outbox"
+    )).scalar()
+    assert process_batch() == 0
+
+    db.execute(update(models.NotificationOutbox).values(next_attempt_at=text("now() - interval '1 second'")))
+    db.commit()
+    assert process_batch() == 1
+    [row] = outbox_rows(db)
+    assert (row.status, row.attempts) == ("failed", 2)
+    assert sender.sent == []
+
+
+def test_claimed_jobs_are_leased_to_their_worker(db, sender):
+    enqueue_for(db, NotificationType.SMS)
+
+    async def claim():
+        async with database.AsyncSessionLocal() as session:
+            return await notification_outbox.claim_batch(session)
+
+    [job] = run_async(claim)
+    assert job.attempts == 1
+    # Committed before sending, and not due again until the lease ends
+    assert run_async(claim) == []
+    [row] = outbox_rows(db)
+    assert row.status == "pending"
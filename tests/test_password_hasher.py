@@ -0,0 +1,80 @@
+"""The bounded bcrypt pool in core.utils and its back-pressure."""
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("passlib")
+
+from fastapi import HTTPException
+from core import utils
+
+
+def test_rejects_with_429_once_max_pending_reached():
+    hasher = utils.PasswordHasher(workers=1, max_pending=2)
+    release = threading.Event()
+    try:
+        running = hasher.submit(release.wait)
+        queued = hasher.submit(release.wait)
+
+        with pytest.raises(HTTPException) as rejected:
+            hasher.submit(release.wait)
+        assert rejected.value.status_code == 429
+        assert rejected.value.headers == {"Retry-After": "1"}
+
+        snapshot = hasher.snapshot()
+        assert (snapshot["pending"], snapshot["queued"], snapshot["rejected"]) == (2, 1, 1)
+    finally:
+        release.set()
+    assert running.result(timeout=5) and queued.result(timeout=5)
+
+    snapshot = hasher.snapshot()
+    assert (snapshot["pending"], snapshot["completed"], snapshot["peak_pending"]) == (0, 2, 2)
+    # Capacity is back once the backlog drains
+    assert hasher.submit(lambda: "ok").result(timeout=5) == "ok"
+
+
+def test_async_hash_and_verify_round_trip():
+    async def scenario():
+        hashed = await utils.hash_async("s3cret")
+        return hashed, await utils.verify_async("s3cret", hashed), await utils.verify_async("wrong", hashed)
+
+    hashed, matches, mismatches = asyncio.run(scenario())
+
+    assert hashed != "s3cret"
+    assert matches and not mismatches
+    assert utils.verify("s3cret", hashed)
+
+
+def test_login_holds_no_connection_while_hashing(db, monkeypatch):
+    from types import SimpleNamespace
+    import database
+    import models
+    from core import oauth2
+    from services import auth
+
+    admin = models.User(
+        first_name="Ada", last_name="Admin", email="admin@example.com",
+        role=models.RoleEnum.admin, password=utils.hash("s3cret"), is_activated=True
+    )
+    db.add(admin)
+    db.commit()
+    held = []
+
+    async def scenario():
+        async with database.AsyncSessionLocal() as session:
+            async def verify(plain_password, hashed_pass):
+                held.append(session.in_transaction())
+                return utils.pwd_context.verify(plain_password, hashed_pass)
+
+            monkeypatch.setattr(utils, "verify_async", verify)
+            credentials = SimpleNamespace(username="admin@example.com", password="s3cret")
+            try:
+                return await auth.authenticate_user(credentials, session)
+            finally:
+                await database.async_engine.dispose()
+
+    token, role = asyncio.run(scenario())
+    assert oauth2.verify_access_token_user(token, None).id == admin.id
+    assert role == models.RoleEnum.admin
+    assert held == [False]
@@ -0,0 +1,109 @@
+"""
+Read routing against two databases: a primary and a replica, each a SQLite
+file that names itself, so a response shows which one served the read.
+"""
+import os
+import subprocess
+import sys
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+import database
+from core import oauth2, read_routing
+
+
+def named_database(path, name: str) -> sessionmaker:
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE server (name TEXT)"))
+        connection.execute(text("INSERT INTO server VALUES (:name)"), {"name": name})
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "SessionLocal", named_database(tmp_path / "primary.db", "primary"))
+    monkeypatch.setattr(database, "ReplicaSessionLocal", named_database(tmp_path / "replica.db", "replica"))
+    monkeypatch.setattr(read_routing, "_last_write", {})
+
+    app = FastAPI()
+    app.middleware("http")(read_routing.stick_after_writes)
+
+    @app.get("/server")
+    def server(db: Session = Depends(read_routing.get_read_db)):
+        return db.execute(text("SELECT name FROM server")).scalar()
+
+    @app.post("/writes")
+    def write():
+        return {}
+
+    @app.post("/rejected-writes", status_code=400)
+    def rejected_write():
+        return {}
+
+    with TestClient(app) as client:
+        yield client
+
+
+def auth(user_id: int):
+    return {"Authorization": f"Bearer {oauth2.create_access_token({'user_id': user_id})}"}
+
+
+def test_reads_go_to_the_replica(client):
+    assert client.get("/server").json() == "replica"
+    assert client.get("/server", headers=auth(1)).json() == "replica"
+
+
+def test_reads_stick_to_the_primary_after_a_write(client):
+    client.post("/writes", headers=auth(1))
+
+    assert client.get("/server", headers=auth(1)).json() == "primary"
+    # Only for the user who wrote
+    assert client.get("/server", headers=auth(2)).json() == "replica"
+    assert client.get("/server").json() == "replica"
+
+
+def test_reads_return_to_the_replica_after_the_sticky_window(client, monkeypatch):
+    client.post("/writes", headers=auth(1))
+    monkeypatch.setattr(read_routing.settings, "replica_sticky_seconds", 0)
+
+    assert client.get("/server", headers=auth(1)).json() == "replica"
+
+
+def test_failed_or_anonymous_writes_do_not_stick(client):
+    client.post("/rejected-writes", headers=auth(1))
+    client.post("/writes")
+
+    assert client.get("/server", headers=auth(1)).json() == "replica"
+
+
+def replica_configuration(replica_url):
+    """(replica is the primary, replica engine url) in a fresh interpreter."""
+    env = dict(os.environ)
+    env.pop("database_replica_url", None)
+    if replica_url:
+        env["database_replica_url"] = replica_url
+    script = (
+        "import sys; sys.path[:0] = sys.argv[1:]\n"
+        "import conftest, database\n"
+        "print(database.ReplicaSessionLocal is database.SessionLocal, database.replica_engine.url)\n"
+    )
+    tests_dir = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run(
+        [sys.executable, "-c", script, tests_dir], env=env, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return output[0] == "True", output[1]
+
+
+def test_reads_fall_back_to_the_primary_without_a_replica(tmp_path):
+    assert replica_configuration(None)[0] is True
+
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    assert replica_configuration(url) == (False, url)
@@ -0,0 +1,90 @@
+"""
+services.chat_manager.RecentMessages: which lookups the in-memory buffer can
+answer and which must go to the database.
+"""
+import pytest
+
+pytest.importorskip("fastapi")
+
+from services.chat_manager import RecentMessages
+
+
+def message(message_id: int):
+    return {"id": message_id, "content": f"m{message_id}"}
+
+
+def ids(messages):
+    return [m["id"] for m in messages]
+
+
+def test_unseeded_buffer_answers_nothing():
+    recent = RecentMessages(5)
+    recent.add(message(1))
+
+    assert recent.after(0) is None
+    assert recent.latest(1) is None
+
+
+def test_after_covers_only_what_the_buffer_completely_holds():
+    recent = RecentMessages(10)
+    recent.seed([message(4), message(5), message(6)], complete_after=3)
+
+    assert ids(recent.after(3)) == [4, 5, 6]
+    assert ids(recent.after(5)) == [6]
+    assert recent.after(6) == []
+    # Older than the buffer's start
+    assert recent.after(2) is None
+
+
+def test_overflow_moves_complete_after_forward():
+    recent = RecentMessages(3, complete_after=0)
+    for message_id in range(1, 6):
+        recent.add(message(message_id))
+
+    assert ids(recent.messages) == [3, 4, 5]
+    assert recent.complete_after == 2
+    assert ids(recent.after(2)) == [3, 4, 5]
+    assert recent.after(1) is None
+
+
+def test_out_of_order_and_repeated_messages_are_merged():
+    recent = RecentMessages(3, complete_after=0)
+    for message_id in (1, 3, 2, 3, 4):
+        recent.add(message(message_id))
+
+    assert ids(recent.messages) == [2, 3, 4]
+    assert recent.complete_after == 1
+    assert recent.after(0) is None
+
+
+def test_seed_merges_messages_broadcast_before_it():
+    recent = RecentMessages(10)
+    recent.add(message(7))
+    recent.seed([message(5), message(6)], complete_after=4)
+
+    assert ids(recent.after(4)) == [5, 6, 7]
+    # Only the first, contiguous seed counts
+    recent.seed([message(1)], complete_after=0)
+    assert recent.complete_after == 4
+
+
+def test_seed_larger_than_the_buffer_keeps_the_newest():
+    recent = RecentMessages(2)
+    recent.seed([message(1), message(2), message(3)], complete_after=0)
+
+    assert ids(recent.messages) == [2, 3]
+    assert recent.complete_after == 1
+
+
+def test_latest_page_and_whether_older_messages_exist():
+    recent = RecentMessages(10)
+    recent.seed([message(1), message(2), message(3)], complete_after=0)
+    assert recent.latest(2) == ([message(2), message(3)], True)
+    assert recent.latest(5) == ([message(1), message(2), message(3)], False)
+
+    # A full page that may have older messages before it
+    partial = RecentMessages(10)
+    partial.seed([message(5), message(6)], complete_after=4)
+    assert partial.latest(2) == ([message(5), message(6)], True)
+    # Fewer than a page, and older ones are not in memory
+    assert partial.latest(3) is None
@@ -0,0 +1,85 @@
+"""Storage backends behind services.storage, without AWS."""
+import asyncio
+import io
+import time
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("fastapi")
+
+from services import storage
+
+
+@pytest.fixture(params=["memory", "local"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return storage.MemoryBackend()
+    return storage.LocalBackend(str(tmp_path))
+
+
+def test_put_get_delete_round_trip(backend):
+    async def scenario():
+        url = await backend.put("forms/1/a.jpg", io.BytesIO(b"jpeg"), "image/jpeg")
+        assert url == backend.url("forms/1/a.jpg")
+        assert await backend.exists("forms/1/a.jpg")
+        assert await backend.get("forms/1/a.jpg") == b"jpeg"
+
+        await backend.delete("forms/1/a.jpg")
+        assert not await backend.exists("forms/1/a.jpg")
+        with pytest.raises(KeyError):
+            await backend.get("forms/1/a.jpg")
+        # Deleting a missing key is not an error
+        await backend.delete("forms/1/a.jpg")
+    asyncio.run(scenario())
+
+
+def test_presigned_upload_url_is_signed_for_its_key(backend):
+    url = asyncio.run(backend.presign("forms/1/a.jpg"))
+    query = dict(part.split("=") for part in url.split("?", 1)[1].split("&"))
+    expires = int(query["expires"])
+
+    assert url.startswith(backend.url("forms/1/a.jpg"))
+    assert expires > time.time()
+    assert backend.verify_signature("forms/1/a.jpg", expires, query["signature"])
+    assert not backend.verify_signature("forms/2/a.jpg", expires, query["signature"])
+    assert not backend.verify_signature("forms/1/a.jpg", int(time.time()) - 1, backend.signature("forms/1/a.jpg", int(time.time()) - 1))
+
+
+def test_local_backend_keeps_keys_under_its_root(tmp_path):
+    backend = storage.LocalBackend(str(tmp_path / "root"))
+
+    with pytest.raises(ValueError):
+        asyncio.run(backend.put("../outside.jpg", io.BytesIO(b"x")))
+
+
+def test_file_matched_by_several_fields_is_uploaded_once(monkeypatch):
+    from fastapi import UploadFile
+
+    backend = storage.MemoryBackend()
+    monkeypatch.setattr(storage, "get_storage", lambda: backend)
+    both = UploadFile(io.BytesIO(b"front and back"), filename="front_back.jpg")
+    other = UploadFile(io.BytesIO(b"side"), filename="side.jpg")
+
+    urls = asyncio.run(storage.upload_files([
+        (both, "forms/1/a.jpg"), (both, "forms/1/b.jpg"), (other, "forms/1/c.jpg")
+    ]))
+
+    assert urls == [backend.url("forms/1/a.jpg"), backend.url("forms/1/a.jpg"), backend.url("forms/1/c.jpg")]
+    assert backend.objects == {"forms/1/a.jpg": b"front and back", "forms/1/c.jpg": b"side"}
+
+
+@pytest.mark.parametrize("key, expected", [
+    ("forms/12/a.jpg", "forms/12/a.jpg"),
+    ("forms/12/./a.jpg", "forms/12/a.jpg"),
+    ("forms/12//a.jpg", "forms/12/a.jpg"),
+    ("forms/12/../13/a.jpg", None),
+    ("forms/12/..", None),
+    ("/forms/12/a.jpg", None),
+    ("forms/13/a.jpg", None),
+    ("forms/123/a.jpg", None),
+    ("forms/12/", None),
+    ("forms/12/a\0.jpg", None),
+    ("", None),
+])
+def test_upload_keys_must_stay_under_the_form_prefix(key, expected):
+    assert storage.normalize_form_upload_key(12, key) == expected
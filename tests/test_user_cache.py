@@ -0,0 +1,129 @@
+"""
+Cached user principals: expiry, size bound and invalidation across workers
+through Postgres NOTIFY.
+"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from sqlalchemy import text
+import database
+import models
+from core import user_cache
+
+CHANNEL = "test_user_cache"
+
+
+def make_user(user_id: int):
+    return SimpleNamespace(
+        id=user_id, dealership_id=1, branch_id=None, first_name="Sam", last_name="Sales",
+        email=f"user{user_id}@example.com", role=models.RoleEnum.sales_executive,
+        phone_number=None, is_activated=True
+    )
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    user_cache._cache.clear()
+    yield
+    user_cache._cache.clear()
+
+
+def test_principal_is_a_detached_copy():
+    user = make_user(1)
+    principal = user_cache.put(user)
+    user.dealership_id = 2
+
+    assert user_cache.get(1) is principal
+    assert principal.dealership_id == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    user_cache.put(make_user(1))
+    monkeypatch.setattr(user_cache.settings, "user_cache_ttl", 0)
+
+    assert user_cache.get(1) is None
+    assert 1 not in user_cache._cache
+
+
+def test_least_recently_used_entries_are_dropped(monkeypatch):
+    monkeypatch.setattr(user_cache.settings, "user_cache_max_size", 2)
+    for user_id in (1, 2):
+        user_cache.put(make_user(user_id))
+    user_cache.get(1)
+    user_cache.put(make_user(3))
+
+    assert user_cache.get(2) is None
+    assert user_cache.get(1) is not None and user_cache.get(3) is not None
+
+
+def test_invalidate_without_a_channel_evicts_locally(monkeypatch):
+    monkeypatch.setattr(user_cache.settings, "user_cache_invalidation_channel", None)
+    user_cache.put(make_user(1))
+    user_cache.invalidate(1)
+
+    assert user_cache.get(1) is None
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.02)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_notifications_evict_in_other_workers(db, monkeypatch):
+    import asyncpg
+
+    monkeypatch.setattr(user_cache.settings, "user_cache_invalidation_channel", CHANNEL)
+
+    async def scenario():
+        received = asyncio.Queue()
+        other_worker = await asyncpg.connect(database.SQLALCHEMY_DATABASE_URL)
+        await other_worker.add_listener(CHANNEL, lambda *args: received.put_nowait(args[-1]))
+        listener = asyncio.create_task(user_cache.listen_for_invalidations())
+        try:
+            # The listener empties the cache once it is listening
+            user_cache.put(make_user(99))
+            await wait_for(lambda: user_cache.get(99) is None)
+
+            # Another worker's invalidation reaches this one
+            user_cache.put(make_user(1))
+            user_cache.put(make_user(2))
+            with database.engine.begin() as connection:
+                connection.execute(text("SELECT pg_notify(:channel, '1')"), {"channel": CHANNEL})
+            await wait_for(lambda: user_cache.get(1) is None)
+            assert user_cache.get(2) is not None
+
+            # And this worker's invalidation is published to the others
+            user_cache.invalidate(2)
+            assert user_cache.get(2) is None
+            assert await asyncio.wait_for(received.get(), 5) == "1"
+            assert await asyncio.wait_for(received.get(), 5) == "2"
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+            await other_worker.close()
+
+    asyncio.run(scenario())
+
+
+def test_listener_stops_with_the_app(db, monkeypatch):
+    import main
+
+    monkeypatch.setattr(user_cache.settings, "user_cache_invalidation_channel", CHANNEL)
+
+    async def scenario():
+        await main.start_user_cache_listener()
+        listener = main.app.state.user_cache_listener
+        await asyncio.sleep(0.1)
+        await main.stop_user_cache_listener()
+        return listener
+
+    try:
+        assert asyncio.run(scenario()).cancelled()
+    finally:
+        del main.app.state.user_cache_listener
@@ -0,0 +1,48 @@
+"""
+Websocket handlers borrow database sessions only around each operation, so
+idle sockets hold no pooled connections however many are open.
+"""
+from contextlib import ExitStack
+import logging
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+import database
+from core import oauth2
+from factories import make_chat_session
+
+SOCKETS = 100
+
+
+def checked_out() -> int:
+    return database.engine.pool.checkedout() + database.async_engine.sync_engine.pool.checkedout()
+
+
+def test_idle_sockets_hold_no_database_connections(db, app_client):
+    executive_id, session_id = make_chat_session(db)
+    token = oauth2.create_access_token({"user_id": executive_id})
+
+    with ExitStack() as sockets:
+        for _ in range(SOCKETS):
+            sockets.enter_context(app_client.websocket_connect(f"/ws/notifications?token={token}"))
+        for _ in range(SOCKETS):
+            chat = sockets.enter_context(app_client.websocket_connect(f"/chat/ws/{session_id}/customer"))
+            assert chat.receive_json()["type"] == "connection_established"
+            assert chat.receive_json()["type"] == "history"
+
+        assert checked_out() == 0
+
+
+def test_client_close_is_not_logged_as_an_error(db, app_client, caplog):
+    caplog.set_level(logging.INFO)
+    _, session_id = make_chat_session(db)
+    with app_client.websocket_connect(f"/chat/ws/{session_id}/customer") as chat:
+        chat.receive_json()
+        chat.receive_json()
+        chat.close(code=1000)
+
+    assert [record.getMessage() for record in caplog.records if record.levelname == "ERROR"] == []
+    assert any("disconnected from session" in record.getMessage() for record in caplog.records)
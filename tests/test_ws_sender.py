@@ -0,0 +1,86 @@
+"""
+Per-connection send queues: what happens when a client reads slower than
+messages arrive, under each ws_overflow_policy.
+"""
+import asyncio
+import pytest
+
+pytest.importorskip("fastapi")
+
+from core.metrics import SendQueueMetrics
+from services import ws_sender
+
+QUEUE_SIZE = 3
+
+
+class SlowWebSocket:
+    """Accepts one message at a time, each only once released."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.release = asyncio.Semaphore(0)
+
+    async def send_json(self, message):
+        await self.release.acquire()
+        self.sent.append(message["n"])
+
+    async def close(self, code: int):
+        self.closed_with = code
+
+
+def run_slow_client(monkeypatch, policy: str, messages: int):
+    monkeypatch.setattr(ws_sender.settings, "ws_send_queue_size", QUEUE_SIZE)
+    monkeypatch.setattr(ws_sender.settings, "ws_overflow_policy", policy)
+
+    async def scenario():
+        websocket = SlowWebSocket()
+        metrics = SendQueueMetrics("test")
+        closed = []
+
+        async def on_close():
+            closed.append(True)
+
+        sender = ws_sender.QueuedSender(websocket, metrics, on_close)
+        # The writer takes the first message and waits on the client
+        sender.send({"n": 0})
+        await asyncio.sleep(0)
+        for n in range(1, messages):
+            sender.send({"n": n})
+        for _ in range(messages):
+            websocket.release.release()
+        await asyncio.sleep(0.05)
+        sender.close()
+        return websocket, metrics, closed
+
+    return asyncio.run(scenario())
+
+
+def test_drop_oldest_keeps_the_newest_messages(monkeypatch):
+    websocket, metrics, closed = run_slow_client(monkeypatch, ws_sender.DROP_OLDEST, 10)
+
+    # One in flight, then the last QUEUE_SIZE; the client stays connected
+    assert websocket.sent == [0, 7, 8, 9]
+    assert metrics.dropped == 6
+    assert metrics.sent == 4
+    assert metrics.peak_depth == QUEUE_SIZE
+    assert websocket.closed_with is None and closed == []
+
+
+def test_disconnect_closes_a_slow_client(monkeypatch):
+    websocket, metrics, closed = run_slow_client(monkeypatch, ws_sender.DISCONNECT, 10)
+
+    # Nothing is dropped silently: the client is told to reconnect instead
+    assert websocket.closed_with == 1013
+    assert metrics.slow_disconnects == 1
+    assert metrics.dropped == 0
+    assert closed == [True]
+    assert websocket.sent == [0, 1, 2, 3]
+
+
+def test_queues_within_the_bound_deliver_everything(monkeypatch):
+    for policy in (ws_sender.DROP_OLDEST, ws_sender.DISCONNECT):
+        websocket, metrics, closed = run_slow_client(monkeypatch, policy, QUEUE_SIZE + 1)
+        assert websocket.sent == [0, 1, 2, 3]
+        assert metrics.dropped == metrics.slow_disconnects == 0
+        assert websocket.closed_with is None